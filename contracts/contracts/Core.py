@@ -4,9 +4,11 @@ from boa3.builtin import CreateNewEvent, NeoMetadata, metadata, public
 from boa3.builtin.contract import abort
 from boa3.builtin.interop.blockchain import Transaction
 from boa3.builtin.interop.contract import GAS as GAS_SCRIPT, call_contract, destroy_contract, update_contract
+from boa3.builtin.interop.iterator import Iterator
 from boa3.builtin.interop.runtime import calling_script_hash, check_witness, time, script_container, \
     executing_script_hash
-from boa3.builtin.interop.storage import delete, get, put
+from boa3.builtin.interop.storage import delete, find, get, get_context, put
+from boa3.builtin.interop.storage.findoptions import FindOptions
 from boa3.builtin.type import ECPoint, UInt160
 
 
@@ -35,8 +37,67 @@ TOKEN_ADDRESS: bytes = b'token_address'
 SALE_MARKET_ADDRESS: bytes = b'sale_market_address'
 gaziki = b'gaziki'
 
+# -------------------------------------------
+# Auctions
+# -------------------------------------------
+
+AUCTION_PREFIX = b'AUC'
+
+# Auction record: seller | start_price | end_price | start_time | duration, fixed-width little-endian.
+# The current price is derived from `time` when a bid arrives, nothing is updated per block.
+AUCTION_SELLER_OFFSET = 0
+AUCTION_START_PRICE_OFFSET = 20
+AUCTION_END_PRICE_OFFSET = 28
+AUCTION_START_TIME_OFFSET = 36
+AUCTION_DURATION_OFFSET = 44
+AUCTION_RECORD_SIZE = 52
+AUCTION_FIELD_SIZE = 8
+
+# durations are in milliseconds, like `time`
+MIN_AUCTION_DURATION = 60000
+
+# Maximum number of auctions returned by a single `get_auctions` page
+MAX_PAGE_SIZE = 100
+
+ZERO_PADDING = b'\x00\x00\x00\x00\x00\x00\x00\x00'
+
+# -------------------------------------------
+# Payments
+# -------------------------------------------
+
+# GAS payments carry either a list [operation name, args...] or a compact payload:
+# PAYMENT_VERSION | opcode | fixed-width little-endian fields. Cutie ids take CUTIE_ID_SIZE bytes,
+# every other field AUCTION_FIELD_SIZE bytes.
+PAYMENT_VERSION = b'\x01'
+PAYMENT_HEADER_SIZE = 2
+CUTIE_ID_SIZE = 5
+
+OP_CREATE_SALE_AUCTION = 1
+OP_BID = 2
+OP_CUTIE_CHECK_WITNESS = 3
+OP_CORE_CHECK_WITNESS = 4
+OP_CALL_DELEGATED_APPROVE_TEST = 5
+OP_TEST_GAS = 6
+
+# opcodes of the list payloads
+PAYMENT_OPCODES: Dict[str, int] = {
+    '_create_sale_auction': OP_CREATE_SALE_AUCTION,
+    'bid': OP_BID,
+    'cutie_check_witness': OP_CUTIE_CHECK_WITNESS,
+    'core_check_witness': OP_CORE_CHECK_WITNESS,
+    'call_delegated_approve_test': OP_CALL_DELEGATED_APPROVE_TEST,
+    'test_gas': OP_TEST_GAS,
+}
+
+# compact payload size of every opcode, indexed by opcode
+PAYMENT_SIZES = b'\x00\x1f\x07\x02\x02\x1f\x0a'
+
 
 GasTestEvent = CreateNewEvent([('from', UInt160), ('amount', int), ('data', List[Any])], 'GasTestEvent')
+AuctionCreated = CreateNewEvent([('cutieId', int), ('seller', UInt160), ('startPrice', int), ('endPrice', int),
+                                 ('duration', int)], 'AuctionCreated')
+AuctionSuccessful = CreateNewEvent([('cutieId', int), ('price', int), ('winner', UInt160)], 'AuctionSuccessful')
+AuctionCancelled = CreateNewEvent([('cutieId', int)], 'AuctionCancelled')
 
 # -------------------------------------------
 # System Methods
@@ -112,41 +173,68 @@ def set_gaziki(address: UInt160) -> None:
     put(gaziki, address)
 
 @public
-def onNEP17Payment(t_from: UInt160, t_amount: int, data: List[Any]):
+def onNEP17Payment(t_from: UInt160, t_amount: int, data: Any):
+    # anyone can call this method, only GAS has actually transferred `t_amount`
+    assert calling_script_hash == GAS_SCRIPT, 'only GAS is accepted'
     assert t_amount > 0, 'no funds transferred'
-    p_len = len(data)
-    assert p_len > 1, 'incorrect data length'
-
-    p_operation = cast(str, data[0])
 
-    if p_operation == '_create_sale_auction':
+    if isinstance(data, bytes):
+        payment = _decode_payment(cast(bytes, data))
+        opcode = cast(int, payment[0])
+    else:
+        payment = cast(List[Any], data)
+        assert len(payment) > 1, 'incorrect data length'
+        opcodes = PAYMENT_OPCODES
+        operation = cast(str, payment[0])
+        opcode = 0
+        if operation in opcodes:
+            opcode = opcodes[operation]
+    p_len = len(payment)
+
+    # ordered by volume
+    if opcode == OP_BID:
+        assert p_len == 2, 'incorrect arguments to bid'
+        _bid(t_from, t_amount, cast(int, payment[1]))
+    elif opcode == OP_CREATE_SALE_AUCTION:
         assert p_len == 5, 'incorrect arguments to createStream'
-        cutie_id = cast(int, data[1])
-        start_price = cast(int, data[2])
-        end_price = cast(int, data[3])
-        duration = cast(int, data[4])
-        _create_sale_auction(t_from, t_amount, GAS_SCRIPT, cutie_id, start_price, end_price, duration)
-        return
-    if p_operation == 'cutie_check_witness':
+        _create_sale_auction(t_from, t_amount, GAS_SCRIPT, cast(int, payment[1]), cast(int, payment[2]),
+                             cast(int, payment[3]), cast(int, payment[4]))
+    elif opcode == OP_TEST_GAS:
+        assert p_len == 2, 'incorrect data length'
+        GasTestEvent(t_from, t_amount, payment)
+        put(b'gas_test_key', cast(int, payment[1]))
+    elif opcode == OP_CUTIE_CHECK_WITNESS:
         cutie_check_witness()
-        return
-    if p_operation == 'core_check_witness':
+    elif opcode == OP_CORE_CHECK_WITNESS:
         core_check_witness()
-        return
-    if p_operation == 'call_delegated_approve_test':
+    elif opcode == OP_CALL_DELEGATED_APPROVE_TEST:
         assert p_len == 5, 'incorrect arguments to createStream'
-        cutie_id = cast(int, data[1])
-        start_price = cast(int, data[2])
-        end_price = cast(int, data[3])
-        duration = cast(int, data[4])
         call_delegated_approve_test()
-        return
-    if p_operation == 'test_gas':
-        assert p_len == 2, 'incorrect data length'
-        GasTestEvent(t_from, t_amount, data)
-        put(b'gas_test_key', cast(int, data[1]))
-        return
-    abort()
+    else:
+        abort()
+
+def _decode_payment(payload: bytes) -> List[Any]:
+    """
+    Unpacks a compact payload into the list layout: [opcode, fields...]
+    """
+    assert len(payload) >= PAYMENT_HEADER_SIZE, 'incorrect data length'
+    assert payload[:1] == PAYMENT_VERSION, 'unsupported payment version'
+    opcode = payload[1:PAYMENT_HEADER_SIZE].to_int()
+    assert opcode > 0 and opcode < len(PAYMENT_SIZES), 'unknown payment opcode'
+    assert len(payload) == _payment_size(opcode), 'incorrect data length'
+
+    payment: List[Any] = [opcode]
+    offset = PAYMENT_HEADER_SIZE
+    if offset < len(payload) and opcode != OP_TEST_GAS:
+        payment.append(payload[offset:offset + CUTIE_ID_SIZE].to_int())
+        offset += CUTIE_ID_SIZE
+    while offset < len(payload):
+        payment.append(payload[offset:offset + AUCTION_FIELD_SIZE].to_int())
+        offset += AUCTION_FIELD_SIZE
+    return payment
+
+def _payment_size(opcode: int) -> int:
+    return PAYMENT_SIZES[opcode:opcode + 1].to_int()
 
 @public
 def get_gas_test_data() -> Any:
@@ -157,7 +245,134 @@ def onNEP11Payment(from_address: UInt160, amount: int, tokenId: bytes, data: Any
     abort()
 
 def _create_sale_auction(address_from: UInt160, amount: int, token_address: UInt160, cutie_id: int, start_price: int, end_price: int, duration: int) -> None:
-    call_contract(UInt160(get(TOKEN_ADDRESS)), 'delegated_approve', [address_from, UInt160(get(TOKEN_ADDRESS)), cutie_id])
+    assert start_price >= 0 and end_price >= 0, 'Incorrect auction price'
+    assert duration >= MIN_AUCTION_DURATION, 'Auction is too short'
+
+    # checks the seller's witness and ownership, the approval lets this contract hand the
+    # cutie over to the winner; sellers that made this contract their operator keep no
+    # per-cutie approval
+    call_contract(UInt160(get(TOKEN_ADDRESS)), 'delegated_approve', [address_from, executing_script_hash, cutie_id])
+
+    record = (address_from
+              + _pack_int(start_price)
+              + _pack_int(end_price)
+              + _pack_int(time)
+              + _pack_int(duration))
+    put(mk_auction_key(cutie_id), record)
+    AuctionCreated(cutie_id, address_from, start_price, end_price, duration)
+
+def _bid(bidder: UInt160, amount: int, cutie_id: int) -> None:
+    key = mk_auction_key(cutie_id)
+    record = get(key)
+    assert len(record) == AUCTION_RECORD_SIZE, 'Auction not found'
+
+    price = _current_price(record)
+    assert amount >= price, 'Bid is too low'
+    seller = UInt160(record[AUCTION_SELLER_OFFSET:AUCTION_START_PRICE_OFFSET])
+    delete(key)
+
+    call_contract(UInt160(get(TOKEN_ADDRESS)), 'transfer_from', [seller, bidder, cutie_id.to_bytes(), None])
+    if price > 0:
+        call_contract(GAS_SCRIPT, 'transfer', [executing_script_hash, seller, price, None])
+    if amount > price:
+        call_contract(GAS_SCRIPT, 'transfer', [executing_script_hash, bidder, amount - price, None])
+    AuctionSuccessful(cutie_id, price, bidder)
+
+def _current_price(record: bytes) -> int:
+    start_price = _unpack_int(record, AUCTION_START_PRICE_OFFSET)
+    end_price = _unpack_int(record, AUCTION_END_PRICE_OFFSET)
+    duration = _unpack_int(record, AUCTION_DURATION_OFFSET)
+    elapsed = time - _unpack_int(record, AUCTION_START_TIME_OFFSET)
+
+    if elapsed >= duration:
+        return end_price
+    if start_price >= end_price:
+        return start_price - (start_price - end_price) * elapsed // duration
+    return start_price + (end_price - start_price) * elapsed // duration
+
+def _pack_int(value: int) -> bytes:
+    data = value.to_bytes()
+    assert len(data) <= AUCTION_FIELD_SIZE, 'Auction field overflow'
+    return data + ZERO_PADDING[:AUCTION_FIELD_SIZE - len(data)]
+
+def _unpack_int(record: bytes, offset: int) -> int:
+    return record[offset:offset + AUCTION_FIELD_SIZE].to_int()
+
+def mk_auction_key(cutie_id: int) -> bytes:
+    return AUCTION_PREFIX + cast(bytes, cutie_id)
+
+@public
+def cancel_auction(cutie_id: int) -> None:
+    key = mk_auction_key(cutie_id)
+    record = get(key)
+    assert len(record) == AUCTION_RECORD_SIZE, 'Auction not found'
+    seller = UInt160(record[AUCTION_SELLER_OFFSET:AUCTION_START_PRICE_OFFSET])
+    assert check_witness(seller), 'Only seller can cancel auction'
+
+    delete(key)
+    AuctionCancelled(cutie_id)
+
+@public
+def get_auction(cutie_id: int) -> Dict[str, Any]:
+    record = get(mk_auction_key(cutie_id))
+    assert len(record) == AUCTION_RECORD_SIZE, 'Auction not found'
+    return _auction_info(cutie_id, record)
+
+@public
+def has_auction(cutie_id: int) -> bool:
+    return len(get(mk_auction_key(cutie_id))) == AUCTION_RECORD_SIZE
+
+@public
+def get_auctions(start_after: int, limit: int) -> List[Any]:
+    """
+    Returns [auctions, next_cursor] with up to `limit` open auctions that follow the cutie id
+    `start_after` (0 to start from the beginning). `next_cursor` is 0 on the last page; the
+    cursor auction may have been sold or cancelled since.
+    """
+    assert limit > 0 and limit <= MAX_PAGE_SIZE, 'Incorrect `limit`'
+    auctions = find(AUCTION_PREFIX, get_context(), FindOptions.REMOVE_PREFIX)
+
+    cursor: bytes = start_after.to_bytes()
+    after = start_after == 0
+    page: List[Any] = []
+    last_id = 0
+    next_cursor = 0
+    while next_cursor == 0 and auctions.next():
+        entry = cast(List[bytes], auctions.value)
+        if not after:
+            # storage iterators can't seek, skip the keys up to the cursor one, which may be gone
+            after = _sorts_after(entry[0], cursor)
+        if after:
+            if len(page) == limit:
+                next_cursor = last_id
+            else:
+                last_id = entry[0].to_int()
+                page.append(_auction_info(last_id, entry[1]))
+    return [page, next_cursor]
+
+def _sorts_after(key: bytes, cursor: bytes) -> bool:
+    # the byte order storage iterators return the keys in
+    size = len(key)
+    if len(cursor) < size:
+        size = len(cursor)
+    index = 0
+    while index < size:
+        if key[index] != cursor[index]:
+            return key[index] > cursor[index]
+        index += 1
+    return len(key) > len(cursor)
+
+def _auction_info(cutie_id: int, record: bytes) -> Dict[str, Any]:
+    auction: Dict[str, Any] = {
+        'cutie_id': cutie_id,
+        'seller': UInt160(record[AUCTION_SELLER_OFFSET:AUCTION_START_PRICE_OFFSET]),
+        'start_price': _unpack_int(record, AUCTION_START_PRICE_OFFSET),
+        'end_price': _unpack_int(record, AUCTION_END_PRICE_OFFSET),
+        'start_time': _unpack_int(record, AUCTION_START_TIME_OFFSET),
+        'duration': _unpack_int(record, AUCTION_DURATION_OFFSET),
+        'current_price': _current_price(record),
+    }
+    return auction
 
 @public
 def test_simple() -> None:
@@ -5,8 +5,8 @@ from boa3.builtin.contract import Nep11TransferEvent, abort
 from boa3.builtin.interop.blockchain import get_contract, Transaction
 from boa3.builtin.interop.contract import call_contract, destroy_contract, update_contract
 from boa3.builtin.interop.iterator import Iterator
-from boa3.builtin.interop.runtime import check_witness, script_container, calling_script_hash
-from boa3.builtin.interop.stdlib import serialize, deserialize
+from boa3.builtin.interop.runtime import check_witness, script_container, calling_script_hash, time
+from boa3.builtin.interop.stdlib import deserialize
 from boa3.builtin.interop.storage import delete, get, put, find, get_context
 from boa3.builtin.interop.storage.findoptions import FindOptions
 from boa3.builtin.type import UInt160, ByteString,ECPoint
@@ -37,6 +37,12 @@ TOKEN_SYMBOL = 'EXMP'  # TODO_TEMPLATE
 # Number of decimal places
 TOKEN_DECIMALS = 0
 
+# Maximum number of cuties handled by a single batch call
+MAX_BATCH_SIZE = 100
+
+# Maximum number of token ids returned by a single page query
+MAX_PAGE_SIZE = 500
+
 DEPLOYED = b'deployed'
 PAUSED = b'paused'
 
@@ -48,20 +54,44 @@ ADDRESS_GAME = b'game_address'
 # Prefixes
 # -------------------------------------------
 
-APPROVALS_PREFIX = b'approvals_'
-OPERATOR_APPROVALS_PREFIX = b'op_approvals_'
+# Storage schema v2: single-byte prefixes. The owner index (ACCOUNT_PREFIX) keeps the
+# token id in the key only and stores an empty value. A token entry (TOKEN_PREFIX) holds the
+# owner followed by a transfer nonce, an approval entry the approved address followed by the
+# nonce it was granted at; a transfer bumps the nonce, which voids the approval in place.
+APPROVALS_PREFIX = b'\x01'
+OPERATOR_APPROVALS_PREFIX = b'\x02'
+ACCOUNT_PREFIX = b'\x03'
+TOKEN_PREFIX = b'\x04'
+BALANCE_PREFIX = b'\x05'
+META_PREFIX = b'\x06'
+
+# Secondary indexes, keys only: generation + token id, owner + generation + token id and
+# cooldown end time + token id. Generations are fixed-width so one never prefixes another, end
+# times are big-endian so storage iterators return them in time order.
+GENERATION_INDEX_PREFIX = b'\x07'
+OWNER_GENERATION_INDEX_PREFIX = b'\x08'
+COOLDOWN_INDEX_PREFIX = b'\x09'
 
-ACCOUNT_PREFIX = b'ACC'
-TOKEN_PREFIX = b'TPF'
-BALANCE_PREFIX = b'BLP'
 SUPPLY_PREFIX = b'SPP'
-META_PREFIX = b'MDP'
+
+# Schema v1 prefixes, read as a fallback until `migrate_storage` has finished
+LEGACY_APPROVALS_PREFIX = b'approvals_'
+LEGACY_ACCOUNT_PREFIX = b'ACC'
+LEGACY_TOKEN_PREFIX = b'TPF'
+LEGACY_BALANCE_PREFIX = b'BLP'
+LEGACY_META_PREFIX = b'MDP'
 
 # -------------------------------------------
 # Keys
 # -------------------------------------------
 
 TOKEN_COUNT = b'TOKEN_COUNT'
+SCHEMA_VERSION = b'schema_version'
+STORAGE_MIGRATION_CURSOR = b'STORAGE_MIGRATION_CURSOR'
+APPROVAL_SWEEP_CURSOR = b'APPROVAL_SWEEP_CURSOR'
+CUTIE_INDEX_CURSOR = b'CUTIE_INDEX_CURSOR'
+
+STORAGE_SCHEMA_VERSION = 2
 
 # -------------------------------------------
 # Events
@@ -97,6 +127,81 @@ def Cutie(
     }
     return cutie
 
+# Packed cutie layout: version byte followed by fixed-width little-endian fields.
+# Entries written by `serialize` start with the Map stack item type (0x48) instead.
+CUTIE_PACKED_VERSION = b'\x01'
+
+CUTIE_GENES_OFFSET = 1
+CUTIE_GENES_SIZE = 32
+CUTIE_BIRTH_TIME_OFFSET = 33
+CUTIE_BIRTH_TIME_SIZE = 8
+CUTIE_COOLDOWN_END_TIME_OFFSET = 41
+CUTIE_COOLDOWN_END_TIME_SIZE = 8
+CUTIE_MOM_ID_OFFSET = 49
+CUTIE_MOM_ID_SIZE = 5
+CUTIE_DAD_ID_OFFSET = 54
+CUTIE_DAD_ID_SIZE = 5
+CUTIE_COOLDOWN_INDEX_OFFSET = 59
+CUTIE_COOLDOWN_INDEX_SIZE = 2
+CUTIE_GENERATION_OFFSET = 61
+CUTIE_GENERATION_SIZE = 2
+CUTIE_OPTIONAL_OFFSET = 63
+CUTIE_OPTIONAL_SIZE = 8
+
+ZERO_PADDING = b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00' \
+               b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'
+
+def pack_cutie(cutie: Cutie) -> bytes:
+    return (CUTIE_PACKED_VERSION
+            + _pack_int(cutie['genes'], CUTIE_GENES_SIZE)
+            + _pack_int(cutie['birth_time'], CUTIE_BIRTH_TIME_SIZE)
+            + _pack_int(cutie['cooldown_end_time'], CUTIE_COOLDOWN_END_TIME_SIZE)
+            + _pack_int(cutie['mom_id'], CUTIE_MOM_ID_SIZE)
+            + _pack_int(cutie['dad_id'], CUTIE_DAD_ID_SIZE)
+            + _pack_int(cutie['cooldown_index'], CUTIE_COOLDOWN_INDEX_SIZE)
+            + _pack_int(cutie['generation'], CUTIE_GENERATION_SIZE)
+            + _pack_int(cutie['optional'], CUTIE_OPTIONAL_SIZE))
+
+def _pack_int(value: int, size: int) -> bytes:
+    assert value >= 0, 'Negative cutie field'
+    data = value.to_bytes()
+    # fields are unsigned: a value using the top bit of the field drops the 0x00 sign byte,
+    # so 256-bit genes fit their 32 bytes
+    if len(data) == size + 1 and data[size:] == b'\x00':
+        data = data[:size]
+    assert len(data) <= size, 'Cutie field overflow'
+    return data + ZERO_PADDING[:size - len(data)]
+
+def _unpack_int(data: bytes) -> int:
+    # the appended sign byte keeps a set top bit from reading as a negative number
+    return (data + b'\x00').to_int()
+
+def _is_packed_cutie(meta: bytes) -> bool:
+    return meta[:1] == CUTIE_PACKED_VERSION
+
+def read_cutie_field(meta: bytes, name: str, offset: int, size: int) -> int:
+    """
+    Decodes a single cutie field from either storage format without building the whole struct
+    """
+    if _is_packed_cutie(meta):
+        return _unpack_int(meta[offset:offset + size])
+    legacy: Cutie = deserialize(meta)
+    return legacy[name]
+
+def _generation_of(meta: bytes) -> int:
+    return read_cutie_field(meta, 'generation', CUTIE_GENERATION_OFFSET, CUTIE_GENERATION_SIZE)
+
+def _cooldown_end_of(meta: bytes) -> int:
+    return read_cutie_field(meta, 'cooldown_end_time', CUTIE_COOLDOWN_END_TIME_OFFSET, CUTIE_COOLDOWN_END_TIME_SIZE)
+
+def _reverse_bytes(data: bytes) -> bytes:
+    result = b''
+    index = len(data)
+    while index > 0:
+        index -= 1
+        result = result + data[index:index + 1]
+    return result
+
 # -------------------------------------------
 # System Methods
 # -------------------------------------------
@@ -108,14 +213,18 @@ def verify() -> bool:
 @public
 def _deploy(data: Any, update: bool):
 
+    if update:
+        # an updated contract keeps its v1 entries until `migrate_storage` has moved them
+        return
+
     if get(DEPLOYED).to_bool():
         abort()
 
-    if not update:
-        tx = cast(Transaction, script_container)
-        put(ADDRESS_OWNER, cast(UInt160, tx.sender))
-        put(DEPLOYED, True)
-        put(TOKEN_COUNT, 0)
+    tx = cast(Transaction, script_container)
+    put(ADDRESS_OWNER, cast(UInt160, tx.sender))
+    put(DEPLOYED, True)
+    put(TOKEN_COUNT, 0)
+    put(SCHEMA_VERSION, STORAGE_SCHEMA_VERSION)
 
 @public
 def update(script: bytes, manifest: bytes):
@@ -141,21 +250,152 @@ def decimals() -> int:
 
 @public(safe=True)
 def totalSupply() -> int:
-    return get(SUPPLY_PREFIX).to_int()
+    return _storage_get(SUPPLY_PREFIX).to_int()
 
 @public(safe=True)
 def balanceOf(owner: UInt160) -> int:
     assert len(owner) == 20, "Incorrect `owner` length"
     assert owner != UInt160(), "Balance query for the zero address"
-    return get(mk_balance_key(owner)).to_int()
+    return get_balance(owner).to_int()
 
 @public(safe=True)
 def tokensOf(owner: UInt160) -> Iterator:
+    # covers the v2 owner index only, use `tokensOfPage` while `migrate_storage` is pending
     assert len(owner) == 20, "Incorrect `owner` length"
     flags = FindOptions.REMOVE_PREFIX | FindOptions.KEYS_ONLY
     context = get_context()
     return find(mk_account_key(owner), context, flags)
 
+@public(safe=True)
+def tokensOfPage(owner: UInt160, start_after: int, limit: int) -> List[Any]:
+    """
+    Returns [token_ids, next_cursor] with up to `limit` tokens of `owner` that follow
+    `start_after` (0 to start from the beginning). `next_cursor` is 0 on the last page.
+    The page resumes after the key of `start_after`, so the cursor token may have been
+    transferred or burnt since.
+    While `migrate_storage` is pending the v1 owner index is listed before the v2 one; a
+    cursor that is not in the v1 index resumes in the v2 one.
+    """
+    assert len(owner) == 20, "Incorrect `owner` length"
+    assert limit > 0 and limit <= MAX_PAGE_SIZE, 'Incorrect `limit`'
+    flags = FindOptions.REMOVE_PREFIX | FindOptions.KEYS_ONLY
+    context = get_context()
+
+    cursor: bytes = start_after.to_bytes()
+    token_ids: List[int] = []
+    next_cursor = 0
+    if not _is_storage_migrated():
+        tokens = find(mk_legacy_account_key(owner), context, flags)
+        in_legacy = start_after == 0
+        while not in_legacy and tokens.next():
+            in_legacy = cast(bytes, tokens.value) == cursor
+        if in_legacy:
+            next_cursor = _collect_page(tokens, b'', limit, token_ids)
+            # the v2 index then starts from its first entry
+            cursor = b''
+    if next_cursor == 0:
+        tokens = find(mk_account_key(owner), context, flags)
+        next_cursor = _collect_page(tokens, cursor, limit, token_ids)
+
+    return [token_ids, next_cursor]
+
+@public(safe=True)
+def tokens() -> Iterator:
+    # covers the v2 token keys only, use `tokensPage` while `migrate_storage` is pending
+    flags = FindOptions.REMOVE_PREFIX | FindOptions.KEYS_ONLY
+    context = get_context()
+    return find(TOKEN_PREFIX, context, flags)
+
+@public(safe=True)
+def tokensPage(start_after: int, limit: int) -> List[Any]:
+    """
+    Returns [token_ids, next_cursor] for the existing tokens with ids in
+    (start_after, start_after + limit]. Ids are allocated sequentially, so the scan
+    resumes at the cursor instead of walking the token prefix from the start.
+    `next_cursor` is 0 once the last minted id has been reached.
+    """
+    assert start_after >= 0, 'Incorrect `start_after`'
+    assert limit > 0 and limit <= MAX_PAGE_SIZE, 'Incorrect `limit`'
+
+    last_id = _storage_get(TOKEN_COUNT).to_int()
+    end_id = start_after + limit
+    if end_id > last_id:
+        end_id = last_id
+
+    token_ids: List[int] = []
+    token_id = start_after
+    while token_id < end_id:
+        token_id += 1
+        if len(get_token_record(token_id)) != 0:
+            token_ids.append(token_id)
+
+    next_cursor = 0
+    if end_id < last_id:
+        next_cursor = end_id
+    return [token_ids, next_cursor]
+
+@public(safe=True)
+def tokensOfGeneration(generation: int, start_after: int, limit: int) -> List[Any]:
+    """
+    Returns [token_ids, next_cursor] with up to `limit` cuties of `generation` that follow
+    `start_after` (0 to start from the beginning). `next_cursor` is 0 on the last page; the
+    cursor cutie may have left the index since.
+    Cuties minted before the indexes existed are listed once `index_cuties` covered them.
+    """
+    return _index_page(mk_generation_index_key(generation), start_after, limit)
+
+@public(safe=True)
+def tokensOfOwnerGeneration(owner: UInt160, generation: int, start_after: int, limit: int) -> List[Any]:
+    """
+    Same as `tokensOfGeneration`, for the cuties of `owner` only
+    """
+    assert len(owner) == 20, "Incorrect `owner` length"
+    return _index_page(mk_owner_generation_index_key(owner, generation), start_after, limit)
+
+@public(safe=True)
+def readyTokensPage(start_after: bytes, limit: int) -> List[Any]:
+    """
+    Returns [token_ids, next_cursor] with up to `limit` cuties whose cooldown has ended, in
+    cooldown end time order. The scan stops at the first cutie still cooling down.
+
+    The cursor is the index entry of the last cutie returned, since a token id alone doesn't
+    tell where a cutie that bred or was burnt since stood: pass b'' to start from the
+    beginning, `next_cursor` is b'' on the last page.
+    """
+    assert limit > 0 and limit <= MAX_PAGE_SIZE, 'Incorrect `limit`'
+    flags = FindOptions.REMOVE_PREFIX | FindOptions.KEYS_ONLY
+    tokens = find(COOLDOWN_INDEX_PREFIX, get_context(), flags)
+
+    after = len(start_after) == 0
+    cooling = False
+    token_ids: List[int] = []
+    last_entry = b''
+    next_cursor = b''
+    while not cooling and len(next_cursor) == 0 and tokens.next():
+        entry = cast(bytes, tokens.value)
+        if not after:
+            # the entries up to the cursor were ready when it was returned, and stay ready
+            after = _sorts_after(entry, start_after)
+        if after:
+            if _unpack_int(_reverse_bytes(entry[:CUTIE_COOLDOWN_END_TIME_SIZE])) > time:
+                cooling = True
+            elif len(token_ids) == limit:
+                next_cursor = last_entry
+            else:
+                token_ids.append(entry[CUTIE_COOLDOWN_END_TIME_SIZE:].to_int())
+                last_entry = entry
+
+    return [token_ids, next_cursor]
+
+def _index_page(prefix: bytes, start_after: int, limit: int) -> List[Any]:
+    assert limit > 0 and limit <= MAX_PAGE_SIZE, 'Incorrect `limit`'
+    flags = FindOptions.REMOVE_PREFIX | FindOptions.KEYS_ONLY
+    tokens = find(prefix, get_context(), flags)
+
+    token_ids: List[int] = []
+    next_cursor = _collect_page(tokens, start_after.to_bytes(), limit, token_ids)
+    return [token_ids, next_cursor]
+
 @public(safe=False)
 def transfer(to: UInt160, tokenId: ByteString, data: Any) -> bool:
     token_id: int = tokenId.to_int()
@@ -172,11 +412,108 @@ def transfer_from(_from: UInt160, to: UInt160, tokenId: ByteString, data: Any) -
     token_id: int = tokenId.to_int()
     assert len(to) == 20, "Incorrect `to` length"
     assert to != UInt160(), "Transfer to the zero address"
+    assert get_owner_of(token_id) == _from, "Transfer of token that is not own"
+    assert check_witness(_from) or _is_approved_spender(token_id) or _is_approved_operator(_from), \
+        "Transfer of token that is not approved"
 
-    _transfer(_from, to, token_id)
+    _move(_from, to, token_id)
     post_transfer(_from, to, token_id, data)
     return True
 
+@public(safe=False)
+def transfer_batch(_from: UInt160, to: UInt160, tokenIds: List[ByteString], data: Any) -> bool:
+    """
+    Moves several tokens of `_from` to `to` in one call.
+
+    Ownership is checked per token, while the two balances are written once and the
+    receiver contract is resolved once. Besides `_from` itself, an operator approved with
+    `setApprovalForAll` may move the batch. NEP-11 defines `onNEP11Payment` per token id,
+    so the receiver still gets one callback for every transferred token.
+    """
+    assert len(to) == 20, "Incorrect `to` length"
+    assert to != UInt160(), "Transfer to the zero address"
+    batch_size = len(tokenIds)
+    assert batch_size > 0, 'Empty batch'
+    assert batch_size <= MAX_BATCH_SIZE, 'Batch is too large'
+    assert check_witness(_from) or _is_approved_operator(_from), "Transfer of token that is not own"
+
+    token_ids: List[int] = []
+    for tokenId in tokenIds:
+        token_id = tokenId.to_int()
+        assert get_owner_of(token_id) == _from, "Transfer of token that is not own"
+        if _from != to:
+            remove_token_account(_from, token_id)
+            _change_owner(token_id, _from, to)
+            add_token_account(to, token_id)
+        token_ids.append(token_id)
+
+    if _from != to:
+        set_balance(_from, -batch_size)
+        set_balance(to, batch_size)
+
+    is_contract = not isinstance(get_contract(to), None)    # TODO: change to 'is not None' when `is` semantic is implemented
+    for token_id in token_ids:
+        OnTransfer(_from, to, 1, cast(bytes, token_id))
+        if is_contract:
+            call_contract(to, 'onNEP11Payment', [_from, 1, token_id, data])
+    return True
+
+@public(safe=False)
+def burn(tokenId: ByteString) -> bool:
+    """
+    Destroys a cutie, removing every storage entry it holds. Allowed to its owner, to an
+    operator of the owner and to the game contract.
+    """
+    token_id: int = tokenId.to_int()
+    assert len(get_token_record(token_id)) != 0, 'Cutie not exists'
+    owner = get_owner_of(token_id)
+    assert _can_burn(owner), "Burn of token that is not own"
+    _check_not_on_auction(owner, token_id)
+
+    _burn(owner, token_id)
+    set_balance(owner, -1)
+    add_to_supply(-1)
+    post_transfer(owner, None, token_id, None)
+    return True
+
+@public(safe=False)
+def burn_batch(tokenIds: List[ByteString]) -> bool:
+    """
+    Burns several cuties in one call, writing the balance of every distinct owner and the
+    supply once.
+    """
+    batch_size = len(tokenIds)
+    assert batch_size > 0, 'Empty batch'
+    assert batch_size <= MAX_BATCH_SIZE, 'Batch is too large'
+
+    owners: List[UInt160] = []
+    token_ids: List[int] = []
+    balances: Dict[UInt160, int] = {}
+    for tokenId in tokenIds:
+        token_id = tokenId.to_int()
+        assert len(get_token_record(token_id)) != 0, 'Cutie not exists'
+        owner = get_owner_of(token_id)
+        assert _can_burn(owner), "Burn of token that is not own"
+        _check_not_on_auction(owner, token_id)
+
+        _burn(owner, token_id)
+        if owner in balances:
+            balances[owner] = balances[owner] - 1
+        else:
+            balances[owner] = -1
+        owners.append(owner)
+        token_ids.append(token_id)
+
+    for owner in balances.keys():
+        set_balance(owner, balances[owner])
+    add_to_supply(-batch_size)
+
+    index = 0
+    for token_id in token_ids:
+        post_transfer(owners[index], None, token_id, None)
+        index += 1
+    return True
+
 def post_transfer(token_owner: Union[UInt160, None], to: Union[UInt160, None], tokenId: int, data: Any):
     OnTransfer(token_owner, to, 1, cast(bytes, tokenId))
     if not isinstance(to, None):    # TODO: change to 'is not None' when `is` semantic is implemented
@@ -187,21 +524,151 @@ def post_transfer(token_owner: Union[UInt160, None], to: Union[UInt160, None], t
 @public()
 def delegated_approve(address_from: UInt160, address_to: UInt160, token_id: int) -> None:
     put(b'testeggtwo', 'someone')
-    assert _is_cutie_owner(token_id), 'Wrong cutie owner'
+    owner = get_owner_of(token_id)
+    assert check_witness(owner), 'Wrong cutie owner'
     put(b'testeggtwo', 'somevalue')
-    put(APPROVALS_PREFIX + cast(bytes, token_id), address_to)
+    assert owner == address_from, 'Wrong cutie owner'
+    # an operator can already move the cutie, so Core's sale auction needs a single call
+    # whether or not the seller made it their operator
+    if not _is_operator(owner, address_to):
+        _approve(owner, token_id, address_to)
+
+@public
+def setApprovalForAll(owner: UInt160, operator: UInt160, approved: bool) -> bool:
+    """
+    Lets `operator` transfer every token of `owner` with `transfer_from`/`transfer_batch`,
+    or revokes it. One entry per (owner, operator) pair, whatever the number of tokens.
+    """
+    assert len(operator) == 20, "Incorrect `operator` length"
+    assert operator != owner, 'Approval to the owner'
+    assert check_witness(owner), 'Wrong owner'
+
+    key = get_operator_approval_key(owner, operator)
+    if approved:
+        _storage_put_int(key, 1)
+    else:
+        _storage_delete(key)
+    ApprovalForAll(owner, operator, approved)
+    return True
+
+@public(safe=True)
+def isApprovedForAll(owner: UInt160, operator: UInt160) -> bool:
+    return _is_operator(owner, operator)
 
 @public()
 def cutie_witness(token_id: int) -> bool:
-    aaa = _is_cutie_owner(token_id)
-    ccc = 1
-    assert _is_cutie_owner(token_id), 'Wrong cutie owner'
-    return _is_cutie_owner(token_id)
+    is_owner = _is_cutie_owner(token_id)
+    assert is_owner, 'Wrong cutie owner'
+    return is_owner
 
 @public()
 def delegated_approve_test(text: bytes) -> None:
     put(b'testeggxxxx', 'someone')
 
+@public
+def multicall(calls: List[List[Any]]) -> List[Any]:
+    """
+    Runs several game operations in one cross-contract call. Each item of `calls` is
+    [operation, args]; the results are returned in the same order, None for operations
+    without a result. Restricted to the registered game contract.
+    """
+    assert isGame(), "Access denied"
+    assert len(calls) <= MAX_BATCH_SIZE, 'Batch is too large'
+
+    results: List[Any] = []
+    for call in calls:
+        assert len(call) == 2, 'Incorrect call length'
+        results.append(_dispatch(cast(str, call[0]), cast(List[Any], call[1])))
+    return results
+
+@public
+def sweep_approvals(limit: int) -> int:
+    """
+    Deletes up to `limit` token ids worth of dead approval entries: zero-filled slots,
+    approvals voided by a later transfer and approvals of burnt cuties.
+
+    Progress is kept under APPROVAL_SWEEP_CURSOR, so the method can be called repeatedly
+    until it returns 0 (the number of token ids still to scan); the next sweep then starts
+    over from the first id.
+    """
+    assert isOwner(), "Access denied"
+    assert limit > 0 and limit <= MAX_BATCH_SIZE, 'Incorrect `limit`'
+
+    last_id = _storage_get(TOKEN_COUNT).to_int()
+    token_id = _storage_get(APPROVAL_SWEEP_CURSOR).to_int()
+    end_id = token_id + limit
+    if end_id > last_id:
+        end_id = last_id
+
+    migrated = _is_storage_migrated()
+    while token_id < end_id:
+        token_id += 1
+        _sweep_approval(mk_approval_key(token_id), token_id)
+        if not migrated:
+            _sweep_approval(mk_legacy_approval_key(token_id), token_id)
+
+    if token_id == last_id:
+        _storage_delete(APPROVAL_SWEEP_CURSOR)
+    else:
+        _storage_put_int(APPROVAL_SWEEP_CURSOR, token_id)
+    return last_id - token_id
+
+def _sweep_approval(key: bytes, token_id: int):
+    record = _storage_get(key)
+    if len(record) == 0:
+        return
+    if len(get_token_record(token_id)) == 0 or _live_approval(record, token_id) == UInt160():
+        _storage_delete(key)
+
+@public
+def index_cuties(limit: int) -> int:
+    """
+    Writes the secondary index entries of up to `limit` token ids, for the cuties minted
+    before the indexes existed; entries already in place are written again unchanged.
+
+    Progress is kept under CUTIE_INDEX_CURSOR, so the method can be called repeatedly until
+    it returns 0 (the number of token ids still to scan).
+    """
+    assert isOwner(), "Access denied"
+    assert limit > 0 and limit <= MAX_BATCH_SIZE, 'Incorrect `limit`'
+
+    last_id = _storage_get(TOKEN_COUNT).to_int()
+    token_id = _storage_get(CUTIE_INDEX_CURSOR).to_int()
+    end_id = token_id + limit
+    if end_id > last_id:
+        end_id = last_id
+
+    while token_id < end_id:
+        token_id += 1
+        meta = get_meta(token_id)
+        if len(meta) != 0:
+            _index_cutie(token_id, meta)
+            _index_owner_generation(get_owner_of(token_id), token_id)
+
+    if token_id == last_id:
+        _storage_delete(CUTIE_INDEX_CURSOR)
+    else:
+        _storage_put_int(CUTIE_INDEX_CURSOR, token_id)
+    return last_id - token_id
+
+def _dispatch(operation: str, args: List[Any]) -> Any:
+    result: Any = None
+    if operation == 'ownerOf':
+        result = ownerOf(cast(int, args[0]))
+    elif operation == 'isApprovedForAll':
+        result = isApprovedForAll(cast(UInt160, args[0]), cast(UInt160, args[1]))
+    elif operation == 'delegated_approve':
+        delegated_approve(cast(UInt160, args[0]), cast(UInt160, args[1]), cast(int, args[2]))
+    elif operation == 'cutie_witness':
+        result = cutie_witness(cast(int, args[0]))
+    elif operation == 'delegated_approve_test':
+        delegated_approve_test(cast(bytes, args[0]))
+    elif operation == 'get_cutie':
+        result = get_cutie(cast(int, args[0]))
+    else:
+        abort()
+    return result
+
 @public
 def onNEP11Payment(from_address: UInt160, amount: int, tokenId: bytes, data: Any):
     abort()
@@ -229,29 +696,180 @@ def create_cutie(
 
     return _mint(owner, mom_id, dad_id, generation, cooldown_index, genes, birth_time)
 
+@public
+def create_cutie_batch(cuties: List[List[Any]]) -> List[int]:
+    """
+    Mints a batch of cuties in one call.
+
+    Each item of `cuties` holds the `create_cutie` arguments in the same order:
+    [owner, mom_id, dad_id, generation, cooldown_index, genes, birth_time].
+    Ids are allocated as a contiguous range; TOKEN_COUNT, the supply and the
+    balance of every distinct owner are written once per batch.
+    """
+    assert isGame() or isOwner(), "Access denied"
+    batch_size = len(cuties)
+    assert batch_size > 0, 'Empty batch'
+    assert batch_size <= MAX_BATCH_SIZE, 'Batch is too large'
+
+    first_id = _storage_get(TOKEN_COUNT).to_int() + 1
+    _storage_put_int(TOKEN_COUNT, first_id + batch_size - 1)
+
+    owners: List[UInt160] = []
+    balances: Dict[UInt160, int] = {}
+    token_id = first_id
+    for spec in cuties:
+        assert len(spec) == 7, 'Incorrect cutie spec length'
+        owner = cast(UInt160, spec[0])
+        assert len(owner) == 20, "Incorrect `owner` length"
+        assert owner != UInt160(), 'Mint to the zero address'
+
+        _store_cutie(token_id, owner, cast(int, spec[1]), cast(int, spec[2]), cast(int, spec[3]),
+                     cast(int, spec[4]), cast(int, spec[5]), cast(int, spec[6]))
+        if owner in balances:
+            balances[owner] = balances[owner] + 1
+        else:
+            balances[owner] = 1
+        owners.append(owner)
+        token_id += 1
+
+    for owner in balances.keys():
+        set_balance(owner, balances[owner])
+    add_to_supply(batch_size)
+
+    token_ids: List[int] = []
+    token_id = first_id
+    for owner in owners:
+        post_transfer(None, owner, token_id, None)
+        token_ids.append(token_id)
+        token_id += 1
+
+    return token_ids
+
 @public
 def get_cutie(
         token_id: int,
 ) -> Dict[str, int]:
     assert _exists(token_id), 'Cutie not exists'
 
-    metaBytes = get_meta(token_id)
-    metaObject: Cutie = deserialize(metaBytes)
+    return _read_cutie(get_meta(token_id))
+
+@public
+def get_cuties(token_ids: List[int]) -> List[Any]:
+    """
+    Bulk version of `ownerOf` + `get_cutie`. Returns one entry per requested id, in order:
+    {'owner': owner, 'cutie': cutie} for existing tokens and None for missing ones.
+    """
+    assert len(token_ids) <= MAX_PAGE_SIZE, 'Too many token ids'
+
+    result: List[Any] = []
+    for token_id in token_ids:
+        metaBytes = get_meta(token_id)
+        if len(metaBytes) == 0:
+            result.append(None)
+        else:
+            entry: Dict[str, Any] = {
+                'owner': get_owner_of(token_id),
+                'cutie': _read_cutie(metaBytes),
+            }
+            result.append(entry)
+    return result
+
+def _read_cutie(metaBytes: bytes) -> Dict[str, int]:
+    if not _is_packed_cutie(metaBytes):
+        metaObject: Cutie = deserialize(metaBytes)
+        cutie: Cutie = {
+            'genes': metaObject['genes'],
+            'birth_time': metaObject['birth_time'],
+            'mom_id': metaObject['mom_id'],
+            'dad_id': metaObject['dad_id'],
+            'cooldown_end_time': metaObject['cooldown_end_time'],
+            'cooldown_index': metaObject['cooldown_index'],
+            'generation': metaObject['generation'],
+        }
+        return cutie
 
     cutie: Cutie = {
-        'genes': metaObject['genes'],
-        'birth_time': metaObject['birth_time'],
-        'mom_id': metaObject['mom_id'],
-        'dad_id': metaObject['dad_id'],
-        'cooldown_end_time': metaObject['cooldown_end_time'],
-        'cooldown_index': metaObject['cooldown_index'],
-        'generation': metaObject['generation'],
+        'genes': _unpack_int(metaBytes[CUTIE_GENES_OFFSET:CUTIE_GENES_OFFSET + CUTIE_GENES_SIZE]),
+        'birth_time': _unpack_int(metaBytes[CUTIE_BIRTH_TIME_OFFSET:CUTIE_BIRTH_TIME_OFFSET + CUTIE_BIRTH_TIME_SIZE]),
+        'mom_id': _unpack_int(metaBytes[CUTIE_MOM_ID_OFFSET:CUTIE_MOM_ID_OFFSET + CUTIE_MOM_ID_SIZE]),
+        'dad_id': _unpack_int(metaBytes[CUTIE_DAD_ID_OFFSET:CUTIE_DAD_ID_OFFSET + CUTIE_DAD_ID_SIZE]),
+        'cooldown_end_time': _unpack_int(metaBytes[CUTIE_COOLDOWN_END_TIME_OFFSET:CUTIE_COOLDOWN_END_TIME_OFFSET + CUTIE_COOLDOWN_END_TIME_SIZE]),
+        'cooldown_index': _unpack_int(metaBytes[CUTIE_COOLDOWN_INDEX_OFFSET:CUTIE_COOLDOWN_INDEX_OFFSET + CUTIE_COOLDOWN_INDEX_SIZE]),
+        'generation': _unpack_int(metaBytes[CUTIE_GENERATION_OFFSET:CUTIE_GENERATION_OFFSET + CUTIE_GENERATION_SIZE]),
     }
 
     return cutie
 
+@public
+def migrate_storage(limit: int) -> int:
+    """
+    Moves up to `limit` token ids from the v1 storage layout to the v2 one: the owner, the
+    meta (re-encoded into the packed layout), the approval and the owner index entry of every
+    token, together with the balance of its owner.
+
+    Progress is kept under STORAGE_MIGRATION_CURSOR, so the method can be called
+    repeatedly until it returns 0 (the number of token ids still to scan). The last batch
+    bumps SCHEMA_VERSION, after which readers stop falling back to the v1 keys.
+    """
+    assert isOwner(), "Access denied"
+    assert limit > 0 and limit <= MAX_BATCH_SIZE, 'Incorrect `limit`'
+    if _is_storage_migrated():
+        return 0
+
+    last_id = _storage_get(TOKEN_COUNT).to_int()
+    token_id = _storage_get(STORAGE_MIGRATION_CURSOR).to_int()
+    end_id = token_id + limit
+    if end_id > last_id:
+        end_id = last_id
+
+    while token_id < end_id:
+        token_id += 1
+        _migrate_token(token_id)
+
+    if token_id == last_id:
+        _storage_put_int(SCHEMA_VERSION, STORAGE_SCHEMA_VERSION)
+        _storage_delete(STORAGE_MIGRATION_CURSOR)
+    else:
+        _storage_put_int(STORAGE_MIGRATION_CURSOR, token_id)
+    return last_id - token_id
+
+def _migrate_token(token_id: int):
+    legacy_token_key = mk_legacy_token_key(token_id)
+    owner = UInt160(_storage_get(legacy_token_key))
+    if len(owner) != 0:
+        # v1 entries hold the owner only, which reads as transfer nonce 0
+        _storage_put(mk_token_key(token_id), owner)
+        _storage_delete(legacy_token_key)
+        _storage_delete(mk_legacy_account_key(owner) + cast(bytes, token_id))
+        _storage_put(mk_account_key(owner) + cast(bytes, token_id), b'')
+
+        # transfers write v2 balances and drop the v1 one, so both never coexist
+        legacy_balance_key = mk_legacy_balance_key(owner)
+        balance = _storage_get(legacy_balance_key)
+        if len(balance) != 0:
+            _storage_put(mk_balance_key(owner), balance)
+            _storage_delete(legacy_balance_key)
+
+    legacy_meta_key = mk_legacy_meta_key(token_id)
+    meta = _storage_get(legacy_meta_key)
+    if len(meta) != 0:
+        if not _is_packed_cutie(meta):
+            legacy: Cutie = deserialize(meta)
+            meta = pack_cutie(legacy)
+        _storage_put(mk_meta_key(token_id), meta)
+        _storage_delete(legacy_meta_key)
+
+    legacy_approval_key = mk_legacy_approval_key(token_id)
+    if len(_storage_get(legacy_approval_key)) != 0:
+        # zero-filled approvals and the ones voided by a v2 transfer are dropped instead of moved
+        approved = get_approved(token_id)
+        if approved != UInt160():
+            _storage_put(mk_approval_key(token_id), approved + get_token_nonce(token_id).to_bytes())
+        _storage_delete(legacy_approval_key)
+
 @public
 def setGame(gameAddr: UInt160) -> None:
+    assert isOwner(), "Access denied"
     put(ADDRESS_GAME, gameAddr)
 
 @public
@@ -284,42 +902,109 @@ def _mint(
         birth_time: int
 ) -> int:
 
-    cutie = Cutie(genes, birth_time, 0, mom_id, dad_id, cooldown_index, generation, 0)
-    tokenId = get(TOKEN_COUNT).to_int() + 1
+    tokenId = _storage_get(TOKEN_COUNT).to_int() + 1
 
     # Check if id can fit into 40 bits TODO: is that needed here? (taken from solidity logic)
     # require(id <= 0xFFFFFFFFFF, "Cutie population overflow");
 
-    put(TOKEN_COUNT, tokenId)
+    _storage_put_int(TOKEN_COUNT, tokenId)
 
-    set_owner_of(tokenId, owner)
+    _store_cutie(tokenId, owner, mom_id, dad_id, generation, cooldown_index, genes, birth_time)
     set_balance(owner, 1)
     add_to_supply(1)
-    add_meta(tokenId, cutie)
-    add_token_account(owner, tokenId)
     post_transfer(None, owner, tokenId, None) # TODO: not sure what it does
 
     return tokenId
 
+def _store_cutie(
+        tokenId: int,
+        owner: UInt160,
+        mom_id: int,
+        dad_id: int,
+        generation: int,
+        cooldown_index: int,
+        genes: int,
+        birth_time: int
+):
+    cutie = Cutie(genes, birth_time, 0, mom_id, dad_id, cooldown_index, generation, 0)
+
+    set_owner_of(tokenId, owner, 0)
+    add_meta(tokenId, cutie)
+    _index_cutie(tokenId, get_meta(tokenId))
+    add_token_account(owner, tokenId)
+
 def _transfer(address_from: UInt160, address_to: UInt160, cutie_id: int):
     assert _is_cutie_owner(cutie_id), "Transfer of token that is not own"
+    _move(address_from, address_to, cutie_id)
+
+def _move(address_from: UInt160, address_to: UInt160, cutie_id: int):
     if (address_from != address_to):
         set_balance(address_from, -1)
         remove_token_account(address_from, cutie_id)
-        _approve(cutie_id, UInt160())
 
         set_balance(address_to, 1)
 
-        set_owner_of(cutie_id, address_to)
+        _change_owner(cutie_id, address_from, address_to)
         add_token_account(address_to, cutie_id)
 
-def _approved_for(spender: UInt160, cutie_id: int) -> bool:
-    approved_address: UInt160 = get(APPROVALS_PREFIX + cast(bytes, cutie_id))
-    return spender == approved_address
+def _change_owner(cutie_id: int, address_from: UInt160, address_to: UInt160):
+    # bumping the nonce voids the approval without writing to its slot
+    if get_approved(cutie_id) != UInt160():
+        Approval(address_from, UInt160(), cutie_id)
+    set_owner_of(cutie_id, address_to, get_token_nonce(cutie_id) + 1)
 
-def _approve(cutie_id: int, approved: UInt160):
-    put(APPROVALS_PREFIX + cast(bytes, cutie_id), approved)
-    Approval(ownerOf(cutie_id), approved, cutie_id)
+def _is_approved_spender(cutie_id: int) -> bool:
+    # the approved address is either the calling contract or a signer of the transaction
+    approved_address = get_approved(cutie_id)
+    if approved_address == UInt160():
+        return False
+    return approved_address == calling_script_hash or check_witness(approved_address)
+
+def _can_burn(owner: UInt160) -> bool:
+    return check_witness(owner) or _is_approved_operator(owner) or isGame()
+
+def _check_not_on_auction(owner: UInt160, cutie_id: int):
+    # a game auction leaves the cutie with its seller, the game only holds an approval or an
+    # operator grant; only then is the game asked, burning would strand the auction record
+    game: UInt160 = get(ADDRESS_GAME)
+    if len(game) == 0:
+        return
+    if get_approved(cutie_id) == game or _is_operator(owner, game):
+        assert not cast(bool, call_contract(game, 'has_auction', [cutie_id])), 'Cutie is on auction'
+
+def _burn(owner: UInt160, cutie_id: int):
+    # balance and supply are left to the caller, so batches write them once;
+    # the approval goes first, its liveness is read from the token nonce
+    _approve(owner, cutie_id, UInt160())
+    remove_token_account(owner, cutie_id)
+    _storage_delete(mk_token_key(cutie_id))
+    _drop_legacy(mk_legacy_token_key(cutie_id))
+    _unindex_cutie(cutie_id, get_meta(cutie_id))
+    _storage_delete(mk_meta_key(cutie_id))
+    _drop_legacy(mk_legacy_meta_key(cutie_id))
+
+def _is_operator(owner: UInt160, operator: UInt160) -> bool:
+    return len(_storage_get(get_operator_approval_key(owner, operator))) != 0
+
+def _is_approved_operator(owner: UInt160) -> bool:
+    # the operator is either the calling contract or the signed sender of the transaction
+    if _is_operator(owner, calling_script_hash):
+        return True
+    tx = cast(Transaction, script_container)
+    return _is_operator(owner, tx.sender) and check_witness(tx.sender)
+
+def _approve(owner: UInt160, cutie_id: int, approved: UInt160):
+    # approving the zero address clears the slot instead of zero-filling it
+    key = mk_approval_key(cutie_id)
+    if approved != UInt160():
+        _storage_put(key, approved + get_token_nonce(cutie_id).to_bytes())
+        Approval(owner, approved, cutie_id)
+    else:
+        if get_approved(cutie_id) != UInt160():
+            Approval(owner, approved, cutie_id)
+        if len(_storage_get(key)) != 0:
+            _storage_delete(key)
+    _drop_legacy(mk_legacy_approval_key(cutie_id))
 
 @public(safe=True)
 def ownerOf(tokenId: int) -> UInt160:
@@ -336,43 +1021,118 @@ def ownerOf(tokenId: int) -> UInt160:
 #     owner: UInt160 = get_owner_of(token_id)
 #     return owner == UInt160(tx.sender)
 
+def _collect_page(tokens: Iterator, cursor: bytes, limit: int, token_ids: List[int]) -> int:
+    # appends the ids of the keys that sort after `cursor` to `token_ids` until it holds `limit`
+    # ids, returns the next cursor or 0
+    after = len(cursor) == 0
+    next_cursor = 0
+    while next_cursor == 0 and tokens.next():
+        key = cast(bytes, tokens.value)
+        if not after:
+            # storage iterators can't seek, skip the keys up to the cursor one, which may be gone
+            after = _sorts_after(key, cursor)
+        if after:
+            if len(token_ids) == limit:
+                next_cursor = token_ids[limit - 1]
+            else:
+                token_ids.append(key.to_int())
+    return next_cursor
+
+def _sorts_after(key: bytes, cursor: bytes) -> bool:
+    # the byte order storage iterators return the keys in
+    size = len(key)
+    if len(cursor) < size:
+        size = len(cursor)
+    index = 0
+    while index < size:
+        if key[index] != cursor[index]:
+            return key[index] > cursor[index]
+        index += 1
+    return len(key) > len(cursor)
+
 def _is_cutie_owner(token_id: int) -> bool:
     return check_witness(get_owner_of(token_id))
 
 def remove_token_account(holder: UInt160, tokenId: int):
     key = mk_account_key(holder) + cast(bytes, tokenId)
-    delete(key)
+    _storage_delete(key)
+    _drop_legacy(mk_legacy_account_key(holder) + cast(bytes, tokenId))
+    generation = _generation_of(get_meta(tokenId))
+    _storage_delete(mk_owner_generation_index_key(holder, generation) + cast(bytes, tokenId))
 
 def add_token_account(holder: UInt160, tokenId: int):
+    # the key already carries the token id
     key = mk_account_key(holder) + cast(bytes, tokenId)
-    put(key, tokenId)
+    _storage_put(key, b'')
+    _index_owner_generation(holder, tokenId)
+
+def _index_owner_generation(holder: UInt160, tokenId: int):
+    generation = _generation_of(get_meta(tokenId))
+    _storage_put(mk_owner_generation_index_key(holder, generation) + cast(bytes, tokenId), b'')
+
+def _index_cutie(tokenId: int, meta: bytes):
+    # the owner + generation entry follows the owner index, see `add_token_account`
+    _storage_put(mk_generation_index_key(_generation_of(meta)) + cast(bytes, tokenId), b'')
+    _storage_put(mk_cooldown_index_key(_cooldown_end_of(meta)) + cast(bytes, tokenId), b'')
+
+def _unindex_cutie(tokenId: int, meta: bytes):
+    _storage_delete(mk_generation_index_key(_generation_of(meta)) + cast(bytes, tokenId))
+    _storage_delete(mk_cooldown_index_key(_cooldown_end_of(meta)) + cast(bytes, tokenId))
+
+def get_token_record(tokenId: int) -> bytes:
+    return _storage_get_migrating(mk_token_key(tokenId), mk_legacy_token_key(tokenId))
 
 def get_owner_of(tokenId: int) -> UInt160:
-    key = mk_token_key(tokenId)
-    owner = get(key)
-    return UInt160(owner)
+    record = get_token_record(tokenId)
+    if len(record) > 20:
+        record = record[:20]
+    return UInt160(record)
+
+def get_token_nonce(tokenId: int) -> int:
+    return _read_nonce(get_token_record(tokenId))
 
-def set_owner_of(tokenId: int, owner: UInt160):
+def set_owner_of(tokenId: int, owner: UInt160, nonce: int):
     key = mk_token_key(tokenId)
-    put(key, owner)
+    _storage_put(key, owner + nonce.to_bytes())
+    _drop_legacy(mk_legacy_token_key(tokenId))
+
+def get_approved(tokenId: int) -> UInt160:
+    # an approval only holds while the token keeps the nonce it was granted at
+    record = _storage_get_migrating(mk_approval_key(tokenId), mk_legacy_approval_key(tokenId))
+    return _live_approval(record, tokenId)
+
+def _live_approval(record: bytes, tokenId: int) -> UInt160:
+    # the approved address while `record` is still valid for the token, the zero address otherwise
+    if len(record) < 20 or _read_nonce(record) != get_token_nonce(tokenId):
+        return UInt160()
+    return UInt160(record[:20])
+
+def _read_nonce(record: bytes) -> int:
+    # the nonce follows the 20 bytes address, a missing one reads as 0
+    if len(record) <= 20:
+        return 0
+    return record[20:].to_int()
+
+def get_balance(owner: UInt160) -> bytes:
+    return _storage_get_migrating(mk_balance_key(owner), mk_legacy_balance_key(owner))
 
 def add_to_supply(amount: int):
-    total = totalSupply() + (amount)
-    put(SUPPLY_PREFIX, total)
+    total = _storage_get(SUPPLY_PREFIX).to_int() + (amount)
+    _storage_put_int(SUPPLY_PREFIX, total)
 
 def set_balance(owner: UInt160, amount: int):
-    old = balanceOf(owner)
+    key = mk_balance_key(owner)
+    old = get_balance(owner).to_int()
     new = old + (amount)
 
-    key = mk_balance_key(owner)
     if (new > 0):
-        put(key, new)
+        _storage_put_int(key, new)
     else:
-        delete(key)
+        _storage_delete(key)
+    _drop_legacy(mk_legacy_balance_key(owner))
 
 def get_meta(tokenId: int) -> bytes:
-    key = mk_meta_key(tokenId)
-    return get(key)
+    return _storage_get_migrating(mk_meta_key(tokenId), mk_legacy_meta_key(tokenId))
 
 def _exists(token_id: int) -> bool:
     metaBytes = get_meta(token_id)
@@ -380,12 +1140,60 @@ def _exists(token_id: int) -> bool:
 
 def add_meta(tokenId: int, meta: Cutie):
     key = mk_meta_key(tokenId)
-    put(key, serialize(meta))
+    _storage_put(key, pack_cutie(meta))
+
+## storage access
+
+# Values read or written during the current invocation. Static fields are re-initialised on every
+# call into the contract, so entries never outlive it. Every entry point finishes its storage work
+# before calling out to other contracts, which keeps re-entrant calls from seeing stale values.
+STORAGE_CACHE: Dict[bytes, bytes] = {}
+
+def _storage_get(key: bytes) -> bytes:
+    cache = STORAGE_CACHE
+    if key in cache:
+        return cache[key]
+    value = get(key)
+    cache[key] = value
+    return value
+
+def _storage_put(key: bytes, value: bytes):
+    put(key, value)
+    cache = STORAGE_CACHE
+    cache[key] = value
+
+def _storage_put_int(key: bytes, value: int):
+    put(key, value)
+    cache = STORAGE_CACHE
+    cache[key] = value.to_bytes()
+
+def _storage_delete(key: bytes):
+    delete(key)
+    cache = STORAGE_CACHE
+    cache[key] = b''
+
+def _is_storage_migrated() -> bool:
+    return _storage_get(SCHEMA_VERSION).to_int() == STORAGE_SCHEMA_VERSION
+
+def _storage_get_migrating(key: bytes, legacy_key: bytes) -> bytes:
+    # v2 entries win, the v1 key is only read while `migrate_storage` is pending
+    value = _storage_get(key)
+    if len(value) == 0 and not _is_storage_migrated():
+        value = _storage_get(legacy_key)
+    return value
+
+def _drop_legacy(legacy_key: bytes):
+    # writers move an entry to its v2 key, so its v1 copy must not be read again
+    if not _is_storage_migrated() and len(_storage_get(legacy_key)) != 0:
+        _storage_delete(legacy_key)
 
 ## helpers
 
 def get_operator_approval_key(owner: UInt160, spender: UInt160) -> bytes:
-    return OPERATOR_APPROVALS_PREFIX + owner + b'_' + spender
+    return OPERATOR_APPROVALS_PREFIX + owner + spender
+
+def mk_approval_key(tokenId: int) -> bytes:
+    return APPROVALS_PREFIX + cast(bytes, tokenId)
 
 def mk_account_key(address: UInt160) -> bytes:
     return ACCOUNT_PREFIX + address
@@ -399,6 +1207,30 @@ def mk_token_key(tokenId: int) -> bytes:
 def mk_meta_key(tokenId: int) -> bytes:
     return META_PREFIX + cast(bytes, tokenId)
 
+def mk_generation_index_key(generation: int) -> bytes:
+    return GENERATION_INDEX_PREFIX + _pack_int(generation, CUTIE_GENERATION_SIZE)
+
+def mk_owner_generation_index_key(address: UInt160, generation: int) -> bytes:
+    return OWNER_GENERATION_INDEX_PREFIX + address + _pack_int(generation, CUTIE_GENERATION_SIZE)
+
+def mk_cooldown_index_key(cooldown_end_time: int) -> bytes:
+    return COOLDOWN_INDEX_PREFIX + _reverse_bytes(_pack_int(cooldown_end_time, CUTIE_COOLDOWN_END_TIME_SIZE))
+
+def mk_legacy_approval_key(tokenId: int) -> bytes:
+    return LEGACY_APPROVALS_PREFIX + cast(bytes, tokenId)
+
+def mk_legacy_account_key(address: UInt160) -> bytes:
+    return LEGACY_ACCOUNT_PREFIX + address
+
+def mk_legacy_balance_key(address: UInt160) -> bytes:
+    return LEGACY_BALANCE_PREFIX + address
+
+def mk_legacy_token_key(tokenId: int) -> bytes:
+    return LEGACY_TOKEN_PREFIX + cast(bytes, tokenId)
+
+def mk_legacy_meta_key(tokenId: int) -> bytes:
+    return LEGACY_META_PREFIX + cast(bytes, tokenId)
+
 def _is_contract_owner() -> bool:
     tx = cast(Transaction, script_container)
     address: UInt160 = get(ADDRESS_OWNER)
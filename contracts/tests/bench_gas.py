@@ -0,0 +1,151 @@
+"""
+GAS regression benchmarks for Core and SomeNFT.
+
+Run from the `contracts` folder:
+
+    python3 -m unittest discover -s tests -p "bench_*.py"
+
+Every scenario records the GAS consumed by its invocation; the compiled NEF sizes and the
+instruction count of every compiled function are recorded as well. The results are written to
+`gas_results.json` and compared with `gas_baseline.json`; a metric that grows by more than
+GAS_BENCH_THRESHOLD (0.05 by default, relative) fails the suite, and so does a metric the
+baseline doesn't have. With GAS_BENCH_UPDATE=1 the results are saved as the new baseline instead;
+a missing baseline fails the suite, so a lost file can't silently turn the comparison off.
+"""
+import json
+import os
+
+import boa3
+from boa3 import constants
+from boa3_test.tests.test_classes.testengine import TestEngine, WitnessScope
+
+from cutie_test import CutieTest
+from tools.nef import instruction_counts, method_ranges, read_debug_info, read_nef
+from tools.payments import OP_BID, OP_CREATE_SALE_AUCTION, encode_payment
+
+
+class GasBenchmark(CutieTest):
+    default_folder: str = 'contracts'
+
+    OWNER_ACCOUNT = b'\x9c\xa5/\x04"{\xf6Z\xe2\xe5\xd1\xffe\x03\xd1\x9dd\xc2\x9cF' # some address generated by tests
+    COZ_ACCOUNT = boa3.neo.to_script_hash(b'NigVWQwT8Mc4ZkxEDsaEtuvL8hZYQFHr5A')
+    BUYER_ACCOUNT = bytes(range(20))
+
+    BATCH_SIZE = 10
+
+    results_dir = os.path.dirname(os.path.abspath(__file__))
+    baseline_path = os.path.join(results_dir, 'gas_baseline.json')
+    results_path = os.path.join(results_dir, 'gas_results.json')
+
+    deployed_contracts = ('SomeNFT', 'Core')
+
+    def prepare_engine(self, engine: TestEngine):
+        engine.add_gas(self.OWNER_ACCOUNT, 1000_00000000)
+        engine.add_gas(self.COZ_ACCOUNT, 1000_00000000)
+        engine.add_gas(self.BUYER_ACCOUNT, 1000_00000000)
+
+        self.run_smart_contract(engine, self.contract_path('SomeNFT'), 'setGame', self.contract_hash('Core'),
+                                signer_accounts=[self.OWNER_ACCOUNT])
+        self.run_smart_contract(engine, self.contract_path('Core'), 'setup', self.contract_hash('SomeNFT'))
+
+    def setUp(self):
+        super().setUp()
+        self.cutie_token_path = self.contract_path('SomeNFT')
+        self.core_path = self.contract_path('Core')
+        self.core_address = self.contract_hash('Core')
+
+    def measure(self, gas: dict, name: str, contract, method: str, *args, signer_accounts=(), per_call: int = 1):
+        self.run_smart_contract(self.engine, contract, method, *args, signer_accounts=signer_accounts)
+        gas[name] = self.engine.gas_consumed // per_call
+
+    def pay_core(self, gas: dict, name: str, account: bytes, amount: int, data: list):
+        self.engine.add_signer_account(account, WitnessScope.Global)
+        self.measure(gas, name, constants.GAS_SCRIPT, 'transfer', account, self.core_address, amount, data,
+                     signer_accounts=[account])
+
+    def run_scenarios(self) -> dict:
+        gas = {}
+        token = self.cutie_token_path
+        core = self.core_path
+
+        self.measure(gas, 'SomeNFT.create_cutie', token, 'create_cutie',
+                     self.COZ_ACCOUNT, 0, 0, 3, 4, 0, 123123123, signer_accounts=[self.OWNER_ACCOUNT])
+        cuties = [[self.COZ_ACCOUNT, 0, 0, 1, 1, genes, 123123123] for genes in range(self.BATCH_SIZE)]
+        self.measure(gas, 'SomeNFT.create_cutie_batch (per cutie)', token, 'create_cutie_batch', cuties,
+                     signer_accounts=[self.OWNER_ACCOUNT], per_call=self.BATCH_SIZE)
+
+        self.measure(gas, 'SomeNFT.get_cutie', token, 'get_cutie', 1)
+        self.measure(gas, 'SomeNFT.ownerOf', token, 'ownerOf', 1)
+        self.measure(gas, 'SomeNFT.balanceOf', token, 'balanceOf', self.COZ_ACCOUNT)
+        self.measure(gas, 'SomeNFT.tokensOfGeneration', token, 'tokensOfGeneration', 1, 0, 10)
+        self.measure(gas, 'SomeNFT.readyTokensPage', token, 'readyTokensPage', b'', 10)
+        self.measure(gas, 'SomeNFT.transfer', token, 'transfer', self.BUYER_ACCOUNT, b'\x02', None,
+                     signer_accounts=[self.COZ_ACCOUNT])
+        self.measure(gas, 'SomeNFT.transfer_from', token, 'transfer_from', self.BUYER_ACCOUNT, self.COZ_ACCOUNT,
+                     b'\x02', None, signer_accounts=[self.BUYER_ACCOUNT])
+        self.measure(gas, 'SomeNFT.delegated_approve', token, 'delegated_approve',
+                     self.COZ_ACCOUNT, self.BUYER_ACCOUNT, 3, signer_accounts=[self.COZ_ACCOUNT])
+
+        self.pay_core(gas, 'Core.onNEP17Payment test_gas', self.COZ_ACCOUNT, 300, ['test_gas', 777])
+        self.pay_core(gas, 'Core.onNEP17Payment cutie_check_witness', self.COZ_ACCOUNT, 300,
+                      ['cutie_check_witness', 1])
+        self.pay_core(gas, 'Core.onNEP17Payment core_check_witness', self.COZ_ACCOUNT, 300,
+                      ['core_check_witness', 1])
+        self.pay_core(gas, 'Core.onNEP17Payment call_delegated_approve_test', self.COZ_ACCOUNT, 300,
+                      ['call_delegated_approve_test', 1, 0, 0, 0])
+        self.pay_core(gas, 'Core.onNEP17Payment _create_sale_auction', self.COZ_ACCOUNT, 300,
+                      ['_create_sale_auction', 1, 9000, 100, 3000000])
+        self.pay_core(gas, 'Core.onNEP17Payment bid', self.BUYER_ACCOUNT, 9000, ['bid', 1])
+        self.pay_core(gas, 'Core.onNEP17Payment compact _create_sale_auction', self.COZ_ACCOUNT, 300,
+                      encode_payment(OP_CREATE_SALE_AUCTION, 4, 9000, 100, 3000000))
+        self.pay_core(gas, 'Core.onNEP17Payment compact bid', self.BUYER_ACCOUNT, 9000, encode_payment(OP_BID, 4))
+
+        self.measure(gas, 'Core.get_auctions', core, 'get_auctions', 0, 10)
+        return gas
+
+    def static_metrics(self) -> dict:
+        nef_size = {}
+        instructions = {}
+        for name, path in (('SomeNFT', self.cutie_token_path), ('Core', self.core_path)):
+            nef_path = path.replace('.py', '.nef')
+            script, nef_size[name] = read_nef(nef_path)
+            with open(path.replace('.py', '.manifest.json')) as manifest_file:
+                manifest = json.load(manifest_file)
+            ranges = method_ranges(manifest, read_debug_info(nef_path), len(script))
+            instructions[name] = instruction_counts(script, ranges)
+        return {'nef_size': nef_size, 'instructions': instructions}
+
+    def find_regressions(self, baseline: dict, results: dict, threshold: float, path: str = '') -> list:
+        regressions = []
+        for key, value in results.items():
+            name = '{0}/{1}'.format(path, key) if path else key
+            if key not in baseline:
+                # an unmeasured metric would never be compared, see GAS_BENCH_UPDATE
+                regressions.append('{0}: missing from the baseline'.format(name))
+            elif isinstance(value, dict):
+                regressions.extend(self.find_regressions(baseline[key], value, threshold, name))
+            elif value > baseline[key] * (1 + threshold):
+                regressions.append('{0}: {1} -> {2}'.format(name, baseline[key], value))
+        return regressions
+
+    def test_gas_regressions(self):
+        results = {'gas': self.run_scenarios()}
+        results.update(self.static_metrics())
+
+        with open(self.results_path, 'w') as results_file:
+            json.dump(results, results_file, indent=2, sort_keys=True)
+
+        if os.environ.get('GAS_BENCH_UPDATE') == '1':
+            with open(self.baseline_path, 'w') as baseline_file:
+                json.dump(results, baseline_file, indent=2, sort_keys=True)
+            return
+
+        self.assertTrue(os.path.isfile(self.baseline_path),
+                        'No {0}, run with GAS_BENCH_UPDATE=1 to create it'.format(self.baseline_path))
+
+        with open(self.baseline_path) as baseline_file:
+            baseline = json.load(baseline_file)
+
+        threshold = float(os.environ.get('GAS_BENCH_THRESHOLD', '0.05'))
+        regressions = self.find_regressions(baseline, results, threshold)
+        self.assertEqual([], regressions, 'GAS regressions above {0:.0%} or unmeasured metrics'.format(threshold))
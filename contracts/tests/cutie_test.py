@@ -1,9 +1,91 @@
+import copy
+import os
+from typing import Any, Dict, Tuple
+
 import boa3
 from boa3_test.tests.boa_test import BoaTest
+from boa3_test.tests.test_classes.storage import Storage, StorageItem
+from boa3_test.tests.test_classes.testengine import TestEngine
+
+from tools.artifacts import compile_cached
+from tools.snapshots import SnapshotSpec, load_snapshot
 
 
 class CutieTest(BoaTest):
     ZERO_ADDRESS = boa3.neo.to_script_hash(b'NKuyBkoGdZZSLyPbJEetheRhMjeznFZszf')
 
+    CONTRACTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'contracts')
+    CONTRACTS_DIR_ENV = 'CUTIE_CONTRACTS_DIR'
+
+    # contracts deployed into the class' base engine, see `prepare_engine`
+    deployed_contracts: Tuple[str, ...] = ()
+
     def test_engine_path(self):
         return '/usr/src/neo-devpack-dotnet/src/Neo.TestEngine/bin/Debug/net6.0'
+
+    def get_output(self, path: str, root_folder: str = None) -> Tuple[bytes, Dict[str, Any]]:
+        # recompiles only when the source or the compiler changed, otherwise restores the cached artifacts
+        compile_cached(path)
+        return super().get_output(path, root_folder)
+
+    def contract_path(self, name: str) -> str:
+        return os.path.join(os.environ.get(self.CONTRACTS_DIR_ENV, self.CONTRACTS_DIR), name + '.py')
+
+    def contract_hash(self, name: str) -> bytes:
+        output, manifest = self.get_output(self.contract_path(name))
+        return boa3.neo.cryptography.hash160(output)
+
+    def storage_put_raw(self, engine: TestEngine, key: bytes, value: bytes, name: str):
+        # `TestEngine.storage_put` serializes bytes values as stack items, this stores them as they are
+        contract_id = engine.storage.get_contract_id(self.contract_hash(name))
+        engine.storage._dict[Storage.build_key(key, contract_id)] = StorageItem(value)
+
+    def dump_storage(self, engine: TestEngine, name: str) -> Dict[bytes, bytes]:
+        contract_id = engine.storage.get_contract_id(self.contract_hash(name))
+        return {key._key: item.value for key, item in engine.storage._dict.items() if key._ID == contract_id}
+
+    def load_snapshot(self, engine: TestEngine, spec: SnapshotSpec, names: Tuple[str, ...] = ('SomeNFT', 'Core')
+                      ) -> Dict[str, Any]:
+        """
+        Replaces the storage of the `names` contracts with a cached snapshot of `spec`, see
+        tools.snapshots, and funds its accounts
+        """
+        snapshot = load_snapshot(self.contract_hash('SomeNFT'), self.contract_hash('Core'), spec)
+        for name in names:
+            contract_id = engine.storage.get_contract_id(self.contract_hash(name))
+            for key in [key for key in engine.storage._dict if key._ID == contract_id]:
+                del engine.storage._dict[key]
+            for key, value in snapshot['storage'][name].items():
+                engine.storage._dict[Storage.build_key(key, contract_id)] = StorageItem(value)
+        for account, amount in snapshot['gas'].items():
+            if amount > 0:
+                engine.add_gas(account, amount)
+        return snapshot
+
+    def prepare_engine(self, engine: TestEngine):
+        """
+        Runs once per test class on the base engine, after `deployed_contracts` were added.
+        Subclasses override it to fund accounts and initialise the contracts.
+        """
+        pass
+
+    def setUp(self):
+        super().setUp()
+        if len(self.deployed_contracts) > 0:
+            self.engine = self.copy_base_engine()
+
+    def copy_base_engine(self) -> TestEngine:
+        cls = type(self)
+        if cls.__dict__.get('_base_engine') is None:
+            engine = TestEngine(self.test_engine_path())
+            for name in cls.deployed_contracts:
+                path = self.contract_path(name)
+                self.get_output(path)
+                engine.add_contract(path.replace('.py', '.nef'))
+            self.prepare_engine(engine)
+            cls._base_engine = engine
+
+        engine = copy.deepcopy(cls._base_engine)
+        engine.reset_state()
+        engine._notifications.clear()  # each test only sees its own events
+        return engine
@@ -0,0 +1,158 @@
+"""
+Load harness measuring SomeNFT throughput, GAS per operation and storage growth against state size.
+
+Run from the `contracts` folder:
+
+    python3 tests/load_harness.py --sizes 1000,10000,100000 [--ops 50] [--owners 100] [--whale-share 0.2]
+                                  [--seed 1] [--csv load.csv] [--snapshot]
+
+The contract state is grown with `create_cutie_batch` up to every size of `--sizes`; `--whale-share`
+of the minted cuties go to a single owner, so one account accumulates 10k+ cuties on large runs.
+At every size a randomized workload of `--ops` mints, transfers, approvals and owner queries is run
+in batches of the same operation, and one CSV row per operation reports operations per second,
+the average GAS per operation and the storage footprint of the contract. With `--snapshot` the
+first size is loaded from a cached snapshot of tools.snapshots spread evenly over `--owners`,
+instead of being minted, and `--whale-share` only applies to the later sizes.
+
+Operations per second are TestEngine throughput: every invocation runs the whole contract state
+through a new engine process, which makes them useful to compare releases, not as chain figures.
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from boa3_test.tests.test_classes.testengine import TestEngine  # noqa: E402
+
+from cutie_test import CutieTest  # noqa: E402
+from tools.snapshots import SnapshotSpec, token_owners  # noqa: E402
+
+BATCH_SIZE = 100  # SomeNFT.MAX_BATCH_SIZE
+PAGE_SIZE = 100
+
+OPERATIONS = ('create_cutie', 'transfer', 'delegated_approve', 'tokensOf', 'tokensOfPage')
+
+CSV_FIELDS = ('state_size', 'operation', 'ops', 'seconds', 'ops_per_second', 'gas_per_op',
+              'storage_keys', 'storage_bytes')
+
+
+class LoadHarness(CutieTest):
+    OWNER_ACCOUNT = b'\x9c\xa5/\x04"{\xf6Z\xe2\xe5\xd1\xffe\x03\xd1\x9dd\xc2\x9cF' # some address generated by tests
+
+    def __init__(self, owners: int, whale_share: float, seed: int):
+        super().__init__()
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.accounts = [bytes([index % 256, index // 256]) + bytes(18) for index in range(1, owners + 1)]
+        self.whale = self.accounts[0]
+        self.whale_share = whale_share
+        self.holders: Dict[int, bytes] = {}
+
+        self.token_path = self.contract_path('SomeNFT')
+        self.get_output(self.token_path)
+        self.engine = TestEngine(self.test_engine_path())
+        self.engine.add_contract(self.token_path.replace('.py', '.nef'))
+
+    def random_owner(self) -> bytes:
+        if self.rng.random() < self.whale_share:
+            return self.whale
+        return self.rng.choice(self.accounts)
+
+    def invoke(self, method: str, *args, signer_accounts=()) -> int:
+        result = self.run_smart_contract(self.engine, self.token_path, method, *args, signer_accounts=signer_accounts)
+        if method == 'create_cutie':
+            self.holders[result] = args[0]
+        return self.engine.gas_consumed
+
+    def grow(self, size: int):
+        while len(self.holders) < size:
+            batch = [[self.random_owner(), 0, 0, 0, 0, self.rng.getrandbits(240), 123123123]
+                     for _ in range(min(BATCH_SIZE, size - len(self.holders)))]
+            token_ids = self.run_smart_contract(self.engine, self.token_path, 'create_cutie_batch', batch,
+                                                signer_accounts=[self.OWNER_ACCOUNT])
+            self.holders.update(zip(token_ids, (spec[0] for spec in batch)))
+
+    def restore(self, size: int):
+        spec = SnapshotSpec(len(self.accounts), size // len(self.accounts), seed=self.seed)
+        snapshot = self.load_snapshot(self.engine, spec, names=('SomeNFT',))
+        self.accounts = snapshot['owners']
+        self.whale = self.accounts[0]
+        self.holders = token_owners(snapshot)
+
+    def run_operation(self, operation: str):
+        if operation == 'create_cutie':
+            return self.invoke('create_cutie', self.random_owner(), 0, 0, 0, 0, self.rng.getrandbits(240), 123123123,
+                               signer_accounts=[self.OWNER_ACCOUNT])
+        if operation in ('tokensOf', 'tokensOfPage'):
+            args = (self.whale,) if operation == 'tokensOf' else (self.whale, 0, PAGE_SIZE)
+            return self.invoke(operation, *args)
+
+        token_id = self.rng.choice(list(self.holders))
+        owner = self.holders[token_id]
+        receiver = self.rng.choice(self.accounts)
+        if operation == 'transfer':
+            gas = self.invoke('transfer', receiver, token_id.to_bytes(8, 'little'), None, signer_accounts=[owner])
+            self.holders[token_id] = receiver
+            return gas
+        return self.invoke('delegated_approve', owner, receiver, token_id, signer_accounts=[owner])
+
+    def measure(self, size: int, ops: int) -> List[Dict[str, object]]:
+        workload = [self.rng.choice(OPERATIONS) for _ in range(ops)]
+        storage = self.dump_storage(self.engine, 'SomeNFT')
+        storage_keys = len(storage)
+        storage_bytes = sum(len(key) + len(value) for key, value in storage.items())
+
+        rows = []
+        for operation in OPERATIONS:
+            # operations of the same kind run as one batch, so the timings aren't mixed
+            count = workload.count(operation)
+            if count == 0:
+                continue
+            gas = 0
+            started = time.perf_counter()
+            for _ in range(count):
+                gas += self.run_operation(operation)
+            seconds = time.perf_counter() - started
+            rows.append({'state_size': size, 'operation': operation, 'ops': count, 'seconds': round(seconds, 3),
+                         'ops_per_second': round(count / seconds, 3), 'gas_per_op': gas // count,
+                         'storage_keys': storage_keys, 'storage_bytes': storage_bytes})
+        return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--sizes', default='1000,10000', help='comma separated token counts to measure at')
+    parser.add_argument('--ops', type=int, default=50, help='operations of the workload at every size')
+    parser.add_argument('--owners', type=int, default=100)
+    parser.add_argument('--whale-share', type=float, default=0.2, help='share of cuties minted to a single owner')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--csv', help='write the rows to this CSV file')
+    parser.add_argument('--snapshot', action='store_true', help='load the first size from a cached snapshot')
+    args = parser.parse_args()
+
+    harness = LoadHarness(args.owners, args.whale_share, args.seed)
+    rows = []
+    sizes = sorted(int(size) for size in args.sizes.split(','))
+    if args.snapshot:
+        harness.restore(sizes[0])
+    for size in sizes:
+        harness.grow(size)
+        rows.extend(harness.measure(size, args.ops))
+
+    writer = csv.DictWriter(sys.stdout, CSV_FIELDS)
+    writer.writeheader()
+    writer.writerows(rows)
+    if args.csv:
+        with open(args.csv, 'w', newline='') as output:
+            writer = csv.DictWriter(output, CSV_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""
+Runs the contract tests on a pool of processes.
+
+Run from the `contracts` folder:
+
+    python3 tests/run_parallel.py [--workers N] [--pattern "test*.py"] [--per-method] [--report report.json]
+
+Tests are sharded by class, so every shard builds its class' base engine once (see
+`CutieTest.copy_base_engine`); with --per-method every test method becomes its own shard.
+Every worker runs in its own temporary directory holding a copy of the contract sources and of
+the artifact cache, so compiled files and TestEngine inputs of different workers never collide.
+The results of all workers are merged into one report with the time spent on every test.
+"""
+import argparse
+import json
+import multiprocessing
+import multiprocessing.util
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from collections import OrderedDict
+from typing import Any, Dict, List
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(TESTS_DIR)
+
+
+class TimedResult(unittest.TestResult):
+    def __init__(self):
+        super().__init__()
+        self.records: List[Dict[str, Any]] = []
+        self._started = 0.0
+
+    def startTest(self, test):
+        super().startTest(test)
+        self._started = time.perf_counter()
+
+    def _record(self, test, status: str, message: str = None):
+        self.records.append({'id': test.id(),
+                             'status': status,
+                             'time': time.perf_counter() - self._started,
+                             'message': message})
+
+    def addSuccess(self, test):
+        super().addSuccess(test)
+        self._record(test, 'ok')
+
+    def addFailure(self, test, err):
+        super().addFailure(test, err)
+        self._record(test, 'fail', self.failures[-1][1])
+
+    def addError(self, test, err):
+        super().addError(test, err)
+        self._record(test, 'error', self.errors[-1][1])
+
+    def addSkip(self, test, reason):
+        super().addSkip(test, reason)
+        self._record(test, 'skip', reason)
+
+    def addExpectedFailure(self, test, err):
+        super().addExpectedFailure(test, err)
+        self._record(test, 'ok')
+
+    def addUnexpectedSuccess(self, test):
+        super().addUnexpectedSuccess(test)
+        self._record(test, 'fail', 'unexpected success')
+
+
+def _init_worker():
+    from cutie_test import CutieTest
+    from tools.artifacts import CACHE_DIR_ENV, cache_dir
+
+    workdir = tempfile.mkdtemp(prefix='cutie-test-')
+    shutil.copytree(os.path.join(ROOT_DIR, 'contracts'), os.path.join(workdir, 'contracts'),
+                    ignore=shutil.ignore_patterns('__pycache__'))
+    worker_cache = os.path.join(workdir, '.artifact-cache')
+    if os.path.isdir(cache_dir()):
+        shutil.copytree(cache_dir(), worker_cache)
+
+    os.environ[CACHE_DIR_ENV] = worker_cache
+    os.environ[CutieTest.CONTRACTS_DIR_ENV] = os.path.join(workdir, 'contracts')
+    # the TestEngine writes its input file into the current directory
+    os.chdir(workdir)
+    multiprocessing.util.Finalize(None, shutil.rmtree, args=(workdir,), kwargs={'ignore_errors': True},
+                                  exitpriority=10)
+
+
+def _run_shard(test_ids: List[str]) -> List[Dict[str, Any]]:
+    suite = unittest.defaultTestLoader.loadTestsFromNames(test_ids)
+    result = TimedResult()
+    suite.run(result)
+    return result.records
+
+
+def _iter_tests(suite):
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            yield from _iter_tests(test)
+        else:
+            yield test
+
+
+def collect_shards(pattern: str, per_method: bool) -> List[List[str]]:
+    suite = unittest.defaultTestLoader.discover(TESTS_DIR, pattern=pattern, top_level_dir=TESTS_DIR)
+    shards: Dict[str, List[str]] = OrderedDict()
+    for test in _iter_tests(suite):
+        if isinstance(test, unittest.loader._FailedTest):
+            raise ImportError(test.id())
+        key = test.id() if per_method else test.id().rsplit('.', 1)[0]
+        shards.setdefault(key, []).append(test.id())
+    return list(shards.values())
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--pattern', default='test*.py')
+    parser.add_argument('--per-method', action='store_true', help='shard by test method instead of by class')
+    parser.add_argument('--report', help='write the merged report to this JSON file')
+    args = parser.parse_args()
+
+    for path in (ROOT_DIR, TESTS_DIR):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+    shards = collect_shards(args.pattern, args.per_method)
+    # longest shards first, so the pool doesn't end up waiting on a big class started last
+    shards.sort(key=len, reverse=True)
+
+    started = time.perf_counter()
+    context = multiprocessing.get_context('spawn')
+    pool = context.Pool(processes=min(args.workers, len(shards)) or 1, initializer=_init_worker)
+    try:
+        records = [record for shard in pool.imap_unordered(_run_shard, shards) for record in shard]
+    finally:
+        # close + join lets the workers run their finalizers and remove their directories
+        pool.close()
+        pool.join()
+    wall_time = time.perf_counter() - started
+
+    records.sort(key=lambda record: record['id'])
+    for record in records:
+        print('{0:<7} {1:8.2f}s  {2}'.format(record['status'], record['time'], record['id']))
+    for record in records:
+        if record['status'] in ('fail', 'error'):
+            print('\n{0}: {1}\n{2}'.format(record['status'].upper(), record['id'], record['message']))
+
+    failed = len([record for record in records if record['status'] in ('fail', 'error')])
+    test_time = sum(record['time'] for record in records)
+    print('\nRan {0} tests in {1:.2f}s wall time ({2:.2f}s of test time), {3} failed'
+          .format(len(records), wall_time, test_time, failed))
+
+    if args.report:
+        with open(args.report, 'w') as report:
+            json.dump({'wall_time': wall_time, 'tests': records}, report, indent=2)
+
+    return 1 if failed > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
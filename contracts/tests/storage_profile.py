@@ -0,0 +1,143 @@
+"""
+Storage footprint profiler and fee projector for SomeNFT.
+
+Run from the `contracts` folder:
+
+    python3 tests/storage_profile.py --owners 10 --cuties 500 --transfers 100 [--seed 1] [--json out.json]
+
+Mints `--cuties` tokens spread over `--owners` accounts, runs `--transfers` random transfers on
+the TestEngine and dumps the contract storage. The report shows the key count, key bytes and
+value bytes of every storage prefix, and projects the storage fee for 1M and 10M tokens from the
+measured bytes per token and per owner.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from boa3_test.tests.test_classes.testengine import TestEngine  # noqa: E402
+
+from cutie_test import CutieTest  # noqa: E402
+
+# storage schema v2 prefixes of SomeNFT, v1 entries left by a pending migration count as 'other'
+PREFIXES: List[Tuple[str, bytes]] = [
+    ('approvals', b'\x01'),
+    ('operator_approvals', b'\x02'),
+    ('account', b'\x03'),
+    ('token', b'\x04'),
+    ('balance', b'\x05'),
+    ('meta', b'\x06'),
+    ('generation_index', b'\x07'),
+    ('owner_generation_index', b'\x08'),
+    ('cooldown_index', b'\x09'),
+]
+# prefixes that grow with the number of holders instead of the number of tokens
+OWNER_PREFIXES = ('balance', 'operator_approvals')
+
+# Neo N3 default StoragePrice: 100000 datoshi (0.001 GAS) for every stored byte of key and value
+STORAGE_PRICE = 100000
+GAS_DECIMALS = 10 ** 8
+
+PROJECTED_TOKENS = (1_000_000, 10_000_000)
+
+
+class StorageProfile(CutieTest):
+    OWNER_ACCOUNT = b'\x9c\xa5/\x04"{\xf6Z\xe2\xe5\xd1\xffe\x03\xd1\x9dd\xc2\x9cF' # some address generated by tests
+
+    def run_scenario(self, owners: int, cuties: int, transfers: int, seed: int) -> TestEngine:
+        rng = random.Random(seed)
+        accounts = [bytes([index % 256, index // 256]) + bytes(18) for index in range(1, owners + 1)]
+        token_path = self.contract_path('SomeNFT')
+        self.get_output(token_path)
+
+        engine = TestEngine(self.test_engine_path())
+        engine.add_contract(token_path.replace('.py', '.nef'))
+
+        holders = {}
+        for first in range(0, cuties, 100):
+            batch = [[accounts[token % owners], 0, 0, 0, 0, rng.getrandbits(240), 123123123]
+                     for token in range(first, min(first + 100, cuties))]
+            token_ids = self.run_smart_contract(engine, token_path, 'create_cutie_batch', batch,
+                                                signer_accounts=[self.OWNER_ACCOUNT])
+            holders.update(zip(token_ids, (spec[0] for spec in batch)))
+
+        for _ in range(transfers):
+            token_id = rng.choice(list(holders))
+            receiver = rng.choice(accounts)
+            self.run_smart_contract(engine, token_path, 'transfer', receiver, token_id.to_bytes(8, 'little'), None,
+                                    signer_accounts=[holders[token_id]])
+            holders[token_id] = receiver
+        return engine
+
+
+def classify(key: bytes) -> str:
+    for name, prefix in PREFIXES:
+        if key.startswith(prefix):
+            return name
+    return 'other'
+
+
+def profile(storage: Dict[bytes, bytes]) -> Dict[str, Dict[str, int]]:
+    report = {name: {'keys': 0, 'key_bytes': 0, 'value_bytes': 0} for name, _ in PREFIXES}
+    report['other'] = {'keys': 0, 'key_bytes': 0, 'value_bytes': 0}
+    for key, value in storage.items():
+        entry = report[classify(key)]
+        entry['keys'] += 1
+        entry['key_bytes'] += len(key)
+        entry['value_bytes'] += len(value)
+    return report
+
+
+def project(report: Dict[str, Dict[str, int]], owners: int, cuties: int) -> Dict[int, int]:
+    """
+    Projects the storage fee in datoshi, keeping the measured owners per token ratio
+    """
+    def size(entry):
+        return entry['key_bytes'] + entry['value_bytes']
+
+    per_owner = sum(size(report[name]) for name in OWNER_PREFIXES) / owners
+    fixed = size(report['other'])
+    per_token = sum(size(entry) for name, entry in report.items()
+                    if name not in OWNER_PREFIXES and name != 'other') / cuties
+
+    projection = {}
+    for tokens in PROJECTED_TOKENS:
+        total_bytes = fixed + per_token * tokens + per_owner * tokens * owners / cuties
+        projection[tokens] = int(total_bytes * STORAGE_PRICE)
+    return projection
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--owners', type=int, default=10)
+    parser.add_argument('--cuties', type=int, default=500)
+    parser.add_argument('--transfers', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='write the report to this JSON file')
+    args = parser.parse_args()
+
+    profiler = StorageProfile()
+    engine = profiler.run_scenario(args.owners, args.cuties, args.transfers, args.seed)
+    report = profile(profiler.dump_storage(engine, 'SomeNFT'))
+    projection = project(report, args.owners, args.cuties)
+
+    print('{0:<20}{1:>10}{2:>14}{3:>14}{4:>14}'.format('prefix', 'keys', 'key bytes', 'value bytes', 'fee (GAS)'))
+    for name, entry in report.items():
+        fee = (entry['key_bytes'] + entry['value_bytes']) * STORAGE_PRICE / GAS_DECIMALS
+        print('{0:<20}{1:>10}{2:>14}{3:>14}{4:>14.4f}'.format(name, entry['keys'], entry['key_bytes'],
+                                                             entry['value_bytes'], fee))
+    for tokens, fee in projection.items():
+        print('projected storage fee for {0:,} tokens: {1:,.2f} GAS'.format(tokens, fee / GAS_DECIMALS))
+
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump({'scenario': vars(args), 'prefixes': report,
+                       'projection': {str(tokens): fee for tokens, fee in projection.items()}}, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
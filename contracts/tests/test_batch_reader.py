@@ -0,0 +1,153 @@
+import asyncio
+import base64
+import unittest
+
+from tools.batch_reader import BatchReader, ReadFault, call_script
+
+try:
+    from aiohttp import web
+    import neo3
+except ImportError:
+    web = None
+
+NFT_HASH = b'\x11' * 20
+COZ_ACCOUNT = b'\x01' * 20
+
+
+def fake_call_script(call):
+    # stands in for the NeoVM script of a call, the fake node only matches it back
+    return repr(call).encode() + b';'
+
+
+def owner_results():
+    owner = {'type': 'ByteString', 'value': base64.b64encode(COZ_ACCOUNT).decode()}
+    results = {(NFT_HASH, 'ownerOf', (token_id,)): owner for token_id in range(1, 11)}
+    results[(NFT_HASH, 'ownerOf', (11,))] = None
+    results[(NFT_HASH, 'balanceOf', (COZ_ACCOUNT,))] = {'type': 'Integer', 'value': '10'}
+    return results
+
+
+class StubNode:
+    """
+    Transport answering `getblockcount` and `invokescript` for scripts made of known calls:
+    `results` maps a call to its stack item, calls mapped to None fault
+    """
+    def __init__(self, results, encode_call=call_script, height=100):
+        self.scripts = {encode_call(call): result for call, result in results.items()}
+        self.height = height
+        self.requests = []
+
+    async def __call__(self, method, params):
+        self.requests.append(method)
+        if method == 'getblockcount':
+            return self.height
+        return self.invoke(base64.b64decode(params[0]))
+
+    async def handle(self, request):
+        body = await request.json()
+        result = await self(body['method'], body['params'])
+        return web.json_response({'jsonrpc': '2.0', 'id': body['id'], 'result': result})
+
+    def invoke(self, script):
+        stack = []
+        while len(script) > 0:
+            call = next(known for known in self.scripts if script.startswith(known))
+            if self.scripts[call] is None:
+                return {'state': 'FAULT', 'exception': 'Owner query for nonexistent token', 'stack': []}
+            stack.append(self.scripts[call])
+            script = script[len(call):]
+        return {'state': 'HALT', 'stack': stack}
+
+
+class TestBatching(unittest.IsolatedAsyncioTestCase):
+    """
+    The batching, fault isolation and caching against an in-process transport
+    """
+    async def asyncSetUp(self):
+        self.node = StubNode(owner_results(), encode_call=fake_call_script)
+        self.reader = BatchReader(NFT_HASH, max_batch=4, height_ttl=0, transport=self.node,
+                                  encode_call=fake_call_script)
+
+    async def asyncTearDown(self):
+        await self.reader.close()
+
+    async def test_window(self):
+        owners = await asyncio.gather(*(self.reader.owner_of(token_id) for token_id in range(1, 4)),
+                                      self.reader.balance_of(COZ_ACCOUNT), self.reader.owner_of(5))
+        self.assertEqual(owners, [COZ_ACCOUNT] * 3 + [10, COZ_ACCOUNT])
+        # the concurrent callers share one height lookup, a full batch of 4 leaves without
+        # waiting for the window, the 5th call goes in the windowed one
+        self.assertEqual(self.node.requests, ['getblockcount', 'invokescript', 'invokescript'])
+
+    async def test_fault_splitting(self):
+        calls = [(NFT_HASH, 'ownerOf', (token_id,)) for token_id in (9, 10, 11)]
+        results = await self.reader.read(calls + [(NFT_HASH, 'balanceOf', (COZ_ACCOUNT,))])
+        self.assertEqual(results[:2], [COZ_ACCOUNT, COZ_ACCOUNT])
+        self.assertIsInstance(results[2], ReadFault)
+        self.assertEqual(results[3], 10)
+        # [9, 10, 11, balance] -> [9, 10] and [11, balance] -> [11] and [balance]
+        self.assertEqual(self.node.requests, ['invokescript'] * 5)
+
+    async def test_height_cache(self):
+        self.assertEqual(await self.reader.owner_of(1), COZ_ACCOUNT)
+        with self.assertRaises(ReadFault):
+            await self.reader.owner_of(11)
+        # results and faults are both cached at the same height
+        self.assertEqual(await self.reader.owner_of(1), COZ_ACCOUNT)
+        with self.assertRaises(ReadFault):
+            await self.reader.owner_of(11)
+        self.assertEqual(self.node.requests, ['getblockcount', 'invokescript'] * 2 + ['getblockcount'] * 2)
+
+        # a new block drops the entries of the older one
+        self.node.height += 1
+        self.assertEqual(await self.reader.owner_of(1), COZ_ACCOUNT)
+        self.assertEqual(self.node.requests[-2:], ['getblockcount', 'invokescript'])
+
+
+@unittest.skipIf(web is None, 'the JSON-RPC transport needs aiohttp and neo-mamba: pip install -r requirements.txt')
+class TestBatchReader(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.node = StubNode(owner_results())
+
+        app = web.Application()
+        app.router.add_post('/', self.node.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.reader = BatchReader(NFT_HASH, url='http://127.0.0.1:{0}'.format(port), max_batch=4)
+
+    async def asyncTearDown(self):
+        await self.reader.close()
+        await self.runner.cleanup()
+
+    async def test_batched_calls(self):
+        owners = await asyncio.gather(*(self.reader.owner_of(token_id) for token_id in range(1, 11)),
+                                      self.reader.balance_of(COZ_ACCOUNT))
+        self.assertEqual(owners, [COZ_ACCOUNT] * 10 + [10])
+        # one height lookup, 11 calls in scripts of up to 4 calls
+        self.assertEqual(self.node.requests, ['getblockcount'] + ['invokescript'] * 3)
+
+        # served from the cache while the height doesn't change
+        self.assertEqual(await self.reader.owner_of(3), COZ_ACCOUNT)
+        self.assertEqual(len(self.node.requests), 4)
+
+    async def test_faults_are_isolated(self):
+        results = await self.reader.read([(NFT_HASH, 'ownerOf', (10,)), (NFT_HASH, 'ownerOf', (11,)),
+                                          (NFT_HASH, 'balanceOf', (COZ_ACCOUNT,))])
+        self.assertEqual(results[0], COZ_ACCOUNT)
+        self.assertIsInstance(results[1], ReadFault)
+        self.assertEqual(results[2], 10)
+
+        with self.assertRaises(ReadFault):
+            await self.reader.owner_of(11)
+
+    async def test_close_waits_for_every_flush(self):
+        await self.reader.block_height()
+        # the 4th and 8th calls start flushes of their own next to the windowed one
+        reads = [asyncio.ensure_future(self.reader.owner_of(token_id)) for token_id in range(1, 11)]
+        await asyncio.sleep(0)
+        await self.reader.close()
+        self.assertEqual(self.node.requests, ['getblockcount'] + ['invokescript'] * 3)
+        self.assertEqual(await asyncio.gather(*reads), [COZ_ACCOUNT] * 10)
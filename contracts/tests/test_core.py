@@ -1,11 +1,11 @@
-import os
-
 import boa3
 from pprint import pprint
 from boa3 import constants
+from boa3_test.tests.test_classes.TestExecutionException import TestExecutionException
 from boa3_test.tests.test_classes.testengine import TestEngine, WitnessScope
 
 from cutie_test import CutieTest
+from tools.payments import OP_BID, OP_CREATE_SALE_AUCTION, encode_payment
 
 
 class TestCore(CutieTest):
@@ -14,27 +14,29 @@ class TestCore(CutieTest):
     # OWNER_ACCOUNT = to_script_hash(b'NigoG6c4gTJcUVZtpY7fZPcCZaA2WiE12m')
     OWNER_ACCOUNT = b'\x9c\xa5/\x04"{\xf6Z\xe2\xe5\xd1\xffe\x03\xd1\x9dd\xc2\x9cF' # some address generated by tests
     COZ_ACCOUNT = boa3.neo.to_script_hash(b'NigVWQwT8Mc4ZkxEDsaEtuvL8hZYQFHr5A')
+    BUYER_ACCOUNT = bytes(range(20))
 
-    # gas transfer case, with default Witness scope is not working (why?!)
-    def test_failing_transfer(self):
-        folders = os.path.abspath(__file__).split(os.sep)
-        self.engine = TestEngine(self.test_engine_path())
+    deployed_contracts = ('SomeNFT', 'Core')
 
-        # init cutie token
-        self.cutie_token_path = self.get_contract_path('/'.join(folders[:-2]), 'contracts', 'SomeNFT')
-        self.engine.add_contract(self.cutie_token_path.replace('.py', '.nef'))
-        output, manifest = self.get_output(self.cutie_token_path)
-        cutie_token_address = boa3.neo.cryptography.hash160(output)
+    def prepare_engine(self, engine: TestEngine):
+        engine.add_gas(self.OWNER_ACCOUNT, 1000_00000000)
+        engine.add_gas(self.COZ_ACCOUNT, 1000_00000000)
+        engine.add_gas(self.BUYER_ACCOUNT, 1000_00000000)
 
-        # init core
-        self.core_path = self.get_contract_path('/'.join(folders[:-2]), 'contracts', 'Core')
-        self.engine.add_contract(self.core_path.replace('.py', '.nef'))
-        output, manifest = self.get_output(self.core_path)
-        self.core_address = boa3.neo.cryptography.hash160(output)
+        # `multicall` is restricted to the registered game
+        self.run_smart_contract(engine, self.contract_path('SomeNFT'), 'setGame', self.contract_hash('Core'),
+                                signer_accounts=[self.OWNER_ACCOUNT])
+        self.run_smart_contract(engine, self.contract_path('Core'), 'setup', self.contract_hash('SomeNFT'),
+                                signer_accounts=[self.OWNER_ACCOUNT])
 
-        self.engine.add_gas(self.OWNER_ACCOUNT, 1000_00000000)
-        self.engine.add_gas(self.COZ_ACCOUNT, 1000_00000000)
+    def setUp(self):
+        super().setUp()
+        self.cutie_token_path = self.contract_path('SomeNFT')
+        self.core_path = self.contract_path('Core')
+        self.core_address = self.contract_hash('Core')
 
+    # gas transfer case, with default Witness scope is not working (why?!)
+    def test_failing_transfer(self):
         self.run_smart_contract(self.engine, constants.GAS_SCRIPT, 'transfer', self.COZ_ACCOUNT, self.core_address, 300, ["test_gas", 777], signer_accounts=[self.COZ_ACCOUNT])
 
         transferEvent = self.engine.get_events('Transfer')
@@ -44,42 +46,147 @@ class TestCore(CutieTest):
 
     # gas transfer case, with GLOBAL Witness scope is working (why?!)
     def test_working_transfer(self):
-        folders = os.path.abspath(__file__).split(os.sep)
-        self.engine = TestEngine(self.test_engine_path())
-
-        # init cutie token
-        self.cutie_token_path = self.get_contract_path('/'.join(folders[:-2]), 'contracts', 'SomeNFT')
-        self.engine.add_contract(self.cutie_token_path.replace('.py', '.nef'))
-        output, manifest = self.get_output(self.cutie_token_path)
-        cutie_token_address = boa3.neo.cryptography.hash160(output)
-
-        # init core
-        self.core_path = self.get_contract_path('/'.join(folders[:-2]), 'contracts', 'Core')
-        self.engine.add_contract(self.core_path.replace('.py', '.nef'))
-        output, manifest = self.get_output(self.core_path)
-        self.core_address = boa3.neo.cryptography.hash160(output)
-
-        self.engine.add_gas(self.OWNER_ACCOUNT, 1000_00000000)
-        self.engine.add_gas(self.COZ_ACCOUNT, 1000_00000000)
-
         self.engine.add_signer_account(self.COZ_ACCOUNT, WitnessScope.Global) # HERE IS THE MAIN DIFFERENCE BETWEEN TWO TESTS
         self.run_smart_contract(self.engine, constants.GAS_SCRIPT, 'transfer', self.COZ_ACCOUNT, self.core_address, 300, ["test_gas", 777], signer_accounts=[self.COZ_ACCOUNT])
 
         transferEvent = self.engine.get_events('Transfer')
         self.assertEqual(transferEvent[0].name, 'Transfer')
         self.assertEqual(transferEvent[0].arguments, (
-            b'\xf9\xbea}\xf1\x96\x11\xa3\xd33a\x9d$\xed\xd0\x92\x8e\x7f\x83\x9b',
-            b')\xb5@\x82\x1d\x12\x19\xeb\xb6\x84+\x88dy4\xfd\xecr\x0eX',
+            self.COZ_ACCOUNT,
+            self.core_address,
             300
         ))
 
         gasTestEvent = self.engine.get_events('GasTestEvent')
         self.assertEqual(gasTestEvent[0].name, 'GasTestEvent')
         self.assertEqual(gasTestEvent[0].arguments, (
-            b'\xf9\xbea}\xf1\x96\x11\xa3\xd33a\x9d$\xed\xd0\x92\x8e\x7f\x83\x9b',
+            self.COZ_ACCOUNT,
             300,
             ['test_gas', 777]
         ))
 
-
-
+    def test_sale_auction(self):
+        self.run_smart_contract(self.engine, self.cutie_token_path, 'create_cutie',
+                                self.COZ_ACCOUNT, 0, 0, 3, 4, 0, 123123123,
+                                signer_accounts=[self.OWNER_ACCOUNT])
+
+        self.engine.add_signer_account(self.COZ_ACCOUNT, WitnessScope.Global)
+        self.run_smart_contract(self.engine, constants.GAS_SCRIPT, 'transfer', self.COZ_ACCOUNT, self.core_address, 300,
+                                ["_create_sale_auction", 1, 9000, 100, 3000000], signer_accounts=[self.COZ_ACCOUNT])
+
+        auction = self.run_smart_contract(self.engine, self.core_path, 'get_auction', 1)
+        self.assertEqual(auction['seller'], self.COZ_ACCOUNT)
+        self.assertEqual(auction['start_price'], 9000)
+        self.assertEqual(auction['end_price'], 100)
+        self.assertLessEqual(auction['current_price'], 9000)
+
+        auctions, cursor = self.run_smart_contract(self.engine, self.core_path, 'get_auctions', 0, 10)
+        self.assertEqual(len(auctions), 1)
+        self.assertEqual(cursor, 0)
+
+        self.engine.add_signer_account(self.BUYER_ACCOUNT, WitnessScope.Global)
+        self.run_smart_contract(self.engine, constants.GAS_SCRIPT, 'transfer', self.BUYER_ACCOUNT, self.core_address, 9000,
+                                ["bid", 1], signer_accounts=[self.BUYER_ACCOUNT])
+
+        auction_events = self.engine.get_events('AuctionSuccessful')
+        self.assertEqual(len(auction_events), 1)
+        self.assertEqual(auction_events[0].arguments[2], self.BUYER_ACCOUNT)
+        self.assertEqual(self.run_smart_contract(self.engine, self.cutie_token_path, 'ownerOf', 1), self.BUYER_ACCOUNT)
+
+        with self.assertRaises(TestExecutionException):
+            self.run_smart_contract(self.engine, self.core_path, 'get_auction', 1)
+
+    def test_auction_pages(self):
+        cuties = [[self.COZ_ACCOUNT, 0, 0, 3, 4, genes, 123123123] for genes in range(3)]
+        self.run_smart_contract(self.engine, self.cutie_token_path, 'create_cutie_batch', cuties,
+                                signer_accounts=[self.OWNER_ACCOUNT])
+        self.engine.add_signer_account(self.COZ_ACCOUNT, WitnessScope.Global)
+        for cutie_id in range(1, 4):
+            self.run_smart_contract(self.engine, constants.GAS_SCRIPT, 'transfer', self.COZ_ACCOUNT, self.core_address,
+                                    300, encode_payment(OP_CREATE_SALE_AUCTION, cutie_id, 9000, 100, 3000000),
+                                    signer_accounts=[self.COZ_ACCOUNT])
+
+        auctions, cursor = self.run_smart_contract(self.engine, self.core_path, 'get_auctions', 0, 1)
+        self.assertEqual((len(auctions), cursor), (1, 1))
+
+        # the page resumes after the cursor even once its auction is closed
+        self.run_smart_contract(self.engine, self.core_path, 'cancel_auction', 1, signer_accounts=[self.COZ_ACCOUNT])
+        auctions, cursor = self.run_smart_contract(self.engine, self.core_path, 'get_auctions', 1, 10)
+        self.assertEqual([auction['cutie_id'] for auction in auctions], [2, 3])
+        self.assertEqual(cursor, 0)
+
+    def test_burn_open_auction(self):
+        self.run_smart_contract(self.engine, self.cutie_token_path, 'create_cutie',
+                                self.COZ_ACCOUNT, 0, 0, 3, 4, 0, 123123123,
+                                signer_accounts=[self.OWNER_ACCOUNT])
+        self.engine.add_signer_account(self.COZ_ACCOUNT, WitnessScope.Global)
+        self.run_smart_contract(self.engine, constants.GAS_SCRIPT, 'transfer', self.COZ_ACCOUNT, self.core_address, 300,
+                                encode_payment(OP_CREATE_SALE_AUCTION, 1, 9000, 100, 3000000),
+                                signer_accounts=[self.COZ_ACCOUNT])
+
+        with self.assertRaises(TestExecutionException):
+            self.run_smart_contract(self.engine, self.cutie_token_path, 'burn', b'\x01',
+                                    signer_accounts=[self.COZ_ACCOUNT])
+
+        self.run_smart_contract(self.engine, self.core_path, 'cancel_auction', 1, signer_accounts=[self.COZ_ACCOUNT])
+        self.run_smart_contract(self.engine, self.cutie_token_path, 'burn', b'\x01',
+                                signer_accounts=[self.COZ_ACCOUNT])
+        self.assertEqual(self.run_smart_contract(self.engine, self.cutie_token_path, 'totalSupply'), 0)
+
+    def test_compact_payments(self):
+        self.run_smart_contract(self.engine, self.cutie_token_path, 'create_cutie',
+                                self.COZ_ACCOUNT, 0, 0, 3, 4, 0, 123123123,
+                                signer_accounts=[self.OWNER_ACCOUNT])
+
+        self.engine.add_signer_account(self.COZ_ACCOUNT, WitnessScope.Global)
+        self.run_smart_contract(self.engine, constants.GAS_SCRIPT, 'transfer', self.COZ_ACCOUNT, self.core_address, 300,
+                                encode_payment(OP_CREATE_SALE_AUCTION, 1, 9000, 100, 3000000),
+                                signer_accounts=[self.COZ_ACCOUNT])
+        auction = self.run_smart_contract(self.engine, self.core_path, 'get_auction', 1)
+        self.assertEqual(auction['start_price'], 9000)
+        self.assertEqual(auction['duration'], 3000000)
+
+        self.engine.add_signer_account(self.BUYER_ACCOUNT, WitnessScope.Global)
+        with self.assertRaises(TestExecutionException):
+            # unknown opcode
+            self.run_smart_contract(self.engine, constants.GAS_SCRIPT, 'transfer', self.BUYER_ACCOUNT,
+                                    self.core_address, 9000, b'\x01\x09', signer_accounts=[self.BUYER_ACCOUNT])
+        self.run_smart_contract(self.engine, constants.GAS_SCRIPT, 'transfer', self.BUYER_ACCOUNT, self.core_address, 9000,
+                                encode_payment(OP_BID, 1), signer_accounts=[self.BUYER_ACCOUNT])
+        self.assertEqual(self.run_smart_contract(self.engine, self.cutie_token_path, 'ownerOf', 1), self.BUYER_ACCOUNT)
+
+    def test_payment_requires_gas(self):
+        self.run_smart_contract(self.engine, self.cutie_token_path, 'create_cutie',
+                                self.COZ_ACCOUNT, 0, 0, 3, 4, 0, 123123123,
+                                signer_accounts=[self.OWNER_ACCOUNT])
+        self.engine.add_signer_account(self.COZ_ACCOUNT, WitnessScope.Global)
+        self.run_smart_contract(self.engine, constants.GAS_SCRIPT, 'transfer', self.COZ_ACCOUNT, self.core_address, 300,
+                                encode_payment(OP_CREATE_SALE_AUCTION, 1, 9000, 100, 3000000),
+                                signer_accounts=[self.COZ_ACCOUNT])
+
+        # a bid called directly, without sending GAS
+        self.engine.add_signer_account(self.BUYER_ACCOUNT, WitnessScope.Global)
+        with self.assertRaises(TestExecutionException):
+            self.run_smart_contract(self.engine, self.core_path, 'onNEP17Payment', self.BUYER_ACCOUNT, 9000,
+                                    encode_payment(OP_BID, 1), signer_accounts=[self.BUYER_ACCOUNT])
+        self.assertEqual(self.run_smart_contract(self.engine, self.cutie_token_path, 'ownerOf', 1), self.COZ_ACCOUNT)
+
+    def test_operator_sale_auction(self):
+        self.run_smart_contract(self.engine, self.cutie_token_path, 'create_cutie',
+                                self.COZ_ACCOUNT, 0, 0, 3, 4, 0, 123123123,
+                                signer_accounts=[self.OWNER_ACCOUNT])
+        self.run_smart_contract(self.engine, self.cutie_token_path, 'setApprovalForAll',
+                                self.COZ_ACCOUNT, self.core_address, True, signer_accounts=[self.COZ_ACCOUNT])
+        payment = encode_payment(OP_CREATE_SALE_AUCTION, 1, 0, 0, 3000000)
+
+        # listing somebody else's cutie, the owner's witness is missing
+        self.engine.add_signer_account(self.BUYER_ACCOUNT, WitnessScope.Global)
+        with self.assertRaises(TestExecutionException):
+            self.run_smart_contract(self.engine, constants.GAS_SCRIPT, 'transfer', self.BUYER_ACCOUNT,
+                                    self.core_address, 300, payment, signer_accounts=[self.BUYER_ACCOUNT])
+
+        self.engine.add_signer_account(self.COZ_ACCOUNT, WitnessScope.Global)
+        self.run_smart_contract(self.engine, constants.GAS_SCRIPT, 'transfer', self.COZ_ACCOUNT, self.core_address, 300,
+                                payment, signer_accounts=[self.COZ_ACCOUNT])
+        self.assertEqual(self.run_smart_contract(self.engine, self.core_path, 'get_auction', 1)['seller'],
+                         self.COZ_ACCOUNT)
@@ -0,0 +1,278 @@
+import random
+import unittest
+
+from boa3 import constants
+from boa3_test.tests.test_classes.TestExecutionException import TestExecutionException
+from boa3_test.tests.test_classes.testengine import TestEngine, WitnessScope
+
+from cutie_test import CutieTest
+from tools.emulator import (DEFAULT_DEPLOYER, GAS_HASH, ContractFault, Emulator, int_to_bytes, random_scenario,
+                            run_step, setup_game)
+from tools.payments import OP_BID, OP_CREATE_SALE_AUCTION, encode_payment
+
+COZ_ACCOUNT = b'\x01' * 20
+BUYER_ACCOUNT = bytes(range(20))
+ACCOUNTS = [COZ_ACCOUNT, BUYER_ACCOUNT, b'\x03' * 20]
+
+START_TIME = 1600000000000
+
+
+def normalize(value):
+    # the TestEngine returns UTF-8 ByteStrings as str and arrays as lists
+    if isinstance(value, str):
+        return value.encode()
+    if isinstance(value, (list, tuple)):
+        return tuple(normalize(element) for element in value)
+    return value
+
+
+class TestEmulator(unittest.TestCase):
+    def setUp(self):
+        self.emulator = Emulator(time=START_TIME)
+        setup_game(self.emulator, DEFAULT_DEPLOYER, ACCOUNTS, 1000_00000000)
+        self.nft = self.emulator.nft_hash
+        self.core = self.emulator.core_hash
+
+    def mint(self, owner: bytes) -> int:
+        return self.emulator.invoke(self.nft, 'create_cutie', owner, 1, 2, 3, 4, 2 ** 200, 123123123,
+                                    signers=[DEFAULT_DEPLOYER])
+
+    def test_int_to_bytes(self):
+        self.assertEqual(int_to_bytes(0), b'')
+        self.assertEqual(int_to_bytes(1), b'\x01')
+        self.assertEqual(int_to_bytes(128), b'\x80\x00')
+        self.assertEqual(int_to_bytes(-1), b'\xff')
+        self.assertEqual(int_to_bytes(-129), b'\x7f\xff')
+
+    def test_mint_and_transfer(self):
+        token_id = self.mint(COZ_ACCOUNT)
+        storage = self.emulator.storage[self.nft]
+        self.assertEqual(storage[b'\x04\x01'], COZ_ACCOUNT)
+        self.assertEqual(storage[b'\x03' + COZ_ACCOUNT + b'\x01'], b'')
+        self.assertEqual(self.emulator.invoke(self.nft, 'get_cutie', token_id),
+                         {'genes': 2 ** 200, 'birth_time': 123123123, 'cooldown_end_time': 0, 'mom_id': 2,
+                          'dad_id': 1, 'cooldown_index': 4, 'generation': 3})
+
+        with self.assertRaises(ContractFault):
+            self.emulator.invoke(self.nft, 'transfer', BUYER_ACCOUNT, b'\x01', None, signers=[BUYER_ACCOUNT])
+        self.emulator.invoke(self.nft, 'transfer', BUYER_ACCOUNT, b'\x01', None, signers=[COZ_ACCOUNT])
+        self.assertEqual(storage[b'\x04\x01'], BUYER_ACCOUNT + b'\x01')
+        self.assertNotIn(b'\x05' + COZ_ACCOUNT, storage)
+        self.assertEqual(self.emulator.events[-1], (self.nft, 'Transfer', (COZ_ACCOUNT, BUYER_ACCOUNT, 1, b'\x01')))
+
+    def test_unsigned_cutie_fields(self):
+        token_id = self.emulator.invoke(self.nft, 'create_cutie', COZ_ACCOUNT, 0, 0, 0xffff, 0, 2 ** 256 - 1,
+                                        123123123, signers=[DEFAULT_DEPLOYER])
+        cutie = self.emulator.invoke(self.nft, 'get_cutie', token_id)
+        self.assertEqual((cutie['genes'], cutie['generation']), (2 ** 256 - 1, 0xffff))
+        self.assertEqual(self.emulator.invoke(self.nft, 'tokensOfGeneration', 0xffff, 0, 10), [[token_id], 0])
+        with self.assertRaises(ContractFault):
+            self.emulator.invoke(self.nft, 'create_cutie', COZ_ACCOUNT, 0, 0, 0, 0, 2 ** 256, 123123123,
+                                 signers=[DEFAULT_DEPLOYER])
+
+    def test_fault_rolls_back(self):
+        self.mint(COZ_ACCOUNT)
+        storage = dict(self.emulator.storage[self.nft])
+        events = list(self.emulator.events)
+        with self.assertRaises(ContractFault):
+            # the first put of delegated_approve happens before its owner check
+            self.emulator.invoke(self.nft, 'delegated_approve', COZ_ACCOUNT, BUYER_ACCOUNT, 1, signers=[BUYER_ACCOUNT])
+        self.assertEqual(self.emulator.storage[self.nft], storage)
+        self.assertEqual(self.emulator.events, events)
+
+    def test_sale_auction(self):
+        self.mint(COZ_ACCOUNT)
+        self.emulator.invoke(GAS_HASH, 'transfer', COZ_ACCOUNT, self.core, 300,
+                             ['_create_sale_auction', 1, 9000, 100, 60000], signers=[COZ_ACCOUNT])
+        self.assertEqual(self.emulator.invoke(self.core, 'get_auction', 1)['current_price'], 9000)
+
+        self.emulator.time += 30000
+        self.emulator.invoke(GAS_HASH, 'transfer', BUYER_ACCOUNT, self.core, 5000, ['bid', 1],
+                             signers=[BUYER_ACCOUNT])
+        self.assertEqual(self.emulator.invoke(self.nft, 'ownerOf', 1), BUYER_ACCOUNT)
+        self.assertEqual(self.emulator.gas[COZ_ACCOUNT], 1000_00000000 - 300 + 4550)
+        self.assertEqual(self.emulator.gas[BUYER_ACCOUNT], 1000_00000000 - 4550)
+        self.assertEqual(self.emulator.events[-1], (self.core, 'AuctionSuccessful', (1, 4550, BUYER_ACCOUNT)))
+
+    def test_operator_sale_auction(self):
+        self.mint(COZ_ACCOUNT)
+        self.emulator.invoke(self.nft, 'setApprovalForAll', COZ_ACCOUNT, self.core, True, signers=[COZ_ACCOUNT])
+        payment = encode_payment(OP_CREATE_SALE_AUCTION, 1, 0, 0, 60000)
+        with self.assertRaises(ContractFault) as fault:
+            # listing somebody else's cutie, the owner's witness is missing
+            self.emulator.invoke(GAS_HASH, 'transfer', BUYER_ACCOUNT, self.core, 300, payment, signers=[BUYER_ACCOUNT])
+        self.assertEqual(str(fault.exception), 'Wrong cutie owner')
+
+        with self.assertRaises(ContractFault):
+            # the seller signs but names a cutie they don't own
+            self.emulator.invoke(self.nft, 'delegated_approve', BUYER_ACCOUNT, self.core, 1,
+                                 signers=[COZ_ACCOUNT, BUYER_ACCOUNT])
+
+        self.emulator.invoke(GAS_HASH, 'transfer', COZ_ACCOUNT, self.core, 300, payment, signers=[COZ_ACCOUNT])
+        self.assertEqual(self.emulator.invoke(self.core, 'get_auction', 1)['seller'], COZ_ACCOUNT)
+        # the operator approval stands in for the per-cutie one
+        self.assertNotIn(b'\x01\x01', self.emulator.storage[self.nft])
+
+    def test_compact_payments(self):
+        self.mint(COZ_ACCOUNT)
+        payload = encode_payment(OP_CREATE_SALE_AUCTION, 1, 9000, 100, 60000)
+        self.assertEqual(len(payload), 31)
+        self.emulator.invoke(GAS_HASH, 'transfer', COZ_ACCOUNT, self.core, 300, payload, signers=[COZ_ACCOUNT])
+        self.assertEqual(self.emulator.invoke(self.core, 'get_auction', 1)['start_price'], 9000)
+
+        with self.assertRaises(ContractFault):
+            self.emulator.invoke(GAS_HASH, 'transfer', BUYER_ACCOUNT, self.core, 9000, payload[:7],
+                                 signers=[BUYER_ACCOUNT])
+        with self.assertRaises(ContractFault):
+            # a bid called directly, without sending GAS
+            self.emulator.invoke(self.core, 'onNEP17Payment', BUYER_ACCOUNT, 9000, encode_payment(OP_BID, 1),
+                                 signers=[BUYER_ACCOUNT])
+        self.emulator.invoke(GAS_HASH, 'transfer', BUYER_ACCOUNT, self.core, 9000, encode_payment(OP_BID, 1),
+                             signers=[BUYER_ACCOUNT])
+        self.assertEqual(self.emulator.invoke(self.nft, 'ownerOf', 1), BUYER_ACCOUNT)
+
+    def test_game_burn(self):
+        cutie_id = self.mint(COZ_ACCOUNT)
+        with self.assertRaises(ContractFault):
+            self.emulator.invoke(self.nft, 'setGame', BUYER_ACCOUNT, signers=[BUYER_ACCOUNT])
+        with self.assertRaises(ContractFault):
+            self.emulator.invoke(self.nft, 'burn', int_to_bytes(cutie_id), signers=[BUYER_ACCOUNT])
+        with self.assertRaises(ContractFault):
+            self.emulator.invoke(self.nft, 'burn', int_to_bytes(cutie_id + 1), signers=[COZ_ACCOUNT])
+
+    def test_burn_open_auction(self):
+        for signers in ([COZ_ACCOUNT], []):
+            cutie_id = self.mint(COZ_ACCOUNT)
+            if not signers:
+                # the operator path leaves no per-cutie approval
+                self.emulator.invoke(self.nft, 'setApprovalForAll', COZ_ACCOUNT, self.core, True,
+                                     signers=[COZ_ACCOUNT])
+            self.emulator.invoke(GAS_HASH, 'transfer', COZ_ACCOUNT, self.core, 300,
+                                 encode_payment(OP_CREATE_SALE_AUCTION, cutie_id, 9000, 100, 60000),
+                                 signers=[COZ_ACCOUNT])
+            with self.assertRaises(ContractFault):
+                self.emulator.invoke(self.nft, 'burn', int_to_bytes(cutie_id), signers=[COZ_ACCOUNT])
+
+            self.emulator.invoke(self.core, 'cancel_auction', cutie_id, signers=[COZ_ACCOUNT])
+            self.emulator.invoke(self.nft, 'burn_batch', [int_to_bytes(cutie_id)], signers=[COZ_ACCOUNT])
+
+    def test_approval_events(self):
+        cutie_id = self.mint(COZ_ACCOUNT)
+        self.emulator.invoke(self.nft, 'delegated_approve', COZ_ACCOUNT, BUYER_ACCOUNT, cutie_id,
+                             signers=[COZ_ACCOUNT])
+        self.emulator.invoke(self.nft, 'burn', int_to_bytes(cutie_id), signers=[COZ_ACCOUNT])
+        approvals = [args for _, name, args in self.emulator.events if name == 'Approval']
+        self.assertEqual(approvals, [(COZ_ACCOUNT, BUYER_ACCOUNT, cutie_id), (COZ_ACCOUNT, bytes(20), cutie_id)])
+
+    def test_owner_of_missing(self):
+        cutie_id = self.mint(COZ_ACCOUNT)
+        self.emulator.invoke(self.nft, 'burn', int_to_bytes(cutie_id), signers=[COZ_ACCOUNT])
+        for token_id in (cutie_id, cutie_id + 1):
+            with self.assertRaises(ContractFault):
+                self.emulator.invoke(self.nft, 'ownerOf', token_id)
+
+    def test_secondary_indexes(self):
+        for owner, generation in ((COZ_ACCOUNT, 1), (COZ_ACCOUNT, 2), (BUYER_ACCOUNT, 1), (COZ_ACCOUNT, 1)):
+            self.emulator.invoke(self.nft, 'create_cutie', owner, 0, 0, generation, 0, 1, 123123123,
+                                 signers=[DEFAULT_DEPLOYER])
+        self.assertEqual(self.emulator.invoke(self.nft, 'tokensOfGeneration', 1, 0, 2), [[1, 3], 3])
+        self.assertEqual(self.emulator.invoke(self.nft, 'tokensOfGeneration', 1, 3, 2), [[4], 0])
+        self.assertEqual(self.emulator.invoke(self.nft, 'tokensOfOwnerGeneration', COZ_ACCOUNT, 1, 0, 10),
+                         [[1, 4], 0])
+
+        self.emulator.invoke(self.nft, 'transfer', BUYER_ACCOUNT, b'\x01', None, signers=[COZ_ACCOUNT])
+        self.emulator.invoke(self.nft, 'burn', b'\x03', signers=[BUYER_ACCOUNT])
+        self.assertEqual(self.emulator.invoke(self.nft, 'tokensOfOwnerGeneration', BUYER_ACCOUNT, 1, 0, 10),
+                         [[1], 0])
+        self.assertEqual(self.emulator.invoke(self.nft, 'tokensOfGeneration', 1, 0, 10), [[1, 4], 0])
+        token_ids, cursor = self.emulator.invoke(self.nft, 'readyTokensPage', b'', 2)
+        self.assertEqual(token_ids, [1, 2])
+        self.assertEqual(self.emulator.invoke(self.nft, 'readyTokensPage', cursor, 2), [[4], b''])
+
+        # cursors resume after their key once their cutie left the index
+        self.assertEqual(self.emulator.invoke(self.nft, 'tokensOfGeneration', 1, 3, 10), [[4], 0])
+        self.emulator.invoke(self.nft, 'burn', b'\x02', signers=[COZ_ACCOUNT])
+        self.assertEqual(self.emulator.invoke(self.nft, 'readyTokensPage', cursor, 2), [[4], b''])
+
+    def test_random_scenarios(self):
+        rng = random.Random(1)
+        for _ in range(50):
+            emulator = Emulator(time=START_TIME)
+            setup_game(emulator, DEFAULT_DEPLOYER, ACCOUNTS, 1000_00000000)
+            for step in random_scenario(rng, ACCOUNTS, DEFAULT_DEPLOYER, emulator.core_hash, 40):
+                run_step(emulator, step)
+
+            # the balance entries always match the account index
+            storage = emulator.storage[emulator.nft_hash]
+            for account in ACCOUNTS + [emulator.core_hash]:
+                tokens = [key for key in storage if key.startswith(b'\x03' + account)]
+                balance = int.from_bytes(storage.get(b'\x05' + account, b''), 'little')
+                self.assertEqual(balance, len(tokens))
+                self.assertEqual(len([key for key in storage if key.startswith(b'\x08' + account)]), balance)
+            # and every cutie is in the generation and cooldown indexes once
+            for prefix in (b'\x07', b'\x09'):
+                self.assertEqual(len([key for key in storage if key[:1] == prefix]), len(
+                    [key for key in storage if key[:1] == b'\x06']))
+
+
+class TestEmulatorDifferential(CutieTest):
+    """
+    Replays random scenarios on the TestEngine and in the emulator, and compares the outcome of
+    every step, the storage of both contracts and their events.
+    """
+    default_folder: str = 'contracts'
+
+    OWNER_ACCOUNT = DEFAULT_DEPLOYER
+
+    SCENARIOS = 3
+    STEPS = 25
+
+    deployed_contracts = ('SomeNFT', 'Core')
+
+    def prepare_engine(self, engine: TestEngine):
+        for account in ACCOUNTS:
+            engine.add_gas(account, 1000_00000000)
+
+        self.run_smart_contract(engine, self.contract_path('SomeNFT'), 'setGame', self.contract_hash('Core'),
+                                signer_accounts=[self.OWNER_ACCOUNT])
+        self.run_smart_contract(engine, self.contract_path('Core'), 'setup', self.contract_hash('SomeNFT'))
+
+    def run_engine_step(self, engine: TestEngine, step, timestamp: int):
+        block = engine.increase_block()
+        block._timestamp = timestamp
+        contract = constants.GAS_SCRIPT if step.contract == 'GAS' else self.contract_path(step.contract)
+        for account in step.signers:
+            # the emulator treats every signer as a global witness
+            engine.add_signer_account(account, WitnessScope.Global)
+        try:
+            return True, self.run_smart_contract(engine, contract, step.method, *step.args,
+                                                 signer_accounts=step.signers)
+        except TestExecutionException as fault:
+            return False, str(fault)
+
+    def test_random_scenarios(self):
+        nft_hash = self.contract_hash('SomeNFT')
+        core_hash = self.contract_hash('Core')
+        origins = {nft_hash: 'SomeNFT', core_hash: 'Core'}
+        rng = random.Random(7)
+
+        for scenario_index in range(self.SCENARIOS):
+            engine = self.copy_base_engine()
+            emulator = Emulator(nft_hash, core_hash, DEFAULT_DEPLOYER, START_TIME)
+            setup_game(emulator, DEFAULT_DEPLOYER, ACCOUNTS, 1000_00000000)
+
+            for step_index, step in enumerate(random_scenario(rng, ACCOUNTS, DEFAULT_DEPLOYER, core_hash,
+                                                              self.STEPS)):
+                halted, result = run_step(emulator, step)
+                engine_halted, engine_result = self.run_engine_step(engine, step, emulator.time)
+                self.assertEqual(engine_halted, halted, 'scenario {0} step {1}: {2} {3} -> {4} / {5}'
+                                 .format(scenario_index, step_index, step.method, step.args, engine_result, result))
+
+            for name, contract_hash in (('SomeNFT', nft_hash), ('Core', core_hash)):
+                self.assertEqual(self.dump_storage(engine, name), emulator.storage[contract_hash])
+
+            engine_events = [(origins[bytes(event.origin)], event.name, normalize(event.arguments))
+                             for event in engine.notifications if bytes(event.origin) in origins]
+            emulator_events = [(origins[origin], name, normalize(args))
+                               for origin, name, args in emulator.events if origin in origins]
+            self.assertEqual(engine_events, emulator_events)
@@ -0,0 +1,129 @@
+import base64
+import sqlite3
+import unittest
+
+from tools.emulator import DEFAULT_DEPLOYER, GAS_HASH, Emulator, setup_game
+from tools.indexer import Indexer
+from tools.payments import OP_BID, OP_CREATE_SALE_AUCTION, encode_payment
+from tools.rpc import encode_param, script_hash_to_hex
+
+COZ_ACCOUNT = b'\x01' * 20
+OTHER_ACCOUNT = b'\x02' * 20
+
+START_TIME = 1600000000000
+
+
+def stack_item(value):
+    # stack items share the JSON shape of contract parameters, except that bytes are ByteString
+    if isinstance(value, bytes):
+        return {'type': 'ByteString', 'value': base64.b64encode(value).decode()}
+    if isinstance(value, list):
+        return {'type': 'Array', 'value': [stack_item(element) for element in value]}
+    if isinstance(value, dict):
+        return {'type': 'Map', 'value': [{'key': stack_item(key), 'value': stack_item(element)}
+                                         for key, element in value.items()]}
+    return encode_param(value)
+
+
+def notification(contract: str, name: str, *args):
+    return {'contract': contract, 'eventname': name, 'state': stack_item(list(args))}
+
+
+def emulated_blocks(emulator: Emulator):
+    """
+    Runs three blocks of transactions in the emulator and returns the notifications of each block:
+    two mints, an approval and an auction, then the winning bid
+    """
+    nft, core = emulator.nft_hash, emulator.core_hash
+    blocks = [
+        [(nft, 'create_cutie', [COZ_ACCOUNT, 0, 0, 3, 4, 2 ** 200, 123123123], DEFAULT_DEPLOYER),
+         (nft, 'create_cutie', [COZ_ACCOUNT, 0, 0, 3, 4, 2 ** 200, 123123123], DEFAULT_DEPLOYER)],
+        [(nft, 'delegated_approve', [COZ_ACCOUNT, OTHER_ACCOUNT, 2], COZ_ACCOUNT),
+         (GAS_HASH, 'transfer', [COZ_ACCOUNT, core, 300, encode_payment(OP_CREATE_SALE_AUCTION, 1, 9000, 9000, 60000)],
+          COZ_ACCOUNT)],
+        [(GAS_HASH, 'transfer', [OTHER_ACCOUNT, core, 9000, encode_payment(OP_BID, 1)], OTHER_ACCOUNT)],
+    ]
+    notifications = []
+    for transactions in blocks:
+        first_event = len(emulator.events)
+        for contract, method, args, signer in transactions:
+            emulator.invoke(contract, method, *args, signers=[signer])
+        notifications.append([notification(script_hash_to_hex(origin), name, *args)
+                              for origin, name, args in emulator.events[first_event:]])
+    return notifications
+
+
+class FakeRpc:
+    """
+    Serves canned blocks: `blocks` maps a height to the list of notifications of its only transaction
+    """
+    def __init__(self, blocks, cuties):
+        self.blocks = blocks
+        self.cuties = cuties
+        self.calls = []
+
+    def call(self, method, *params):
+        return self.batch([(method, list(params))])[0]
+
+    def batch(self, calls):
+        self.calls.append([method for method, _ in calls])
+        return [getattr(self, method)(*params) for method, params in calls]
+
+    def getblockcount(self):
+        return len(self.blocks)
+
+    def getblock(self, height, verbose):
+        return {'index': height, 'tx': [{'hash': 'tx{0}'.format(height)}]}
+
+    def getapplicationlog(self, txid):
+        height = int(txid[2:])
+        return {'executions': [{'vmstate': 'HALT', 'notifications': self.blocks[height]}]}
+
+    def invokefunction(self, contract, method, params):
+        token_ids = [int(item['value']) for item in params[0]['value']]
+        entries = [{b'owner': b'', b'cutie': {key.encode(): value for key, value in self.cuties[token_id].items()}}
+                   for token_id in token_ids]
+        return {'state': 'HALT', 'stack': [stack_item(entries)]}
+
+
+class TestIndexer(unittest.TestCase):
+    def setUp(self):
+        emulator = Emulator(time=START_TIME)
+        setup_game(emulator, DEFAULT_DEPLOYER, [COZ_ACCOUNT, OTHER_ACCOUNT], 1000_00000000)
+        blocks = emulated_blocks(emulator)
+        cuties = {token_id: emulator.invoke(emulator.nft_hash, 'get_cutie', token_id) for token_id in (1, 2)}
+        self.rpc = FakeRpc(blocks, cuties)
+        self.nft_hash = script_hash_to_hex(emulator.nft_hash)
+        self.core_hash = script_hash_to_hex(emulator.core_hash)
+        self.connection = sqlite3.connect(':memory:')
+
+    def test_sync(self):
+        indexer = Indexer(self.connection, self.rpc, self.nft_hash, self.core_hash)
+        self.assertEqual(indexer.sync(batch_size=2), 3)
+
+        self.assertEqual(indexer.owner_tokens(COZ_ACCOUNT), [2])
+        self.assertEqual(indexer.owner_tokens(OTHER_ACCOUNT), [1])
+        self.assertEqual(indexer.balance(COZ_ACCOUNT), 1)
+        self.assertEqual(indexer.balance(OTHER_ACCOUNT), 1)
+        self.assertEqual(indexer.cutie(1)['genes'], 2 ** 200)
+        self.assertEqual(indexer.cutie(2)['generation'], 3)
+
+        # the sale voided the approval of Core, the one of the unsold cutie stands
+        self.assertIsNone(self.connection.execute('SELECT approved FROM tokens WHERE token_id = 1').fetchone()[0])
+        self.assertEqual(self.connection.execute('SELECT approved FROM tokens WHERE token_id = 2').fetchone()[0],
+                         OTHER_ACCOUNT)
+        self.assertEqual(self.connection.execute('SELECT COUNT(*) FROM auctions').fetchone()[0], 0)
+        self.assertEqual(self.connection.execute('SELECT cutie_id, price FROM sales').fetchall(), [(1, 9000)])
+
+        # blocks are requested in batches of 2, logs of every batch in one request
+        self.assertEqual(self.rpc.calls[1:3], [['getblock', 'getblock'], ['getapplicationlog', 'getapplicationlog']])
+
+    def test_resume_from_checkpoint(self):
+        indexer = Indexer(self.connection, self.rpc, self.nft_hash, self.core_hash)
+        self.assertEqual(indexer.sync(batch_size=1, until=2), 2)
+
+        restarted = Indexer(self.connection, self.rpc, self.nft_hash, self.core_hash)
+        self.assertEqual(restarted.next_block(), 2)
+        self.assertEqual(restarted.sync(), 3)
+        self.assertEqual(restarted.balance(COZ_ACCOUNT), 1)
+        self.assertEqual(restarted.owner_tokens(OTHER_ACCOUNT), [1])
@@ -0,0 +1,52 @@
+import unittest
+
+from tools.profiler import Profile, SourceMap, label_steps
+
+CORE_HASH = b'\x22' * 20
+GAS_HASH = b'\x33' * 20
+
+# two functions: onNEP17Payment at 0-9 calling _bid at 10-19
+DEBUG_INFO = {
+    'hash': '0x' + CORE_HASH[::-1].hex(),
+    'documents': ['/src/contracts/Core.py'],
+    'methods': [
+        {'name': 'Core,onNEP17Payment', 'range': '0-9', 'sequence-points': ['0[0]145:4-145:20', '5[0]163:8-163:40']},
+        {'name': 'Core,_bid', 'range': '10-19', 'sequence-points': ['10[0]218:4-218:30', '14[0]229:8-229:60']},
+    ],
+}
+
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.source_maps = {CORE_HASH: SourceMap(DEBUG_INFO)}
+        # (GAS consumed before the instruction, invocation stack from the outermost frame)
+        self.trace = [
+            (0, [(CORE_HASH, 0)]),
+            (10, [(CORE_HASH, 5)]),
+            (20, [(CORE_HASH, 5), (CORE_HASH, 10)]),
+            (50, [(CORE_HASH, 5), (CORE_HASH, 15)]),
+            (60, [(CORE_HASH, 5), (CORE_HASH, 15), (GAS_HASH, 0)]),
+            (1060, [(CORE_HASH, 6)]),
+            (1070, []),
+        ]
+
+    def test_source_map(self):
+        source_map = self.source_maps[CORE_HASH]
+        self.assertEqual(source_map.name, 'Core')
+        self.assertEqual(source_map.function(12), '_bid')
+        self.assertEqual(source_map.line(4), ('Core.py', 145))
+        self.assertEqual(source_map.line(15), ('Core.py', 229))
+
+    def test_profile(self):
+        profile = Profile()
+        for stack, gas in label_steps(self.trace, self.source_maps, lines=True):
+            profile.add(stack, gas)
+
+        self.assertEqual(profile.total(), (1070, 6))
+        functions = profile.functions()
+        self.assertEqual(functions['Core.onNEP17Payment']['gas'], 1070)
+        self.assertEqual(functions['Core.onNEP17Payment']['self_gas'], 30)
+        self.assertEqual(functions['Core._bid']['gas'], 1040)
+        self.assertEqual(functions['Core._bid']['instructions'], 3)
+        self.assertEqual(profile.lines()['Core.py:229'], [10, 1])
+        self.assertIn('Core.onNEP17Payment;Core._bid;0x' + GAS_HASH.hex() + ' 1000', profile.folded())
@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from tools.snapshots import (CACHE_DIR_ENV, SnapshotSpec, checkpoint_invocations, load_snapshot, snapshot_path,
+                             token_owners, transactions)
+
+NFT_HASH = b'\x11' * 20
+CORE_HASH = b'\x22' * 20
+
+AUCTION_PREFIX = b'AUC'
+
+SPEC = SnapshotSpec(owners=20, cuties_per_owner=15, approvals=30, auctions=10)
+
+
+class TestSnapshots(unittest.TestCase):
+    def setUp(self):
+        self.cache = tempfile.TemporaryDirectory()
+        patcher = mock.patch.dict(os.environ, {CACHE_DIR_ENV: self.cache.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.cache.cleanup)
+
+    def test_build_and_cache(self):
+        snapshot = load_snapshot(NFT_HASH, CORE_HASH, SPEC)
+        self.assertTrue(os.path.isfile(snapshot_path(NFT_HASH, CORE_HASH, SPEC)))
+        self.assertEqual(load_snapshot(NFT_HASH, CORE_HASH, SPEC), snapshot)
+
+        owners = token_owners(snapshot)
+        self.assertEqual(len(owners), 300)
+        auctions = [key for key in snapshot['storage']['Core'] if key.startswith(AUCTION_PREFIX)]
+        self.assertEqual(len(auctions), 10)
+        storage = snapshot['storage']['SomeNFT']
+        # auctions approve Core on their cutie
+        self.assertEqual(len([key for key in storage if key[:1] == b'\x01']), 40)
+        for account in snapshot['owners']:
+            balance = int.from_bytes(storage.get(b'\x05' + account, b''), 'little')
+            self.assertEqual(balance, list(owners.values()).count(account))
+
+        # another seed is another snapshot
+        self.assertNotEqual(snapshot_path(NFT_HASH, CORE_HASH, SPEC._replace(seed=2)),
+                            snapshot_path(NFT_HASH, CORE_HASH, SPEC))
+        # and so is a change to the emulator
+        path = snapshot_path(NFT_HASH, CORE_HASH, SPEC)
+        with mock.patch('tools.snapshots.emulator_digest', return_value='0' * 16):
+            self.assertNotEqual(snapshot_path(NFT_HASH, CORE_HASH, SPEC), path)
+
+    def test_checkpoint_transactions(self):
+        invocations = checkpoint_invocations(SPEC, first_id=2)
+        groups = transactions(invocations, 'owner')
+        self.assertEqual([signer for signer, _ in groups], ['owner'] * 1 + ['coz'] * 11)
+        self.assertEqual(sum(len(group) for _, group in groups), len(invocations))
+        self.assertTrue(all('signer' not in invocation for _, group in groups for invocation in group))
+        # the approved and auctioned cuties are the last minted ones
+        self.assertEqual(groups[1][1][0]['args'][2], 2 + 300)
@@ -0,0 +1,381 @@
+import boa3
+from boa3_test.tests.test_classes.TestExecutionException import TestExecutionException
+from boa3_test.tests.test_classes.testengine import TestEngine
+
+from cutie_test import CutieTest
+from tools.snapshots import SnapshotSpec, token_owners
+
+
+class TestSomeNFT(CutieTest):
+    default_folder: str = 'contracts'
+
+    OWNER_ACCOUNT = b'\x9c\xa5/\x04"{\xf6Z\xe2\xe5\xd1\xffe\x03\xd1\x9dd\xc2\x9cF' # some address generated by tests
+    COZ_ACCOUNT = boa3.neo.to_script_hash(b'NigVWQwT8Mc4ZkxEDsaEtuvL8hZYQFHr5A')
+    OTHER_ACCOUNT = bytes(range(20))
+
+    deployed_contracts = ('SomeNFT',)
+
+    def prepare_engine(self, engine: TestEngine):
+        self.run_smart_contract(engine, self.contract_path('SomeNFT'), 'totalSupply')
+
+    def setUp(self):
+        super().setUp()
+        self.cutie_token_path = self.contract_path('SomeNFT')
+
+    def test_create_cutie_batch(self):
+        cuties = [
+            [self.COZ_ACCOUNT, 0, 0, 3, 4, 100, 123123123],
+            [self.OTHER_ACCOUNT, 0, 0, 1, 2, 200, 123123124],
+            [self.COZ_ACCOUNT, 1, 2, 4, 5, 300, 123123125],
+        ]
+        result = self.run_smart_contract(self.engine, self.cutie_token_path, 'create_cutie_batch', cuties,
+                                         signer_accounts=[self.OWNER_ACCOUNT])
+        self.assertEqual([1, 2, 3], result)
+
+        self.assertEqual(len(self.engine.get_events('Transfer')), 3)
+        self.assertEqual(self.run_smart_contract(self.engine, self.cutie_token_path, 'totalSupply'), 3)
+        self.assertEqual(self.run_smart_contract(self.engine, self.cutie_token_path, 'balanceOf', self.COZ_ACCOUNT), 2)
+        self.assertEqual(self.run_smart_contract(self.engine, self.cutie_token_path, 'balanceOf', self.OTHER_ACCOUNT), 1)
+        self.assertEqual(self.run_smart_contract(self.engine, self.cutie_token_path, 'ownerOf', 2), self.OTHER_ACCOUNT)
+
+        cutie = self.run_smart_contract(self.engine, self.cutie_token_path, 'get_cutie', 3)
+        self.assertEqual(cutie['genes'], 300)
+        self.assertEqual(cutie['generation'], 4)
+
+        # the next single mint continues after the batch range
+        result = self.run_smart_contract(self.engine, self.cutie_token_path, 'create_cutie',
+                                         self.COZ_ACCOUNT, 0, 0, 0, 0, 400, 123123126,
+                                         signer_accounts=[self.OWNER_ACCOUNT])
+        self.assertEqual(result, 4)
+
+    def test_packed_cutie_meta(self):
+        self.run_smart_contract(self.engine, self.cutie_token_path, 'create_cutie',
+                                self.COZ_ACCOUNT, 0, 0, 3, 4, 2 ** 200, 123123123,
+                                signer_accounts=[self.OWNER_ACCOUNT])
+        packed = self.engine.storage_get(b'\x06' + b'\x01', self.cutie_token_path)
+        self.assertEqual(len(packed), 71)
+        self.assertEqual(packed[:1], b'\x01')
+
+        cutie = self.run_smart_contract(self.engine, self.cutie_token_path, 'get_cutie', 1)
+        self.assertEqual(cutie['genes'], 2 ** 200)
+        self.assertEqual(cutie['birth_time'], 123123123)
+        self.assertEqual(cutie['generation'], 3)
+        self.assertEqual(cutie['cooldown_index'], 4)
+
+        # fields are unsigned, the top bit of the 32 genes bytes is a genes bit
+        self.run_smart_contract(self.engine, self.cutie_token_path, 'create_cutie',
+                                self.COZ_ACCOUNT, 0, 0, 3, 4, 2 ** 256 - 1, 123123123,
+                                signer_accounts=[self.OWNER_ACCOUNT])
+        cutie = self.run_smart_contract(self.engine, self.cutie_token_path, 'get_cutie', 2)
+        self.assertEqual(cutie['genes'], 2 ** 256 - 1)
+        with self.assertRaises(TestExecutionException):
+            self.run_smart_contract(self.engine, self.cutie_token_path, 'create_cutie',
+                                    self.COZ_ACCOUNT, 0, 0, 3, 4, 2 ** 256, 123123123,
+                                    signer_accounts=[self.OWNER_ACCOUNT])
+
+    def test_migrate_storage(self):
+        self.run_smart_contract(self.engine, self.cutie_token_path, 'create_cutie',
+                                self.COZ_ACCOUNT, 0, 0, 3, 4, 555, 123123123,
+                                signer_accounts=[self.OWNER_ACCOUNT])
+        legacy = {
+            'genes': 777,
+            'birth_time': 123123123,
+            'mom_id': 0,
+            'dad_id': 0,
+            'cooldown_end_time': 0,
+            'cooldown_index': 2,
+            'generation': 1,
+            'optional': 0
+        }
+        # token 2 of OTHER_ACCOUNT, stored with the v1 layout of a contract that was just updated
+        for key, value in ((b'schema_version', b'\x01'), (b'TOKEN_COUNT', b'\x02'), (b'SPP', b'\x02'),
+                           (b'TPF\x02', self.OTHER_ACCOUNT), (b'ACC' + self.OTHER_ACCOUNT + b'\x02', b'\x02'),
+                           (b'BLP' + self.OTHER_ACCOUNT, b'\x01'), (b'approvals_\x02', bytes(20))):
+            self.storage_put_raw(self.engine, key, value, 'SomeNFT')
+        self.engine.storage_put(b'MDP\x02', legacy, self.cutie_token_path)
+
+        # both layouts are readable while the migration is pending
+        self.assertEqual(self.run_smart_contract(self.engine, self.cutie_token_path, 'ownerOf', 2), self.OTHER_ACCOUNT)
+        self.assertEqual(self.run_smart_contract(self.engine, self.cutie_token_path, 'balanceOf', self.OTHER_ACCOUNT), 1)
+        self.assertEqual(self.run_smart_contract(self.engine, self.cutie_token_path, 'get_cutie', 2)['genes'], 777)
+
+        self.run_smart_contract(self.engine, self.cutie_token_path, 'transfer', self.COZ_ACCOUNT, b'\x02', None,
+                                signer_accounts=[self.OTHER_ACCOUNT])
+        self.assertEqual(self.run_smart_contract(self.engine, self.cutie_token_path, 'balanceOf', self.COZ_ACCOUNT), 2)
+        result = self.run_smart_contract(self.engine, self.cutie_token_path, 'tokensOfPage', self.COZ_ACCOUNT, 0, 10)
+        self.assertEqual(sorted(result[0]), [1, 2])
+
+        remaining = self.run_smart_contract(self.engine, self.cutie_token_path, 'migrate_storage', 1,
+                                            signer_accounts=[self.OWNER_ACCOUNT])
+        self.assertEqual(remaining, 1)
+        remaining = self.run_smart_contract(self.engine, self.cutie_token_path, 'migrate_storage', 10,
+                                            signer_accounts=[self.OWNER_ACCOUNT])
+        self.assertEqual(remaining, 0)
+
+        for key in (b'TPF\x02', b'MDP\x02', b'approvals_\x02', b'BLP' + self.OTHER_ACCOUNT):
+            self.assertIsNone(self.engine.storage_get(key, self.cutie_token_path))
+        self.assertEqual(len(self.engine.storage_get(b'\x06\x02', self.cutie_token_path)), 71)
+        self.assertEqual(self.engine.storage_get(b'\x03' + self.COZ_ACCOUNT + b'\x02', self.cutie_token_path), b'')
+
+        cutie = self.run_smart_contract(self.engine, self.cutie_token_path, 'get_cutie', 2)
+        self.assertEqual(cutie['genes'], 777)
+        self.assertEqual(cutie['cooldown_index'], 2)
+        self.assertEqual(self.run_smart_contract(self.engine, self.cutie_token_path, 'ownerOf', 2), self.COZ_ACCOUNT)
+
+    def test_transfer_batch(self):
+        cuties = [[self.COZ_ACCOUNT, 0, 0, 0, 0, genes, 123123123] for genes in range(3)]
+        self.run_smart_contract(self.engine, self.cutie_token_path, 'create_cutie_batch', cuties,
+                                signer_accounts=[self.OWNER_ACCOUNT])
+
+        result = self.run_smart_contract(self.engine, self.cutie_token_path, 'transfer_batch',
+                                         self.COZ_ACCOUNT, self.OTHER_ACCOUNT, [b'\x01', b'\x03'], None,
+                                         signer_accounts=[self.COZ_ACCOUNT])
+        self.assertEqual(result, True)
+
+        transfer_events = self.engine.get_events('Transfer')
+        self.assertEqual(len(transfer_events), 5)
+        self.assertEqual(transfer_events[-1].arguments, (self.COZ_ACCOUNT, self.OTHER_ACCOUNT, 1, b'\x03'))
+
+        self.assertEqual(self.run_smart_contract(self.engine, self.cutie_token_path, 'balanceOf', self.COZ_ACCOUNT), 1)
+        self.assertEqual(self.run_smart_contract(self.engine, self.cutie_token_path, 'balanceOf', self.OTHER_ACCOUNT), 2)
+        self.assertEqual(self.run_smart_contract(self.engine, self.cutie_token_path, 'ownerOf', 3), self.OTHER_ACCOUNT)
+        self.assertEqual(self.run_smart_contract(self.engine, self.cutie_token_path, 'ownerOf', 2), self.COZ_ACCOUNT)
+
+        # a token that is not owned by `_from` rejects the whole batch
+        with self.assertRaises(TestExecutionException):
+            self.run_smart_contract(self.engine, self.cutie_token_path, 'transfer_batch',
+                                    self.COZ_ACCOUNT, self.OTHER_ACCOUNT, [b'\x02', b'\x03'], None,
+                                    signer_accounts=[self.COZ_ACCOUNT])
+        self.assertEqual(self.run_smart_contract(self.engine, self.cutie_token_path, 'ownerOf', 2), self.COZ_ACCOUNT)
+
+    def test_transfer(self):
+        self.run_smart_contract(self.engine, self.cutie_token_path, 'create_cutie',
+                                self.COZ_ACCOUNT, 0, 0, 0, 0, 100, 123123123,
+                                signer_accounts=[self.OWNER_ACCOUNT])
+        result = self.run_smart_contract(self.engine, self.cutie_token_path, 'transfer',
+                                         self.OTHER_ACCOUNT, b'\x01', None,
+                                         signer_accounts=[self.COZ_ACCOUNT])
+        self.assertEqual(result, True)
+
+        # the token had no approval, so there is nothing to revoke
+        self.assertEqual(len(self.engine.get_events('Approval')), 0)
+        transfer_events = self.engine.get_events('Transfer')
+        self.assertEqual(transfer_events[-1].arguments, (self.COZ_ACCOUNT, self.OTHER_ACCOUNT, 1, b'\x01'))
+
+        self.assertEqual(self.run_smart_contract(self.engine, self.cutie_token_path, 'balanceOf', self.COZ_ACCOUNT), 0)
+        self.assertEqual(self.run_smart_contract(self.engine, self.cutie_token_path, 'balanceOf', self.OTHER_ACCOUNT), 1)
+        self.assertEqual(self.run_smart_contract(self.engine, self.cutie_token_path, 'ownerOf', 1), self.OTHER_ACCOUNT)
+
+    def test_operator_approvals(self):
+        cuties = [[self.COZ_ACCOUNT, 0, 0, 0, 0, genes, 123123123] for genes in range(2)]
+        self.run_smart_contract(self.engine, self.cutie_token_path, 'create_cutie_batch', cuties,
+                                signer_accounts=[self.OWNER_ACCOUNT])
+
+        self.run_smart_contract(self.engine, self.cutie_token_path, 'setApprovalForAll',
+                                self.COZ_ACCOUNT, self.OTHER_ACCOUNT, True, signer_accounts=[self.COZ_ACCOUNT])
+        self.assertEqual(self.engine.get_events('ApprovalForAll')[-1].arguments,
+                         (self.COZ_ACCOUNT, self.OTHER_ACCOUNT, True))
+        self.assertEqual(self.run_smart_contract(self.engine, self.cutie_token_path, 'isApprovedForAll',
+                                                 self.COZ_ACCOUNT, self.OTHER_ACCOUNT), True)
+
+        result = self.run_smart_contract(self.engine, self.cutie_token_path, 'transfer_from',
+                                         self.COZ_ACCOUNT, self.OTHER_ACCOUNT, b'\x01', None,
+                                         signer_accounts=[self.OTHER_ACCOUNT])
+        self.assertEqual(result, True)
+        self.assertEqual(self.run_smart_contract(self.engine, self.cutie_token_path, 'ownerOf', 1), self.OTHER_ACCOUNT)
+
+        self.run_smart_contract(self.engine, self.cutie_token_path, 'setApprovalForAll',
+                                self.COZ_ACCOUNT, self.OTHER_ACCOUNT, False, signer_accounts=[self.COZ_ACCOUNT])
+        with self.assertRaises(TestExecutionException):
+            self.run_smart_contract(self.engine, self.cutie_token_path, 'transfer_from',
+                                    self.COZ_ACCOUNT, self.OTHER_ACCOUNT, b'\x02', None,
+                                    signer_accounts=[self.OTHER_ACCOUNT])
+
+    def test_transfer_voids_approval(self):
+        self.run_smart_contract(self.engine, self.cutie_token_path, 'create_cutie',
+                                self.COZ_ACCOUNT, 0, 0, 0, 0, 100, 123123123,
+                                signer_accounts=[self.OWNER_ACCOUNT])
+        self.run_smart_contract(self.engine, self.cutie_token_path, 'delegated_approve',
+                                self.COZ_ACCOUNT, self.OTHER_ACCOUNT, 1, signer_accounts=[self.COZ_ACCOUNT])
+        approval = self.engine.storage_get(b'\x01\x01', self.cutie_token_path)
+
+        # a round trip back to the same owner keeps the slot untouched but bumps the nonce
+        self.run_smart_contract(self.engine, self.cutie_token_path, 'transfer', self.OWNER_ACCOUNT, b'\x01', None,
+                                signer_accounts=[self.COZ_ACCOUNT])
+        self.run_smart_contract(self.engine, self.cutie_token_path, 'transfer', self.COZ_ACCOUNT, b'\x01', None,
+                                signer_accounts=[self.OWNER_ACCOUNT])
+        self.assertEqual(self.engine.storage_get(b'\x01\x01', self.cutie_token_path), approval)
+
+        # the grant, then its revocation by the first transfer
+        approval_events = self.engine.get_events('Approval')
+        self.assertEqual([event.arguments for event in approval_events],
+                         [(self.COZ_ACCOUNT, self.OTHER_ACCOUNT, 1), (self.COZ_ACCOUNT, bytes(20), 1)])
+
+        with self.assertRaises(TestExecutionException):
+            self.run_smart_contract(self.engine, self.cutie_token_path, 'transfer_from',
+                                    self.COZ_ACCOUNT, self.OTHER_ACCOUNT, b'\x01', None,
+                                    signer_accounts=[self.OTHER_ACCOUNT])
+
+    def test_multicall_requires_game(self):
+        self.run_smart_contract(self.engine, self.cutie_token_path, 'create_cutie',
+                                self.COZ_ACCOUNT, 0, 0, 0, 0, 100, 123123123,
+                                signer_accounts=[self.OWNER_ACCOUNT])
+        # only the registered game contract may batch calls, see TestCore.test_sale_auction
+        with self.assertRaises(TestExecutionException):
+            self.run_smart_contract(self.engine, self.cutie_token_path, 'multicall', [['ownerOf', [1]]],
+                                    signer_accounts=[self.OWNER_ACCOUNT])
+
+    def test_set_game_requires_owner(self):
+        with self.assertRaises(TestExecutionException):
+            self.run_smart_contract(self.engine, self.cutie_token_path, 'setGame', self.OTHER_ACCOUNT,
+                                    signer_accounts=[self.OTHER_ACCOUNT])
+
+    def test_burn(self):
+        cuties = [[self.COZ_ACCOUNT, 0, 0, 0, 0, genes, 123123123] for genes in range(3)]
+        self.run_smart_contract(self.engine, self.cutie_token_path, 'create_cutie_batch', cuties,
+                                signer_accounts=[self.OWNER_ACCOUNT])
+
+        with self.assertRaises(TestExecutionException):
+            self.run_smart_contract(self.engine, self.cutie_token_path, 'burn', b'\x01',
+                                    signer_accounts=[self.OTHER_ACCOUNT])
+        with self.assertRaises(TestExecutionException):
+            self.run_smart_contract(self.engine, self.cutie_token_path, 'burn', b'\x04',
+                                    signer_accounts=[self.COZ_ACCOUNT])
+
+        self.run_smart_contract(self.engine, self.cutie_token_path, 'burn', b'\x01',
+                                signer_accounts=[self.COZ_ACCOUNT])
+        self.run_smart_contract(self.engine, self.cutie_token_path, 'burn_batch', [b'\x02', b'\x03'],
+                                signer_accounts=[self.COZ_ACCOUNT])
+
+        self.assertEqual(self.engine.get_events('Transfer')[-1].arguments, (self.COZ_ACCOUNT, None, 1, b'\x03'))
+        self.assertEqual(self.run_smart_contract(self.engine, self.cutie_token_path, 'totalSupply'), 0)
+        self.assertEqual(self.run_smart_contract(self.engine, self.cutie_token_path, 'balanceOf', self.COZ_ACCOUNT), 0)
+        for key in (b'\x04\x01', b'\x06\x02', b'\x03' + self.COZ_ACCOUNT + b'\x03', b'\x05' + self.COZ_ACCOUNT):
+            self.assertIsNone(self.engine.storage_get(key, self.cutie_token_path))
+
+    def test_sweep_approvals(self):
+        cuties = [[self.COZ_ACCOUNT, 0, 0, 0, 0, genes, 123123123] for genes in range(2)]
+        self.run_smart_contract(self.engine, self.cutie_token_path, 'create_cutie_batch', cuties,
+                                signer_accounts=[self.OWNER_ACCOUNT])
+        for token_id in (1, 2):
+            self.run_smart_contract(self.engine, self.cutie_token_path, 'delegated_approve',
+                                    self.COZ_ACCOUNT, self.OTHER_ACCOUNT, token_id, signer_accounts=[self.COZ_ACCOUNT])
+        # voids the approval of token 1, its slot stays behind
+        self.run_smart_contract(self.engine, self.cutie_token_path, 'transfer', self.OTHER_ACCOUNT, b'\x01', None,
+                                signer_accounts=[self.COZ_ACCOUNT])
+
+        remaining = self.run_smart_contract(self.engine, self.cutie_token_path, 'sweep_approvals', 10,
+                                            signer_accounts=[self.OWNER_ACCOUNT])
+        self.assertEqual(remaining, 0)
+        self.assertIsNone(self.engine.storage_get(b'\x01\x01', self.cutie_token_path))
+        self.assertIsNotNone(self.engine.storage_get(b'\x01\x02', self.cutie_token_path))
+
+    def test_tokens_pages(self):
+        cuties = [[self.COZ_ACCOUNT, 0, 0, 0, 0, genes, 123123123] for genes in range(5)]
+        self.run_smart_contract(self.engine, self.cutie_token_path, 'create_cutie_batch', cuties,
+                                signer_accounts=[self.OWNER_ACCOUNT])
+
+        owned = []
+        cursor = 0
+        while True:
+            token_ids, cursor = self.run_smart_contract(self.engine, self.cutie_token_path, 'tokensOfPage',
+                                                        self.COZ_ACCOUNT, cursor, 2)
+            self.assertLessEqual(len(token_ids), 2)
+            owned.extend(token_ids)
+            if cursor == 0:
+                break
+        self.assertEqual(sorted(owned), [1, 2, 3, 4, 5])
+
+        result = self.run_smart_contract(self.engine, self.cutie_token_path, 'tokensPage', 0, 2)
+        self.assertEqual(result, [[1, 2], 2])
+        result = self.run_smart_contract(self.engine, self.cutie_token_path, 'tokensPage', 4, 2)
+        self.assertEqual(result, [[5], 0])
+
+        # burnt ids are skipped, not read as owners
+        self.run_smart_contract(self.engine, self.cutie_token_path, 'burn', b'\x02',
+                                signer_accounts=[self.COZ_ACCOUNT])
+        result = self.run_smart_contract(self.engine, self.cutie_token_path, 'tokensPage', 0, 3)
+        self.assertEqual(result, [[1, 3], 3])
+
+        # the page resumes after the cursor even once its token has left the owner
+        result = self.run_smart_contract(self.engine, self.cutie_token_path, 'tokensOfPage', self.COZ_ACCOUNT, 0, 1)
+        self.assertEqual(result, [[1], 1])
+        self.run_smart_contract(self.engine, self.cutie_token_path, 'transfer', self.OTHER_ACCOUNT, b'\x01', None,
+                                signer_accounts=[self.COZ_ACCOUNT])
+        result = self.run_smart_contract(self.engine, self.cutie_token_path, 'tokensOfPage', self.COZ_ACCOUNT, 1, 10)
+        self.assertEqual(result, [[3, 4, 5], 0])
+
+    def test_get_cuties(self):
+        cuties = [
+            [self.COZ_ACCOUNT, 0, 0, 3, 4, 100, 123123123],
+            [self.OTHER_ACCOUNT, 0, 0, 1, 2, 200, 123123124],
+        ]
+        self.run_smart_contract(self.engine, self.cutie_token_path, 'create_cutie_batch', cuties,
+                                signer_accounts=[self.OWNER_ACCOUNT])
+
+        result = self.run_smart_contract(self.engine, self.cutie_token_path, 'get_cuties', [2, 7, 1])
+        self.assertEqual(len(result), 3)
+        self.assertEqual(result[0]['owner'], self.OTHER_ACCOUNT)
+        self.assertEqual(result[0]['cutie']['genes'], 200)
+        self.assertIsNone(result[1])
+        self.assertEqual(result[2]['owner'], self.COZ_ACCOUNT)
+        self.assertEqual(result[2]['cutie']['generation'], 3)
+
+    def test_secondary_indexes(self):
+        cuties = [[owner, 0, 0, generation, 0, 1, 123123123]
+                  for owner, generation in ((self.COZ_ACCOUNT, 1), (self.COZ_ACCOUNT, 2), (self.OTHER_ACCOUNT, 1),
+                                            (self.COZ_ACCOUNT, 1))]
+        self.run_smart_contract(self.engine, self.cutie_token_path, 'create_cutie_batch', cuties,
+                                signer_accounts=[self.OWNER_ACCOUNT])
+
+        result = self.run_smart_contract(self.engine, self.cutie_token_path, 'tokensOfGeneration', 1, 0, 2)
+        self.assertEqual(result, [[1, 3], 3])
+        result = self.run_smart_contract(self.engine, self.cutie_token_path, 'tokensOfGeneration', 1, 3, 2)
+        self.assertEqual(result, [[4], 0])
+        result = self.run_smart_contract(self.engine, self.cutie_token_path, 'tokensOfOwnerGeneration',
+                                         self.COZ_ACCOUNT, 1, 0, 10)
+        self.assertEqual(result, [[1, 4], 0])
+
+        self.run_smart_contract(self.engine, self.cutie_token_path, 'transfer', self.OTHER_ACCOUNT, b'\x01', None,
+                                signer_accounts=[self.COZ_ACCOUNT])
+        self.run_smart_contract(self.engine, self.cutie_token_path, 'burn', b'\x03',
+                                signer_accounts=[self.OTHER_ACCOUNT])
+        result = self.run_smart_contract(self.engine, self.cutie_token_path, 'tokensOfOwnerGeneration',
+                                         self.OTHER_ACCOUNT, 1, 0, 10)
+        self.assertEqual(result, [[1], 0])
+        # the cursor is an index entry, which the TestEngine may return as str
+        token_ids, cursor = self.run_smart_contract(self.engine, self.cutie_token_path, 'readyTokensPage', b'', 10)
+        self.assertEqual((token_ids, len(cursor)), ([1, 2, 4], 0))
+
+        # cursors resume after their key once their cutie left the index
+        result = self.run_smart_contract(self.engine, self.cutie_token_path, 'tokensOfGeneration', 1, 3, 10)
+        self.assertEqual(result, [[4], 0])
+        token_ids, cursor = self.run_smart_contract(self.engine, self.cutie_token_path, 'readyTokensPage', b'', 1)
+        self.assertEqual(token_ids, [1])
+        self.run_smart_contract(self.engine, self.cutie_token_path, 'burn', b'\x01',
+                                signer_accounts=[self.OTHER_ACCOUNT])
+        token_ids, cursor = self.run_smart_contract(self.engine, self.cutie_token_path, 'readyTokensPage', cursor, 10)
+        self.assertEqual((token_ids, len(cursor)), ([2, 4], 0))
+
+        # rebuilding the indexes of existing cuties leaves them as they are
+        storage = self.dump_storage(self.engine, 'SomeNFT')
+        result = self.run_smart_contract(self.engine, self.cutie_token_path, 'index_cuties', 100,
+                                         signer_accounts=[self.OWNER_ACCOUNT])
+        self.assertEqual(result, 0)
+        self.assertEqual(self.dump_storage(self.engine, 'SomeNFT'), storage)
+
+    def test_large_state_snapshot(self):
+        snapshot = self.load_snapshot(self.engine, SnapshotSpec(owners=50, cuties_per_owner=40, approvals=20),
+                                      names=('SomeNFT',))
+        owners = token_owners(snapshot)
+        self.assertEqual(self.run_smart_contract(self.engine, self.cutie_token_path, 'totalSupply'), 2000)
+        for token_id in (1, 1000, 2000):
+            self.assertEqual(self.run_smart_contract(self.engine, self.cutie_token_path, 'ownerOf', token_id),
+                             owners[token_id])
+
+        owner = owners[1000]
+        self.run_smart_contract(self.engine, self.cutie_token_path, 'transfer', self.COZ_ACCOUNT,
+                                (1000).to_bytes(2, 'little'), None, signer_accounts=[owner])
+        self.assertEqual(self.run_smart_contract(self.engine, self.cutie_token_path, 'balanceOf', owner), 39)
+        result = self.run_smart_contract(self.engine, self.cutie_token_path, 'tokensOfPage', self.COZ_ACCOUNT, 0, 10)
+        self.assertEqual(result, [[1000], 0])
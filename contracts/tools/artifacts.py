@@ -0,0 +1,67 @@
+"""
+Cache of compiled contracts keyed by a hash of the contract source and the compiler version.
+
+The cache lives in `.artifact-cache` next to the contract folders unless CUTIE_ARTIFACT_CACHE
+points somewhere else.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+
+from boa3 import constants
+
+CACHE_DIR_ENV = 'CUTIE_ARTIFACT_CACHE'
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.artifact-cache')
+
+ARTIFACT_SUFFIXES = ('.nef', '.manifest.json', '.nefdbgnfo')
+
+
+def cache_dir() -> str:
+    return os.environ.get(CACHE_DIR_ENV, DEFAULT_CACHE_DIR)
+
+
+def source_key(source_path: str) -> str:
+    digest = hashlib.sha256()
+    digest.update(constants.BOA_VERSION.encode())
+    digest.update(os.path.basename(source_path).encode())
+    with open(source_path, 'rb') as source:
+        digest.update(source.read())
+    return digest.hexdigest()
+
+
+def _artifact_paths(source_path: str):
+    return [source_path.replace('.py', suffix) for suffix in ARTIFACT_SUFFIXES]
+
+
+def _copy(source: str, destination: str):
+    # copy next to the destination and rename, so concurrent readers never see a partial file
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(destination))
+    os.close(fd)
+    shutil.copyfile(source, temp_path)
+    os.replace(temp_path, destination)
+
+
+def compile_cached(source_path: str) -> bool:
+    """
+    Makes sure the .nef, manifest and debug info next to `source_path` match its current source.
+
+    Returns True when the artifacts were restored from the cache, False when the contract had to
+    be compiled.
+    """
+    key = source_key(source_path)
+    directory = cache_dir()
+    cached = [os.path.join(directory, key + suffix) for suffix in ARTIFACT_SUFFIXES]
+
+    if all(os.path.isfile(path) for path in cached):
+        for cached_path, output_path in zip(cached, _artifact_paths(source_path)):
+            _copy(cached_path, output_path)
+        return True
+
+    from boa3.boa3 import Boa3
+    Boa3.compile_and_save(source_path, show_errors=False, debug=True)
+
+    os.makedirs(directory, exist_ok=True)
+    for output_path, cached_path in zip(_artifact_paths(source_path), cached):
+        _copy(output_path, cached_path)
+    return False
@@ -0,0 +1,275 @@
+"""
+Asyncio client batching read-only SomeNFT and Core calls into multi-call `invokescript` requests.
+
+    async with BatchReader(nft_hash, core_hash, url) as reader:
+        owners = await asyncio.gather(*(reader.owner_of(token_id) for token_id in range(1, 101)))
+
+Calls made while a batch is pending are sent together: every call of a batch is appended to one
+script, the node leaves their results on the stack in call order and each result resolves the
+future of its call. A batch that faults is split in halves until the faulting calls are isolated,
+so one missing cutie only fails its own read. Results are cached per block height for a few
+seconds. Connections are pooled and the number of requests in flight is capped.
+
+The JSON-RPC transport and the script encoding can be swapped, which lets tests run the batching
+without a node, aiohttp or neo-mamba; see tests/test_batch_reader.py.
+
+Run from the `contracts` folder against neo-express:
+
+    python3 -m tools.batch_reader --nft 0x... get_cutie 1 2 3
+"""
+import argparse
+import asyncio
+import base64
+import itertools
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Sequence, Set, Tuple
+
+from tools.rpc import DEFAULT_RPC_URL, RpcError, decode_stack_item, hex_to_script_hash
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+try:
+    from neo3.core import types
+    from neo3.vm import ScriptBuilder
+except ImportError:
+    ScriptBuilder = None
+
+# contract, method, args
+Call = Tuple[bytes, str, Tuple[Any, ...]]
+# (method, params) -> result of a JSON-RPC request
+Transport = Callable[[str, List[Any]], Awaitable[Any]]
+
+
+class ReadFault(Exception):
+    """
+    The read faulted on the node, e.g. an `assert` of the called method
+    """
+
+
+def call_script(call: Call) -> bytes:
+    assert ScriptBuilder is not None, 'Encoding calls needs neo-mamba: pip install -r requirements.txt'
+    contract, method, args = call
+    return ScriptBuilder().emit_contract_call_with_args(types.UInt160(contract), method, list(args)).to_array()
+
+
+def _cache_key(value: Any) -> Hashable:
+    if isinstance(value, (list, tuple)):
+        return tuple(_cache_key(element) for element in value)
+    return value
+
+
+class BatchReader:
+    def __init__(self, nft_hash: bytes, core_hash: Optional[bytes] = None, url: str = DEFAULT_RPC_URL,
+                 max_batch: int = 64, max_in_flight: int = 4, max_connections: int = 8,
+                 batch_window: float = 0.002, cache_ttl: float = 5.0, height_ttl: float = 1.0,
+                 timeout: float = 30, transport: Optional[Transport] = None,
+                 encode_call: Callable[[Call], bytes] = call_script):
+        self.nft_hash = nft_hash
+        self.core_hash = core_hash
+        self.url = url
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self.cache_ttl = cache_ttl
+        self.height_ttl = height_ttl
+        self.timeout = timeout
+        self.max_connections = max_connections
+        # JSON-RPC over aiohttp unless another transport is given
+        self.transport: Transport = transport or self._post
+        self.encode_call = encode_call
+
+        self.requests = 0
+        self._session: Optional['aiohttp.ClientSession'] = None
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+        self._ids = itertools.count(1)
+        self._pending: List[Tuple[Call, asyncio.Future]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        # a full batch starts its flush while the windowed one may still be running
+        self._flush_tasks: Set[asyncio.Task] = set()
+        # (height, call) -> (expiry, result or ReadFault)
+        self._cache: Dict[Tuple[int, Hashable], Tuple[float, Any]] = {}
+        self._height: Optional[Tuple[float, int]] = None
+        self._height_task: Optional[asyncio.Future] = None
+
+    async def __aenter__(self) -> 'BatchReader':
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        while len(self._flush_tasks) > 0:
+            await asyncio.gather(*self._flush_tasks)
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    # -------------------------------------------
+    # Contract reads
+    # -------------------------------------------
+
+    async def owner_of(self, token_id: int) -> bytes:
+        return await self.call(self.nft_hash, 'ownerOf', token_id)
+
+    async def balance_of(self, owner: bytes) -> int:
+        return await self.call(self.nft_hash, 'balanceOf', owner)
+
+    async def get_cutie(self, token_id: int) -> Dict[str, int]:
+        cutie = await self.call(self.nft_hash, 'get_cutie', token_id)
+        return {key.decode(): value for key, value in cutie.items()}
+
+    async def get_auction(self, cutie_id: int) -> Dict[str, Any]:
+        assert self.core_hash is not None, 'No Core hash given'
+        auction = await self.call(self.core_hash, 'get_auction', cutie_id)
+        return {key.decode(): value for key, value in auction.items()}
+
+    async def call(self, contract: bytes, method: str, *args) -> Any:
+        """
+        Queues a read-only call into the next batch and waits for its result
+        """
+        call: Call = (contract, method, args)
+        height = await self.block_height()
+        key = (height, _cache_key(call))
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            return self._unwrap(cached[1])
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((call, future))
+        if len(self._pending) >= self.max_batch:
+            self._start_flush(delay=0)
+        elif self._flush_task is None or self._flush_task.done():
+            self._start_flush(delay=self.batch_window)
+
+        result = await future
+        self._cache[key] = time.monotonic() + self.cache_ttl, result
+        return self._unwrap(result)
+
+    async def read(self, calls: Sequence[Call]) -> List[Any]:
+        """
+        Runs `calls` in as few scripts as possible, returns their results in order; a faulted
+        call has a ReadFault in its place
+        """
+        results: List[Any] = [None] * len(calls)
+        batches = [list(range(start, min(start + self.max_batch, len(calls))))
+                   for start in range(0, len(calls), self.max_batch)]
+        outcomes = await asyncio.gather(*(self._run_batch([calls[index] for index in batch]) for batch in batches))
+        for batch, outcome in zip(batches, outcomes):
+            for index, result in zip(batch, outcome):
+                results[index] = result
+        return results
+
+    async def block_height(self) -> int:
+        if self._height is not None and self._height[0] > time.monotonic():
+            return self._height[1]
+        # concurrent callers share one getblockcount request
+        if self._height_task is None or self._height_task.done():
+            self._height_task = asyncio.ensure_future(self._refresh_height())
+        return await asyncio.shield(self._height_task)
+
+    async def _refresh_height(self) -> int:
+        height = await self._rpc('getblockcount', [])
+        if self._height is None or self._height[1] != height:
+            # entries of older blocks can't be hit anymore
+            self._cache = {key: entry for key, entry in self._cache.items() if key[0] == height}
+        self._height = time.monotonic() + self.height_ttl, height
+        return height
+
+    # -------------------------------------------
+    # Batching
+    # -------------------------------------------
+
+    def _start_flush(self, delay: float):
+        self._flush_task = asyncio.ensure_future(self._flush(delay))
+        self._flush_tasks.add(self._flush_task)
+        self._flush_task.add_done_callback(self._flush_tasks.discard)
+
+    async def _flush(self, delay: float):
+        if delay > 0:
+            await asyncio.sleep(delay)
+        pending, self._pending = self._pending, []
+        if len(pending) == 0:
+            return
+
+        tasks = []
+        for start in range(0, len(pending), self.max_batch):
+            tasks.append(self._resolve(pending[start:start + self.max_batch]))
+        await asyncio.gather(*tasks)
+
+    async def _resolve(self, batch: List[Tuple[Call, asyncio.Future]]):
+        try:
+            results = await self._run_batch([call for call, _ in batch])
+        except Exception as error:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _run_batch(self, calls: List[Call]) -> List[Any]:
+        script = b''.join(self.encode_call(call) for call in calls)
+        result = await self._rpc('invokescript', [base64.b64encode(script).decode()])
+        if result['state'] == 'HALT':
+            stack = result['stack']
+            assert len(stack) == len(calls), 'Expected {0} results, got {1}'.format(len(calls), len(stack))
+            return [decode_stack_item(item) for item in stack]
+
+        if len(calls) == 1:
+            return [ReadFault(result.get('exception') or 'FAULT')]
+        # isolate the faulting calls
+        middle = len(calls) // 2
+        first, second = await asyncio.gather(self._run_batch(calls[:middle]), self._run_batch(calls[middle:]))
+        return first + second
+
+    async def _rpc(self, method: str, params: List[Any]) -> Any:
+        async with self._in_flight:
+            self.requests += 1
+            return await self.transport(method, params)
+
+    async def _post(self, method: str, params: List[Any]) -> Any:
+        assert aiohttp is not None, 'The batch reader needs aiohttp: pip install -r requirements.txt'
+        if self._session is None:
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.max_connections),
+                                                  timeout=aiohttp.ClientTimeout(total=self.timeout))
+        payload = {'jsonrpc': '2.0', 'id': next(self._ids), 'method': method, 'params': params}
+        async with self._session.post(self.url, json=payload) as response:
+            response.raise_for_status()
+            body = await response.json(content_type=None)
+        if 'error' in body:
+            raise RpcError(method, body['error'])
+        return body['result']
+
+    @staticmethod
+    def _unwrap(result: Any) -> Any:
+        if isinstance(result, ReadFault):
+            raise result
+        return result
+
+
+async def _main(args) -> int:
+    async with BatchReader(hex_to_script_hash(args.nft), url=args.url) as reader:
+        started = time.perf_counter()
+        results = await asyncio.gather(*(reader.call(reader.nft_hash, args.method, int(token_id))
+                                         for token_id in args.ids), return_exceptions=True)
+        seconds = time.perf_counter() - started
+        for token_id, result in zip(args.ids, results):
+            print(token_id, result)
+        print('{0} reads in {1} requests, {2:.3f}s'.format(len(results), reader.requests, seconds))
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--url', default=DEFAULT_RPC_URL)
+    parser.add_argument('--nft', required=True, help='SomeNFT script hash, 0x-prefixed')
+    parser.add_argument('method', help='a read-only SomeNFT method taking a token id, e.g. ownerOf or get_cutie')
+    parser.add_argument('ids', nargs='+')
+    return asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,188 @@
+"""
+Deploys and initialises SomeNFT and Core on neo-express and saves a ready checkpoint.
+
+Run from the `contracts` folder:
+
+    python3 -m tools.deploy [--checkpoint checkpoints/test] [--init invoke-files/init.neo-invoke.json] [--force]
+
+Contracts are compiled through the artifact cache, so only changed sources are recompiled. When
+neither the compiled contracts nor the init calls changed since the last run, the existing
+checkpoint is kept as is.
+
+Contract hashes are derived from the deployer, the NEF checksum and the manifest name, so the
+deploys and every call of the init file (setGame, setup, seed mints) go into a single owner
+transaction; the GAS funding of the wallets is a second one, as it has to be signed by genesis.
+Both run through one `neoxp batch` on a reset chain, which skips the block waits of build.cmd.
+"""
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Any, Dict, List
+
+from boa3.neo import to_script_hash
+from boa3.neo.cryptography import hash160
+from boa3.neo.vm.opcode.Opcode import Opcode
+
+from tools.artifacts import compile_cached
+from tools.rpc import script_hash_to_hex
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONTRACTS_DIR = os.path.join(ROOT_DIR, 'contracts')
+
+# deployment order, init calls may reference any of them as `#<name>`
+CONTRACTS = ('SomeNFT', 'Core')
+
+FUNDED_WALLETS = ('owner', 'coz')
+FUNDING_AMOUNT = 10000000
+
+
+def push_int(value: int) -> bytes:
+    """
+    Encodes an integer push the way the node's ScriptBuilder does
+    """
+    if -1 <= value <= 16:
+        return bytes([Opcode.PUSH0[0] + value])
+    data = value.to_bytes((value.bit_length() + 8) // 8, 'little', signed=True)
+    for index, size in enumerate((1, 2, 4, 8, 16, 32)):
+        if len(data) <= size:
+            padding = b'\xff' if value < 0 else b'\x00'
+            return bytes([Opcode.PUSHINT8[0] + index]) + data + padding * (size - len(data))
+    raise ValueError('Integer is too large to push')
+
+
+def push_data(data: bytes) -> bytes:
+    assert len(data) < 0x100, 'Only short pushes are needed here'
+    return Opcode.PUSHDATA1 + bytes([len(data)]) + data
+
+
+def contract_hash(sender: bytes, nef_checksum: int, name: str) -> bytes:
+    """
+    Returns the little endian script hash ContractManagement assigns to a deployed contract
+    """
+    return hash160(Opcode.ABORT + push_data(sender) + push_int(nef_checksum) + push_data(name.encode()))
+
+
+def nef_checksum(nef: bytes) -> int:
+    # the checksum is the last field of the NEF format
+    return int.from_bytes(nef[-4:], 'little')
+
+
+def wallet_script_hash(express: Dict[str, Any], wallet_name: str) -> bytes:
+    for wallet in express['wallets']:
+        if wallet['name'] == wallet_name:
+            for account in wallet['accounts']:
+                if account['is-default']:
+                    return to_script_hash(account['script-hash'].encode())
+    raise ValueError('Wallet {0} not found'.format(wallet_name))
+
+
+def read_artifacts(name: str) -> Dict[str, Any]:
+    path = os.path.join(CONTRACTS_DIR, name + '.py')
+    with open(path.replace('.py', '.nef'), 'rb') as nef_file:
+        nef = nef_file.read()
+    with open(path.replace('.py', '.manifest.json')) as manifest_file:
+        manifest = manifest_file.read()
+    return {'nef': nef, 'manifest': manifest, 'name': json.loads(manifest)['name']}
+
+
+def resolve_args(value: Any, hashes: Dict[str, str]) -> Any:
+    # `#<contract>` is resolved by neoxp against deployed contracts, which don't exist yet
+    if isinstance(value, list):
+        return [resolve_args(element, hashes) for element in value]
+    if isinstance(value, str) and value.startswith('#') and value[1:] in hashes:
+        return hashes[value[1:]]
+    return value
+
+
+def bootstrap_invocations(artifacts: Dict[str, Dict[str, Any]], sender: bytes,
+                          init_calls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    hashes = {}
+    invocations = []
+    for name in CONTRACTS:
+        contract = artifacts[name]
+        hashes[name] = script_hash_to_hex(contract_hash(sender, nef_checksum(contract['nef']), contract['name']))
+        invocations.append({'contract': 'ContractManagement',
+                            'operation': 'deploy',
+                            'args': ['0x' + contract['nef'].hex(), contract['manifest']]})
+
+    for call in init_calls:
+        invocations.append({'contract': hashes.get(call['contract'], call['contract']),
+                            'operation': call['operation'],
+                            'args': resolve_args(call.get('args', []), hashes)})
+    return invocations
+
+
+def funding_invocations(wallets, amount: int) -> List[Dict[str, Any]]:
+    return [{'contract': 'GasToken', 'operation': 'transfer',
+             'args': ['@genesis', '@' + wallet, amount * 10 ** 8, None]} for wallet in wallets]
+
+
+def build_stamp(artifacts: Dict[str, Dict[str, Any]], init_calls: List[Dict[str, Any]]) -> str:
+    digest = hashlib.sha256()
+    for name in CONTRACTS:
+        digest.update(artifacts[name]['nef'])
+        digest.update(artifacts[name]['manifest'].encode())
+    digest.update(json.dumps([init_calls, FUNDED_WALLETS, FUNDING_AMOUNT], sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--input', default=os.path.join(ROOT_DIR, 'default.neo-express'))
+    parser.add_argument('--checkpoint', default=os.path.join(ROOT_DIR, 'checkpoints', 'test'))
+    parser.add_argument('--init', default=os.path.join(ROOT_DIR, 'invoke-files', 'init.neo-invoke.json'))
+    parser.add_argument('--deployer', default='owner', help='wallet that deploys and owns the contracts')
+    parser.add_argument('--neoxp', default='neoxp')
+    parser.add_argument('--force', action='store_true', help='rebuild the checkpoint even if nothing changed')
+    args = parser.parse_args()
+
+    for name in CONTRACTS:
+        cached = compile_cached(os.path.join(CONTRACTS_DIR, name + '.py'))
+        print('{0}: {1}'.format(name, 'cached' if cached else 'compiled'))
+    artifacts = {name: read_artifacts(name) for name in CONTRACTS}
+
+    with open(args.init) as init_file:
+        init_calls = json.load(init_file)
+    with open(args.input) as express_file:
+        express = json.load(express_file)
+
+    checkpoint_path = args.checkpoint + '.neoxp-checkpoint'
+    stamp_path = args.checkpoint + '.stamp'
+    stamp = build_stamp(artifacts, init_calls)
+    if not args.force and os.path.isfile(checkpoint_path) and os.path.isfile(stamp_path):
+        with open(stamp_path) as stamp_file:
+            if stamp_file.read().strip() == stamp:
+                print('{0} is up to date'.format(checkpoint_path))
+                return 0
+
+    sender = wallet_script_hash(express, args.deployer)
+    with tempfile.TemporaryDirectory(prefix='cutie-deploy-') as workdir:
+        funding_path = os.path.join(workdir, 'funding.neo-invoke.json')
+        bootstrap_path = os.path.join(workdir, 'bootstrap.neo-invoke.json')
+        batch_path = os.path.join(workdir, 'deploy.batch')
+
+        with open(funding_path, 'w') as funding_file:
+            json.dump(funding_invocations(FUNDED_WALLETS, FUNDING_AMOUNT), funding_file, indent=2)
+        with open(bootstrap_path, 'w') as bootstrap_file:
+            json.dump(bootstrap_invocations(artifacts, sender, init_calls), bootstrap_file, indent=2)
+        with open(batch_path, 'w') as batch_file:
+            batch_file.write('contract invoke {0} genesis\n'.format(funding_path))
+            batch_file.write('contract invoke {0} {1}\n'.format(bootstrap_path, args.deployer))
+            batch_file.write('checkpoint create {0} --force\n'.format(os.path.abspath(args.checkpoint)))
+
+        result = subprocess.run([args.neoxp, 'batch', '--reset', '--input', args.input, batch_path])
+        if result.returncode != 0:
+            return result.returncode
+
+    with open(stamp_path, 'w') as stamp_file:
+        stamp_file.write(stamp + '\n')
+    print('saved {0}'.format(checkpoint_path))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,916 @@
+"""
+Pure-Python model of SomeNFT and Core for fast iteration on contract logic.
+
+The model keeps the exact storage layout of the contracts (schema v2, as written by a fresh
+deployment) in dicts, raises the same events and faults on the same `assert`s, so a scenario can
+be replayed on the TestEngine and compared key by key; see tests/test_emulator.py.
+Witnesses are a list of signers valid in every contract (`WitnessScope.Global`), and `time` is
+a plain attribute.
+
+Run from the `contracts` folder to measure the throughput of random scenarios:
+
+    python3 -m tools.emulator [--scenarios 1000] [--steps 20] [--seed 1]
+"""
+import argparse
+import random
+import time as clock
+from collections import namedtuple
+from typing import Any, Dict, List, Optional, Tuple
+
+from tools.payments import (OP_BID, OP_CALL_DELEGATED_APPROVE_TEST, OP_CORE_CHECK_WITNESS, OP_CREATE_SALE_AUCTION,
+                           OP_CUTIE_CHECK_WITNESS, OP_TEST_GAS, PAYMENT_FIELDS, PAYMENT_OPCODES, PAYMENT_VERSION,
+                           encode_payment)
+
+ZERO_ADDRESS = bytes(20)
+
+# the default deployer of the TestEngine tests
+DEFAULT_DEPLOYER = b'\x9c\xa5/\x04"{\xf6Z\xe2\xe5\xd1\xffe\x03\xd1\x9dd\xc2\x9cF'
+DEFAULT_NFT_HASH = b'\x11' * 20
+DEFAULT_CORE_HASH = b'\x22' * 20
+GAS_HASH = bytes.fromhex('d2a4cff31913016155e38e474a2c06d08be276cf')[::-1]
+
+# calling script hash seen by the entry contract of an invocation
+ENTRY_SCRIPT = b'\xee' * 20
+
+
+class ContractFault(Exception):
+    """
+    An `assert` or `abort` of a modelled contract; the whole invocation is rolled back
+    """
+
+
+def require(condition: Any, message: str = 'ABORT'):
+    if not condition:
+        raise ContractFault(message)
+
+
+def int_to_bytes(value: int) -> bytes:
+    """
+    NeoVM Integer to ByteString conversion: minimal two's complement, little endian, 0 is empty
+    """
+    if value == 0:
+        return b''
+    length = ((value + (value < 0)).bit_length() + 8) // 8
+    return value.to_bytes(length, 'little', signed=True)
+
+
+def bytes_to_int(data: bytes) -> int:
+    return int.from_bytes(data, 'little', signed=True)
+
+
+def encode_value(value: Any) -> bytes:
+    # what `put` stores for the value types the contracts use
+    if isinstance(value, (bool, int)):
+        return int_to_bytes(int(value))
+    if isinstance(value, str):
+        return value.encode()
+    return bytes(value)
+
+
+def decode_payment(payload: bytes) -> List[int]:
+    require(len(payload) >= 2, 'incorrect data length')
+    require(payload[0] == PAYMENT_VERSION, 'unsupported payment version')
+    opcode = payload[1]
+    require(opcode in PAYMENT_FIELDS, 'unknown payment opcode')
+    sizes = PAYMENT_FIELDS[opcode]
+    require(len(payload) == 2 + sum(sizes), 'incorrect data length')
+
+    payment = [opcode]
+    offset = 2
+    for size in sizes:
+        payment.append(bytes_to_int(payload[offset:offset + size]))
+        offset += size
+    return payment
+
+
+def _div(dividend: int, divisor: int) -> int:
+    # NeoVM DIV truncates towards zero
+    quotient = abs(dividend) // abs(divisor)
+    return quotient if (dividend < 0) == (divisor < 0) else -quotient
+
+
+class Emulator:
+    def __init__(self, nft_hash: bytes = DEFAULT_NFT_HASH, core_hash: bytes = DEFAULT_CORE_HASH,
+                 deployer: bytes = DEFAULT_DEPLOYER, time: int = 0):
+        self.nft_hash = nft_hash
+        self.core_hash = core_hash
+        self.time = time
+        self.storage: Dict[bytes, Dict[bytes, bytes]] = {nft_hash: {}, core_hash: {}}
+        self.events: List[Tuple[bytes, str, tuple]] = []
+        self.gas: Dict[bytes, int] = {}
+        self.signers: List[bytes] = []
+        self.contracts = {nft_hash: SomeNFT(self, nft_hash),
+                          core_hash: Core(self, core_hash),
+                          GAS_HASH: GasToken(self, GAS_HASH)}
+
+        self._frames: List[bytes] = []
+        self._journal: List[Tuple[Dict[bytes, Any], bytes, Optional[Any]]] = []
+
+        for contract_hash in (nft_hash, core_hash):
+            self.invoke(contract_hash, '_deploy', None, False, signers=[deployer])
+
+    # -------------------------------------------
+    # Execution context
+    # -------------------------------------------
+
+    @property
+    def sender(self) -> Optional[bytes]:
+        return self.signers[0] if len(self.signers) > 0 else None
+
+    @property
+    def calling_script_hash(self) -> bytes:
+        return self._frames[-2] if len(self._frames) > 1 else ENTRY_SCRIPT
+
+    def check_witness(self, script_hash: bytes) -> bool:
+        require(len(script_hash) in (20, 33), 'Invalid witness hash')
+        return script_hash in self.signers or script_hash == self.calling_script_hash
+
+    def is_contract(self, script_hash: Optional[bytes]) -> bool:
+        return script_hash in self.contracts
+
+    def invoke(self, contract_hash: bytes, method: str, *args, signers=()) -> Any:
+        """
+        Runs a transaction calling `method`. A fault rolls back every write and event of the
+        invocation and is raised as ContractFault.
+        """
+        self.signers = list(signers)
+        self._journal = []
+        events = len(self.events)
+        self._frames = [ENTRY_SCRIPT]
+        try:
+            return self.call(contract_hash, method, list(args))
+        except ContractFault:
+            for table, key, value in reversed(self._journal):
+                if value is None:
+                    table.pop(key, None)
+                else:
+                    table[key] = value
+            del self.events[events:]
+            raise
+        finally:
+            self._frames = []
+
+    def call(self, contract_hash: bytes, method: str, args: List[Any]) -> Any:
+        contract = self.contracts.get(contract_hash)
+        require(contract is not None, 'Called contract does not exist')
+        require(method in contract.PUBLIC, 'Method not found: {0}'.format(method))
+        self._frames.append(contract_hash)
+        try:
+            return getattr(contract, method)(*args)
+        finally:
+            self._frames.pop()
+
+    def write(self, table: Dict[bytes, Any], key: bytes, value: Optional[Any]):
+        self._journal.append((table, key, table.get(key)))
+        if value is None:
+            table.pop(key, None)
+        else:
+            table[key] = value
+
+    def notify(self, origin: bytes, name: str, *args):
+        self.events.append((origin, name, args))
+
+
+class ContractModel:
+    PUBLIC = frozenset()
+
+    def __init__(self, emulator: Emulator, script_hash: bytes):
+        self.emulator = emulator
+        self.hash = script_hash
+
+    def get(self, key: bytes) -> bytes:
+        return self.emulator.storage[self.hash].get(key, b'')
+
+    def put(self, key: bytes, value: Any):
+        self.emulator.write(self.emulator.storage[self.hash], key, encode_value(value))
+
+    def delete(self, key: bytes):
+        self.emulator.write(self.emulator.storage[self.hash], key, None)
+
+    def notify(self, name: str, *args):
+        self.emulator.notify(self.hash, name, *args)
+
+    def check_witness(self, script_hash: bytes) -> bool:
+        return self.emulator.check_witness(script_hash)
+
+    def call(self, contract_hash: bytes, method: str, args: List[Any]) -> Any:
+        return self.emulator.call(contract_hash, method, args)
+
+    def onNEP11Payment(self, from_address, amount, token_id, data):
+        require(False)
+
+    def onNEP17Payment(self, from_address, amount, data):
+        require(False)
+
+
+class GasToken(ContractModel):
+    PUBLIC = frozenset({'transfer', 'balanceOf'})
+
+    def balanceOf(self, account: bytes) -> int:
+        return self.emulator.gas.get(account, 0)
+
+    def transfer(self, from_address: bytes, to: bytes, amount: int, data: Any) -> bool:
+        require(amount >= 0, 'Negative amount')
+        if not self.check_witness(from_address) or self.balanceOf(from_address) < amount:
+            return False
+        gas = self.emulator.gas
+        self.emulator.write(gas, from_address, self.balanceOf(from_address) - amount)
+        self.emulator.write(gas, to, self.balanceOf(to) + amount)
+        self.notify('Transfer', from_address, to, amount)
+        if self.emulator.is_contract(to):
+            self.call(to, 'onNEP17Payment', [from_address, amount, data])
+        return True
+
+
+class SomeNFT(ContractModel):
+    PUBLIC = frozenset({
+        '_deploy', 'totalSupply', 'balanceOf', 'ownerOf', 'transfer', 'transfer_from', 'transfer_batch',
+        'delegated_approve', 'setApprovalForAll', 'isApprovedForAll', 'cutie_witness', 'delegated_approve_test',
+        'multicall', 'create_cutie', 'create_cutie_batch', 'get_cutie', 'burn', 'burn_batch',
+        'setGame', 'isGame', 'isOwner', 'onNEP11Payment', 'onNEP17Payment', 'tokensOfGeneration',
+        'tokensOfOwnerGeneration', 'readyTokensPage', 'index_cuties',
+    })
+
+    MAX_BATCH_SIZE = 100
+    MAX_PAGE_SIZE = 500
+    MULTICALL_ARITY = {'ownerOf': 1, 'isApprovedForAll': 2, 'delegated_approve': 3, 'cutie_witness': 1,
+                       'delegated_approve_test': 1, 'get_cutie': 1}
+
+    ADDRESS_OWNER = b'owner_address'
+    ADDRESS_GAME = b'game_address'
+    DEPLOYED = b'deployed'
+    TOKEN_COUNT = b'TOKEN_COUNT'
+    SCHEMA_VERSION = b'schema_version'
+    SUPPLY = b'SPP'
+    CUTIE_INDEX_CURSOR = b'CUTIE_INDEX_CURSOR'
+
+    APPROVALS_PREFIX = b'\x01'
+    OPERATOR_APPROVALS_PREFIX = b'\x02'
+    ACCOUNT_PREFIX = b'\x03'
+    TOKEN_PREFIX = b'\x04'
+    BALANCE_PREFIX = b'\x05'
+    META_PREFIX = b'\x06'
+    GENERATION_INDEX_PREFIX = b'\x07'
+    OWNER_GENERATION_INDEX_PREFIX = b'\x08'
+    COOLDOWN_INDEX_PREFIX = b'\x09'
+
+    CUTIE_PACKED_VERSION = b'\x01'
+    # (name, size) in packed order
+    CUTIE_LAYOUT = (('genes', 32), ('birth_time', 8), ('cooldown_end_time', 8), ('mom_id', 5), ('dad_id', 5),
+                    ('cooldown_index', 2), ('generation', 2), ('optional', 8))
+
+    # -------------------------------------------
+    # System and NEP-11 methods
+    # -------------------------------------------
+
+    def _deploy(self, data: Any, update: bool):
+        if update:
+            return
+        require(len(self.get(self.DEPLOYED)) == 0 or bytes_to_int(self.get(self.DEPLOYED)) == 0)
+        self.put(self.ADDRESS_OWNER, self.emulator.sender)
+        self.put(self.DEPLOYED, True)
+        self.put(self.TOKEN_COUNT, 0)
+        self.put(self.SCHEMA_VERSION, 2)
+
+    def totalSupply(self) -> int:
+        return bytes_to_int(self.get(self.SUPPLY))
+
+    def balanceOf(self, owner: bytes) -> int:
+        require(len(owner) == 20, 'Incorrect `owner` length')
+        require(owner != ZERO_ADDRESS, 'Balance query for the zero address')
+        return bytes_to_int(self.get(self.BALANCE_PREFIX + owner))
+
+    def ownerOf(self, token_id: int) -> bytes:
+        owner = self.get_owner_of(token_id)
+        require(owner != ZERO_ADDRESS, 'Owner query for nonexistent token')
+        return owner
+
+    def transfer(self, to: bytes, token_id: bytes, data: Any) -> bool:
+        token_id = bytes_to_int(token_id)
+        require(len(to) == 20, 'Incorrect `to` length')
+        require(to != ZERO_ADDRESS, 'Transfer to the zero address')
+
+        owner = self.get_owner_of(token_id)
+        require(self.check_witness(owner), 'Transfer of token that is not own')
+        self._move(owner, to, token_id)
+        self.post_transfer(owner, to, token_id, data)
+        return True
+
+    def transfer_from(self, from_address: bytes, to: bytes, token_id: bytes, data: Any) -> bool:
+        token_id = bytes_to_int(token_id)
+        require(len(to) == 20, 'Incorrect `to` length')
+        require(to != ZERO_ADDRESS, 'Transfer to the zero address')
+        require(self.get_owner_of(token_id) == from_address, 'Transfer of token that is not own')
+        require(self.check_witness(from_address) or self._is_approved_spender(token_id)
+                or self._is_approved_operator(from_address), 'Transfer of token that is not approved')
+
+        self._move(from_address, to, token_id)
+        self.post_transfer(from_address, to, token_id, data)
+        return True
+
+    def transfer_batch(self, from_address: bytes, to: bytes, token_ids: List[bytes], data: Any) -> bool:
+        require(len(to) == 20, 'Incorrect `to` length')
+        require(to != ZERO_ADDRESS, 'Transfer to the zero address')
+        require(len(token_ids) > 0, 'Empty batch')
+        require(len(token_ids) <= self.MAX_BATCH_SIZE, 'Batch is too large')
+        require(self.check_witness(from_address) or self._is_approved_operator(from_address),
+                'Transfer of token that is not own')
+
+        ids = []
+        for token_id in token_ids:
+            token_id = bytes_to_int(token_id)
+            require(self.get_owner_of(token_id) == from_address, 'Transfer of token that is not own')
+            if from_address != to:
+                self._remove_token_account(from_address, token_id)
+                self._change_owner(token_id, from_address, to)
+                self._add_token_account(to, token_id)
+            ids.append(token_id)
+
+        if from_address != to:
+            self.set_balance(from_address, -len(ids))
+            self.set_balance(to, len(ids))
+        for token_id in ids:
+            self.notify('Transfer', from_address, to, 1, int_to_bytes(token_id))
+            if self.emulator.is_contract(to):
+                self.call(to, 'onNEP11Payment', [from_address, 1, token_id, data])
+        return True
+
+    def post_transfer(self, owner: Optional[bytes], to: Optional[bytes], token_id: int, data: Any):
+        self.notify('Transfer', owner, to, 1, int_to_bytes(token_id))
+        if to is not None and self.emulator.is_contract(to):
+            self.call(to, 'onNEP11Payment', [owner, 1, token_id, data])
+
+    # -------------------------------------------
+    # Approvals
+    # -------------------------------------------
+
+    def delegated_approve(self, from_address: bytes, to: bytes, token_id: int):
+        self.put(b'testeggtwo', 'someone')
+        owner = self.get_owner_of(token_id)
+        require(self.check_witness(owner), 'Wrong cutie owner')
+        self.put(b'testeggtwo', 'somevalue')
+        require(owner == from_address, 'Wrong cutie owner')
+        if not self.isApprovedForAll(owner, to):
+            self._approve(owner, token_id, to)
+
+    def setApprovalForAll(self, owner: bytes, operator: bytes, approved: bool) -> bool:
+        require(len(operator) == 20, 'Incorrect `operator` length')
+        require(operator != owner, 'Approval to the owner')
+        require(self.check_witness(owner), 'Wrong owner')
+
+        key = self.OPERATOR_APPROVALS_PREFIX + owner + operator
+        if approved:
+            self.put(key, 1)
+        else:
+            self.delete(key)
+        self.notify('ApprovalForAll', owner, operator, approved)
+        return True
+
+    def isApprovedForAll(self, owner: bytes, operator: bytes) -> bool:
+        return len(self.get(self.OPERATOR_APPROVALS_PREFIX + owner + operator)) != 0
+
+    def cutie_witness(self, token_id: int) -> bool:
+        require(self.check_witness(self.get_owner_of(token_id)), 'Wrong cutie owner')
+        return True
+
+    def delegated_approve_test(self, text: bytes):
+        self.put(b'testeggxxxx', 'someone')
+
+    def multicall(self, calls: List[List[Any]]) -> List[Any]:
+        require(self.isGame(), 'Access denied')
+        require(len(calls) <= self.MAX_BATCH_SIZE, 'Batch is too large')
+        results = []
+        for call in calls:
+            require(len(call) == 2, 'Incorrect call length')
+            operation, args = call
+            require(operation in self.MULTICALL_ARITY)
+            # operations run inside SomeNFT, as internal calls
+            results.append(getattr(self, operation)(*args[:self.MULTICALL_ARITY[operation]]))
+        return results
+
+    def _is_approved_spender(self, token_id: int) -> bool:
+        approved = self.get_approved(token_id)
+        if approved == ZERO_ADDRESS:
+            return False
+        return approved == self.emulator.calling_script_hash or self.check_witness(approved)
+
+    def _is_approved_operator(self, owner: bytes) -> bool:
+        if self.isApprovedForAll(owner, self.emulator.calling_script_hash):
+            return True
+        sender = self.emulator.sender
+        return sender is not None and self.isApprovedForAll(owner, sender) and self.check_witness(sender)
+
+    def _approve(self, owner: bytes, token_id: int, approved: bytes):
+        key = self.APPROVALS_PREFIX + int_to_bytes(token_id)
+        if approved != ZERO_ADDRESS:
+            self.put(key, approved + int_to_bytes(self.get_token_nonce(token_id)))
+            self.notify('Approval', owner, approved, token_id)
+            return
+        if self.get_approved(token_id) != ZERO_ADDRESS:
+            self.notify('Approval', owner, approved, token_id)
+        if len(self.get(key)) != 0:
+            self.delete(key)
+
+    def get_approved(self, token_id: int) -> bytes:
+        record = self.get(self.APPROVALS_PREFIX + int_to_bytes(token_id))
+        if len(record) < 20 or self._read_nonce(record) != self.get_token_nonce(token_id):
+            return ZERO_ADDRESS
+        return record[:20]
+
+    # -------------------------------------------
+    # Cuties
+    # -------------------------------------------
+
+    def create_cutie(self, owner: bytes, mom_id: int, dad_id: int, generation: int, cooldown_index: int,
+                     genes: int, birth_time: int) -> int:
+        require(owner != ZERO_ADDRESS, 'Mint to the zero address')
+        require(self.isGame() or self.isOwner(), 'Access denied')
+
+        token_id = bytes_to_int(self.get(self.TOKEN_COUNT)) + 1
+        self.put(self.TOKEN_COUNT, token_id)
+        self._store_cutie(token_id, owner, mom_id, dad_id, generation, cooldown_index, genes, birth_time)
+        self.set_balance(owner, 1)
+        self.add_to_supply(1)
+        self.post_transfer(None, owner, token_id, None)
+        return token_id
+
+    def create_cutie_batch(self, cuties: List[List[Any]]) -> List[int]:
+        require(self.isGame() or self.isOwner(), 'Access denied')
+        require(len(cuties) > 0, 'Empty batch')
+        require(len(cuties) <= self.MAX_BATCH_SIZE, 'Batch is too large')
+
+        first_id = bytes_to_int(self.get(self.TOKEN_COUNT)) + 1
+        self.put(self.TOKEN_COUNT, first_id + len(cuties) - 1)
+
+        balances: Dict[bytes, int] = {}
+        owners = []
+        for token_id, spec in enumerate(cuties, first_id):
+            require(len(spec) == 7, 'Incorrect cutie spec length')
+            owner = spec[0]
+            require(len(owner) == 20, 'Incorrect `owner` length')
+            require(owner != ZERO_ADDRESS, 'Mint to the zero address')
+            self._store_cutie(token_id, owner, *spec[1:])
+            balances[owner] = balances.get(owner, 0) + 1
+            owners.append(owner)
+
+        for owner, amount in balances.items():
+            self.set_balance(owner, amount)
+        self.add_to_supply(len(cuties))
+
+        for token_id, owner in enumerate(owners, first_id):
+            self.post_transfer(None, owner, token_id, None)
+        return list(range(first_id, first_id + len(cuties)))
+
+    def get_cutie(self, token_id: int) -> Dict[str, int]:
+        meta = self.get(self.META_PREFIX + int_to_bytes(token_id))
+        require(len(meta) != 0, 'Cutie not exists')
+        cutie = {}
+        offset = 1
+        for name, size in self.CUTIE_LAYOUT:
+            if name != 'optional':
+                cutie[name] = int.from_bytes(meta[offset:offset + size], 'little')
+            offset += size
+        return cutie
+
+    def burn(self, token_id: bytes) -> bool:
+        token_id = bytes_to_int(token_id)
+        require(len(self.get_token_record(token_id)) != 0, 'Cutie not exists')
+        owner = self.get_owner_of(token_id)
+        require(self._can_burn(owner), 'Burn of token that is not own')
+        self._check_not_on_auction(owner, token_id)
+
+        self._burn(owner, token_id)
+        self.set_balance(owner, -1)
+        self.add_to_supply(-1)
+        self.post_transfer(owner, None, token_id, None)
+        return True
+
+    def burn_batch(self, token_ids: List[bytes]) -> bool:
+        require(len(token_ids) > 0, 'Empty batch')
+        require(len(token_ids) <= self.MAX_BATCH_SIZE, 'Batch is too large')
+
+        burnt = []
+        balances: Dict[bytes, int] = {}
+        for token_id in token_ids:
+            token_id = bytes_to_int(token_id)
+            require(len(self.get_token_record(token_id)) != 0, 'Cutie not exists')
+            owner = self.get_owner_of(token_id)
+            require(self._can_burn(owner), 'Burn of token that is not own')
+            self._check_not_on_auction(owner, token_id)
+            self._burn(owner, token_id)
+            balances[owner] = balances.get(owner, 0) - 1
+            burnt.append((owner, token_id))
+
+        for owner, amount in balances.items():
+            self.set_balance(owner, amount)
+        self.add_to_supply(-len(token_ids))
+        for owner, token_id in burnt:
+            self.post_transfer(owner, None, token_id, None)
+        return True
+
+    def tokensOfGeneration(self, generation: int, start_after: int, limit: int) -> List[Any]:
+        return self._index_page(self.GENERATION_INDEX_PREFIX + self._pack_int(generation, 2), start_after, limit)
+
+    def tokensOfOwnerGeneration(self, owner: bytes, generation: int, start_after: int, limit: int) -> List[Any]:
+        require(len(owner) == 20, 'Incorrect `owner` length')
+        return self._index_page(self.OWNER_GENERATION_INDEX_PREFIX + owner + self._pack_int(generation, 2),
+                                start_after, limit)
+
+    def readyTokensPage(self, start_after: bytes, limit: int) -> List[Any]:
+        require(limit > 0 and limit <= self.MAX_PAGE_SIZE, 'Incorrect `limit`')
+        token_ids = []
+        last_entry = b''
+        next_cursor = b''
+        for entry in self._find(self.COOLDOWN_INDEX_PREFIX):
+            if entry <= start_after:
+                continue
+            if int.from_bytes(entry[:8], 'big') > self.emulator.time:
+                break
+            if len(token_ids) == limit:
+                next_cursor = last_entry
+                break
+            token_ids.append(bytes_to_int(entry[8:]))
+            last_entry = entry
+        return [token_ids, next_cursor]
+
+    def index_cuties(self, limit: int) -> int:
+        require(self.isOwner(), 'Access denied')
+        require(0 < limit <= self.MAX_BATCH_SIZE, 'Incorrect `limit`')
+        last_id = bytes_to_int(self.get(self.TOKEN_COUNT))
+        token_id = bytes_to_int(self.get(self.CUTIE_INDEX_CURSOR))
+        end_id = min(token_id + limit, last_id)
+        while token_id < end_id:
+            token_id += 1
+            meta = self.get(self.META_PREFIX + int_to_bytes(token_id))
+            if len(meta) != 0:
+                self._index_cutie(token_id, meta)
+                self._index_owner_generation(self.get_owner_of(token_id), token_id)
+
+        if token_id == last_id:
+            self.delete(self.CUTIE_INDEX_CURSOR)
+        else:
+            self.put(self.CUTIE_INDEX_CURSOR, token_id)
+        return last_id - token_id
+
+    def setGame(self, game: bytes):
+        require(self.isOwner(), 'Access denied')
+        self.put(self.ADDRESS_GAME, game)
+
+    def isGame(self) -> bool:
+        game = self.get(self.ADDRESS_GAME)
+        return len(game) != 0 and self.emulator.calling_script_hash == game
+
+    def isOwner(self) -> bool:
+        owner = self.get(self.ADDRESS_OWNER)
+        return len(owner) != 0 and self.emulator.sender == owner
+
+    # -------------------------------------------
+    # Internals
+    # -------------------------------------------
+
+    def _pack_int(self, value: int, size: int) -> bytes:
+        require(value >= 0, 'Negative cutie field')
+        data = int_to_bytes(value)
+        if len(data) == size + 1 and data[size] == 0:
+            # unsigned fields drop the sign byte
+            data = data[:size]
+        require(len(data) <= size, 'Cutie field overflow')
+        return data + bytes(size - len(data))
+
+    def _store_cutie(self, token_id: int, owner: bytes, mom_id: int, dad_id: int, generation: int,
+                     cooldown_index: int, genes: int, birth_time: int):
+        # `Cutie` takes dad_id before mom_id, so the contract stores the two ids swapped
+        values = {'genes': genes, 'birth_time': birth_time, 'cooldown_end_time': 0, 'mom_id': dad_id,
+                  'dad_id': mom_id, 'cooldown_index': cooldown_index, 'generation': generation, 'optional': 0}
+        token = int_to_bytes(token_id)
+        self.put(self.TOKEN_PREFIX + token, owner)
+        meta = self.CUTIE_PACKED_VERSION + b''.join(self._pack_int(values[name], size)
+                                                    for name, size in self.CUTIE_LAYOUT)
+        self.put(self.META_PREFIX + token, meta)
+        self._index_cutie(token_id, meta)
+        self._add_token_account(owner, token_id)
+
+    def _move(self, from_address: bytes, to: bytes, token_id: int):
+        if from_address != to:
+            self.set_balance(from_address, -1)
+            self._remove_token_account(from_address, token_id)
+            self.set_balance(to, 1)
+            self._change_owner(token_id, from_address, to)
+            self._add_token_account(to, token_id)
+
+    # -------------------------------------------
+    # Indexes
+    # -------------------------------------------
+
+    def _meta_field(self, meta: bytes, field: str) -> int:
+        offset = 1
+        for name, size in self.CUTIE_LAYOUT:
+            if name == field:
+                return int.from_bytes(meta[offset:offset + size], 'little')
+            offset += size
+
+    def _owner_generation_key(self, owner: bytes, token_id: int) -> bytes:
+        generation = self._meta_field(self.get(self.META_PREFIX + int_to_bytes(token_id)), 'generation')
+        return self.OWNER_GENERATION_INDEX_PREFIX + owner + self._pack_int(generation, 2) + int_to_bytes(token_id)
+
+    def _cutie_index_keys(self, token_id: int, meta: bytes) -> List[bytes]:
+        token = int_to_bytes(token_id)
+        return [self.GENERATION_INDEX_PREFIX + self._pack_int(self._meta_field(meta, 'generation'), 2) + token,
+                self.COOLDOWN_INDEX_PREFIX + self._meta_field(meta, 'cooldown_end_time').to_bytes(8, 'big') + token]
+
+    def _add_token_account(self, owner: bytes, token_id: int):
+        self.put(self.ACCOUNT_PREFIX + owner + int_to_bytes(token_id), b'')
+        self._index_owner_generation(owner, token_id)
+
+    def _remove_token_account(self, owner: bytes, token_id: int):
+        self.delete(self.ACCOUNT_PREFIX + owner + int_to_bytes(token_id))
+        self.delete(self._owner_generation_key(owner, token_id))
+
+    def _index_owner_generation(self, owner: bytes, token_id: int):
+        self.put(self._owner_generation_key(owner, token_id), b'')
+
+    def _index_cutie(self, token_id: int, meta: bytes):
+        for key in self._cutie_index_keys(token_id, meta):
+            self.put(key, b'')
+
+    def _find(self, prefix: bytes) -> List[bytes]:
+        # storage iterators return the keys in byte order, without the prefix
+        storage = self.emulator.storage[self.hash]
+        return [key[len(prefix):] for key in sorted(storage) if key.startswith(prefix)]
+
+    def _index_page(self, prefix: bytes, start_after: int, limit: int) -> List[Any]:
+        require(limit > 0 and limit <= self.MAX_PAGE_SIZE, 'Incorrect `limit`')
+        # the page resumes after the key of the cursor, which may have left the index
+        cursor = int_to_bytes(start_after)
+        token_ids = [bytes_to_int(entry) for entry in self._find(prefix) if entry > cursor]
+        page = token_ids[:limit]
+        next_cursor = page[-1] if len(token_ids) > limit else 0
+        return [page, next_cursor]
+
+    def _change_owner(self, token_id: int, from_address: bytes, to: bytes):
+        if self.get_approved(token_id) != ZERO_ADDRESS:
+            self.notify('Approval', from_address, ZERO_ADDRESS, token_id)
+        nonce = self.get_token_nonce(token_id) + 1
+        self.put(self.TOKEN_PREFIX + int_to_bytes(token_id), to + int_to_bytes(nonce))
+
+    def _can_burn(self, owner: bytes) -> bool:
+        return self.check_witness(owner) or self._is_approved_operator(owner) or self.isGame()
+
+    def _check_not_on_auction(self, owner: bytes, token_id: int):
+        game = self.get(self.ADDRESS_GAME)
+        if len(game) != 0 and (self.get_approved(token_id) == game or self.isApprovedForAll(owner, game)):
+            require(not self.call(game, 'has_auction', [token_id]), 'Cutie is on auction')
+
+    def _burn(self, owner: bytes, token_id: int):
+        token = int_to_bytes(token_id)
+        self._approve(owner, token_id, ZERO_ADDRESS)
+        self._remove_token_account(owner, token_id)
+        self.delete(self.TOKEN_PREFIX + token)
+        for key in self._cutie_index_keys(token_id, self.get(self.META_PREFIX + token)):
+            self.delete(key)
+        self.delete(self.META_PREFIX + token)
+
+    def get_token_record(self, token_id: int) -> bytes:
+        return self.get(self.TOKEN_PREFIX + int_to_bytes(token_id))
+
+    def get_owner_of(self, token_id: int) -> bytes:
+        # like `UInt160(record)` in the contract, a missing record faults
+        record = self.get_token_record(token_id)
+        require(len(record) != 0, 'Cutie not exists')
+        return record[:20]
+
+    def get_token_nonce(self, token_id: int) -> int:
+        return self._read_nonce(self.get_token_record(token_id))
+
+    @staticmethod
+    def _read_nonce(record: bytes) -> int:
+        return bytes_to_int(record[20:])
+
+    def set_balance(self, owner: bytes, amount: int):
+        key = self.BALANCE_PREFIX + owner
+        balance = bytes_to_int(self.get(key)) + amount
+        if balance > 0:
+            self.put(key, balance)
+        else:
+            self.delete(key)
+
+    def add_to_supply(self, amount: int):
+        self.put(self.SUPPLY, bytes_to_int(self.get(self.SUPPLY)) + amount)
+
+
+class Core(ContractModel):
+    PUBLIC = frozenset({'_deploy', 'setup', 'onNEP17Payment', 'onNEP11Payment', 'cancel_auction', 'get_auction',
+                        'has_auction'})
+
+    OWNER_ADDRESS = b'owner_address'
+    DEPLOYED = b'deployed'
+    TOKEN_ADDRESS = b'token_address'
+
+    AUCTION_PREFIX = b'AUC'
+    AUCTION_RECORD_SIZE = 52
+    AUCTION_FIELD_SIZE = 8
+    MIN_AUCTION_DURATION = 60000
+
+    def _deploy(self, data: Any, update: bool):
+        require(len(self.get(self.DEPLOYED)) == 0 or bytes_to_int(self.get(self.DEPLOYED)) == 0)
+        if not update:
+            self.put(self.OWNER_ADDRESS, self.emulator.sender)
+            self.put(self.DEPLOYED, True)
+
+    def setup(self, token: bytes):
+        require(token != ZERO_ADDRESS, 'Zero address')
+        self.put(self.TOKEN_ADDRESS, token)
+
+    def onNEP17Payment(self, from_address: bytes, amount: int, data: Any):
+        require(self.emulator.calling_script_hash == GAS_HASH, 'only GAS is accepted')
+        require(amount > 0, 'no funds transferred')
+        if isinstance(data, (bytes, str)):
+            payment = decode_payment(encode_value(data))
+            opcode = payment[0]
+        else:
+            payment = data
+            require(len(payment) > 1, 'incorrect data length')
+            opcode = PAYMENT_OPCODES.get(payment[0], 0) if isinstance(payment[0], str) else 0
+        token = self.get(self.TOKEN_ADDRESS)
+
+        if opcode == OP_BID:
+            require(len(payment) == 2, 'incorrect arguments to bid')
+            self._bid(from_address, amount, token, payment[1])
+        elif opcode == OP_CREATE_SALE_AUCTION:
+            require(len(payment) == 5, 'incorrect arguments to createStream')
+            self._create_sale_auction(from_address, token, *payment[1:])
+        elif opcode == OP_TEST_GAS:
+            require(len(payment) == 2, 'incorrect data length')
+            self.notify('GasTestEvent', from_address, amount, payment)
+            self.put(b'gas_test_key', payment[1])
+        elif opcode == OP_CUTIE_CHECK_WITNESS:
+            self.call(token, 'cutie_witness', [1])
+        elif opcode == OP_CORE_CHECK_WITNESS:
+            self.check_witness(self.call(token, 'ownerOf', [1]))
+        elif opcode == OP_CALL_DELEGATED_APPROVE_TEST:
+            require(len(payment) == 5, 'incorrect arguments to createStream')
+            self.call(token, 'delegated_approve_test', [b'testegg'])
+        else:
+            require(False)
+
+    def _create_sale_auction(self, seller: bytes, token: bytes, cutie_id: int, start_price: int, end_price: int,
+                             duration: int):
+        require(start_price >= 0 and end_price >= 0, 'Incorrect auction price')
+        require(duration >= self.MIN_AUCTION_DURATION, 'Auction is too short')
+
+        self.call(token, 'delegated_approve', [seller, self.hash, cutie_id])
+
+        record = seller + b''.join(self._pack_int(value)
+                                   for value in (start_price, end_price, self.emulator.time, duration))
+        self.put(self.AUCTION_PREFIX + int_to_bytes(cutie_id), record)
+        self.notify('AuctionCreated', cutie_id, seller, start_price, end_price, duration)
+
+    def _bid(self, bidder: bytes, amount: int, token: bytes, cutie_id: int):
+        key = self.AUCTION_PREFIX + int_to_bytes(cutie_id)
+        record = self.get(key)
+        require(len(record) == self.AUCTION_RECORD_SIZE, 'Auction not found')
+
+        price = self.current_price(record)
+        require(amount >= price, 'Bid is too low')
+        seller = record[:20]
+        self.delete(key)
+
+        self.call(token, 'transfer_from', [seller, bidder, int_to_bytes(cutie_id), None])
+        if price > 0:
+            self.call(GAS_HASH, 'transfer', [self.hash, seller, price, None])
+        if amount > price:
+            self.call(GAS_HASH, 'transfer', [self.hash, bidder, amount - price, None])
+        self.notify('AuctionSuccessful', cutie_id, price, bidder)
+
+    def cancel_auction(self, cutie_id: int):
+        key = self.AUCTION_PREFIX + int_to_bytes(cutie_id)
+        record = self.get(key)
+        require(len(record) == self.AUCTION_RECORD_SIZE, 'Auction not found')
+        require(self.check_witness(record[:20]), 'Only seller can cancel auction')
+        self.delete(key)
+        self.notify('AuctionCancelled', cutie_id)
+
+    def has_auction(self, cutie_id: int) -> bool:
+        return len(self.get(self.AUCTION_PREFIX + int_to_bytes(cutie_id))) == self.AUCTION_RECORD_SIZE
+
+    def get_auction(self, cutie_id: int) -> Dict[str, Any]:
+        record = self.get(self.AUCTION_PREFIX + int_to_bytes(cutie_id))
+        require(len(record) == self.AUCTION_RECORD_SIZE, 'Auction not found')
+        start_price, end_price, start_time, duration = (self._unpack_int(record, offset) for offset in (20, 28, 36, 44))
+        return {'cutie_id': cutie_id, 'seller': record[:20], 'start_price': start_price, 'end_price': end_price,
+                'start_time': start_time, 'duration': duration, 'current_price': self.current_price(record)}
+
+    def current_price(self, record: bytes) -> int:
+        start_price, end_price, start_time, duration = (self._unpack_int(record, offset) for offset in (20, 28, 36, 44))
+        elapsed = self.emulator.time - start_time
+        if elapsed >= duration:
+            return end_price
+        if start_price >= end_price:
+            return start_price - _div((start_price - end_price) * elapsed, duration)
+        return start_price + _div((end_price - start_price) * elapsed, duration)
+
+    def _pack_int(self, value: int) -> bytes:
+        data = int_to_bytes(value)
+        require(len(data) <= self.AUCTION_FIELD_SIZE, 'Auction field overflow')
+        return data + bytes(self.AUCTION_FIELD_SIZE - len(data))
+
+    def _unpack_int(self, record: bytes, offset: int) -> int:
+        return bytes_to_int(record[offset:offset + self.AUCTION_FIELD_SIZE])
+
+
+# -------------------------------------------
+# Random scenarios
+# -------------------------------------------
+
+# `contract` is 'SomeNFT', 'Core' or 'GAS'; `elapsed` milliseconds pass before the step runs
+Step = namedtuple('Step', ['contract', 'method', 'args', 'signers', 'elapsed'])
+
+
+def random_scenario(rng: random.Random, accounts: List[bytes], deployer: bytes, core_hash: bytes,
+                    steps: int) -> List[Step]:
+    """
+    Builds a random mix of mints, transfers, approvals, burns and Core payments. Arguments are
+    drawn loosely, so a share of the steps is expected to fault in both implementations.
+    """
+    scenario = []
+    minted = 0
+    for _ in range(steps):
+        account = rng.choice(accounts)
+        other = rng.choice(accounts + [core_hash])
+        token_id = rng.randint(1, minted + 1)
+        elapsed = rng.choice((0, 0, 1000, 60000))
+        kind = rng.randrange(10)
+        if kind < 3 or minted == 0:
+            signer = deployer if rng.random() < 0.9 else account
+            minted += 1
+            step = Step('SomeNFT', 'create_cutie', [account, rng.randrange(3), rng.randrange(3), rng.randrange(5),
+                                                    rng.randrange(5), rng.getrandbits(200), 123123123], [signer], 0)
+        elif kind == 3:
+            step = Step('SomeNFT', 'transfer', [other, int_to_bytes(token_id), None], [account], elapsed)
+        elif kind == 4:
+            step = Step('SomeNFT', 'transfer_from', [account, other, int_to_bytes(token_id), None],
+                        [rng.choice(accounts)], elapsed)
+        elif kind == 5:
+            step = Step('SomeNFT', 'delegated_approve', [account, other, token_id], [account], elapsed)
+        elif kind == 6:
+            step = Step('SomeNFT', 'setApprovalForAll', [account, other, rng.random() < 0.7], [account], elapsed)
+        elif kind == 7:
+            step = Step('SomeNFT', 'burn', [int_to_bytes(token_id)], [account], elapsed)
+        elif kind == 8:
+            fields = [token_id, rng.randrange(1, 10000), rng.randrange(10000), rng.choice((60000, 120000))]
+            data = (encode_payment(OP_CREATE_SALE_AUCTION, *fields) if rng.random() < 0.5
+                    else ['_create_sale_auction'] + fields)
+            step = Step('GAS', 'transfer', [account, core_hash, 300, data], [account], elapsed)
+        else:
+            data = encode_payment(OP_BID, token_id) if rng.random() < 0.5 else ['bid', token_id]
+            step = Step('GAS', 'transfer', [account, core_hash, rng.randrange(1, 20000), data], [account], elapsed)
+        scenario.append(step)
+    return scenario
+
+
+def run_step(emulator: Emulator, step: Step) -> Tuple[bool, Any]:
+    """
+    Runs a step, returns (halted, result); faults are reported instead of raised
+    """
+    emulator.time += step.elapsed
+    contract_hash = {'SomeNFT': emulator.nft_hash, 'Core': emulator.core_hash, 'GAS': GAS_HASH}[step.contract]
+    try:
+        return True, emulator.invoke(contract_hash, step.method, *step.args, signers=step.signers)
+    except ContractFault as fault:
+        return False, str(fault)
+
+
+def setup_game(emulator: Emulator, deployer: bytes, accounts: List[bytes], gas: int):
+    # the same initialisation the Core tests run on the TestEngine
+    for account in accounts:
+        emulator.gas[account] = gas
+    emulator.invoke(emulator.nft_hash, 'setGame', emulator.core_hash, signers=[deployer])
+    emulator.invoke(emulator.core_hash, 'setup', emulator.nft_hash, signers=[deployer])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--scenarios', type=int, default=1000)
+    parser.add_argument('--steps', type=int, default=20)
+    parser.add_argument('--accounts', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    accounts = [bytes([index]) * 20 for index in range(1, args.accounts + 1)]
+    halted = 0
+    started = clock.perf_counter()
+    for _ in range(args.scenarios):
+        emulator = Emulator()
+        setup_game(emulator, DEFAULT_DEPLOYER, accounts, 1000_00000000)
+        for step in random_scenario(rng, accounts, DEFAULT_DEPLOYER, emulator.core_hash, args.steps):
+            halted += run_step(emulator, step)[0]
+    seconds = clock.perf_counter() - started
+
+    print('{0} scenarios of {1} steps in {2:.2f}s: {3:.0f} scenarios/s, {4:.1%} of the steps halted'
+          .format(args.scenarios, args.steps, seconds, args.scenarios / seconds,
+                  halted / (args.scenarios * args.steps)))
+
+
+if __name__ == '__main__':
+    main()
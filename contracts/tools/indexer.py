@@ -0,0 +1,303 @@
+"""
+Incremental indexer of SomeNFT and Core events into SQLite.
+
+Run from the `contracts` folder against a node with application logs enabled (neo-express is):
+
+    python3 -m tools.indexer --nft 0x<SomeNFT hash> --core 0x<Core hash> [--rpc URL] [--db cuties.sqlite]
+                             [--batch 100] [--follow]
+    python3 -m tools.indexer --db cuties.sqlite --owner NigVWQwT8Mc4ZkxEDsaEtuvL8hZYQFHr5A
+
+SomeNFT `Transfer`/`Approval` events maintain the owner, approval and balance tables; the
+metadata of minted cuties is fetched with one `get_cuties` call per batch. Core's auction events
+maintain the open auctions and the sales, `GasTestEvent` is logged as is.
+Blocks are read in batches with JSON-RPC batch requests, and every batch is written in a single
+SQLite transaction together with the next block to read, so a restarted indexer resumes after
+the last committed batch.
+"""
+import argparse
+import json
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from tools.rpc import DEFAULT_RPC_URL, RpcClient, decode_stack_item, encode_param, hex_to_script_hash
+
+ZERO_ADDRESS = bytes(20)
+
+# `SomeNFT.get_cuties` answers at most MAX_PAGE_SIZE ids per call
+METADATA_PAGE_SIZE = 500
+
+CUTIE_FIELDS = ('genes', 'birth_time', 'mom_id', 'dad_id', 'cooldown_end_time', 'cooldown_index', 'generation')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoint (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    next_block INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tokens (
+    token_id INTEGER PRIMARY KEY,
+    owner BLOB NOT NULL,
+    approved BLOB,
+    updated_block INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tokens_owner ON tokens (owner);
+CREATE TABLE IF NOT EXISTS cuties (
+    token_id INTEGER PRIMARY KEY,
+    genes TEXT NOT NULL,
+    birth_time INTEGER NOT NULL,
+    mom_id INTEGER NOT NULL,
+    dad_id INTEGER NOT NULL,
+    cooldown_end_time INTEGER NOT NULL,
+    cooldown_index INTEGER NOT NULL,
+    generation INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS balances (
+    owner BLOB PRIMARY KEY,
+    balance INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS auctions (
+    cutie_id INTEGER PRIMARY KEY,
+    seller BLOB NOT NULL,
+    start_price INTEGER NOT NULL,
+    end_price INTEGER NOT NULL,
+    duration INTEGER NOT NULL,
+    created_block INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sales (
+    cutie_id INTEGER NOT NULL,
+    price INTEGER NOT NULL,
+    winner BLOB NOT NULL,
+    block INTEGER NOT NULL,
+    txid TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS gas_payments (
+    sender BLOB,
+    amount INTEGER NOT NULL,
+    data TEXT,
+    block INTEGER NOT NULL,
+    txid TEXT NOT NULL
+);
+"""
+
+
+def _token_id(value: Any) -> int:
+    # Transfer carries the NEP-11 ByteString id, the other events the integer one
+    if isinstance(value, bytes):
+        return int.from_bytes(value, 'little', signed=True)
+    return value
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, bytes):
+        return value.hex()
+    raise TypeError(type(value).__name__)
+
+
+class Indexer:
+    def __init__(self, connection: sqlite3.Connection, rpc: Optional[RpcClient] = None,
+                 nft_hash: str = None, core_hash: str = None):
+        self.db = connection
+        self.rpc = rpc
+        self.nft_hash = nft_hash.lower() if nft_hash else None
+        self.core_hash = core_hash.lower() if core_hash else None
+        self.db.executescript(SCHEMA)
+
+    # -------------------------------------------
+    # Sync
+    # -------------------------------------------
+
+    def next_block(self) -> int:
+        row = self.db.execute('SELECT next_block FROM checkpoint WHERE id = 0').fetchone()
+        return row[0] if row is not None else 0
+
+    def sync(self, batch_size: int = 100, until: Optional[int] = None) -> int:
+        """
+        Indexes the blocks from the checkpoint up to `until` (exclusive, the current block count by
+        default). Returns the new checkpoint.
+        """
+        if until is None:
+            until = self.rpc.call('getblockcount')
+
+        start = self.next_block()
+        while start < until:
+            end = min(start + batch_size, until)
+            self.index_blocks(start, end)
+            start = end
+        return start
+
+    def follow(self, batch_size: int = 100, poll_interval: float = 1.0):
+        while True:
+            if self.sync(batch_size) >= self.rpc.call('getblockcount'):
+                time.sleep(poll_interval)
+
+    def fetch_notifications(self, start: int, end: int) -> List[Tuple[int, str, Dict[str, Any]]]:
+        """
+        Returns (block, txid, notification) for the notifications of the blocks in [start, end)
+        raised by successful transactions
+        """
+        blocks = self.rpc.batch([('getblock', [height, True]) for height in range(start, end)])
+        transactions = [(block['index'], tx['hash']) for block in blocks for tx in block['tx']]
+        logs = self.rpc.batch([('getapplicationlog', [txid]) for _, txid in transactions])
+
+        notifications = []
+        for (height, txid), log in zip(transactions, logs):
+            for execution in log['executions']:
+                if execution['vmstate'] != 'HALT':
+                    continue
+                for notification in execution['notifications']:
+                    notifications.append((height, txid, notification))
+        return notifications
+
+    def index_blocks(self, start: int, end: int):
+        notifications = self.fetch_notifications(start, end)
+        with self.db:
+            minted = self.apply(notifications)
+            self.store_metadata(self.fetch_metadata(minted))
+            self.db.execute('INSERT OR REPLACE INTO checkpoint (id, next_block) VALUES (0, ?)', (end,))
+
+    # -------------------------------------------
+    # Events
+    # -------------------------------------------
+
+    def apply(self, notifications: Iterable[Tuple[int, str, Dict[str, Any]]]) -> List[int]:
+        """
+        Applies the notifications in order, returns the ids of the minted cuties
+        """
+        minted = []
+        for height, txid, notification in notifications:
+            contract = notification['contract'].lower()
+            name = notification['eventname']
+            args = decode_stack_item(notification['state'])
+
+            if contract == self.nft_hash:
+                if name == 'Transfer':
+                    sender, receiver, _, token_id = args
+                    token_id = _token_id(token_id)
+                    self.on_transfer(height, sender, receiver, token_id)
+                    if sender is None and receiver is not None:
+                        minted.append(token_id)
+                elif name == 'Approval':
+                    owner, approved, token_id = args
+                    self.on_approval(approved, _token_id(token_id))
+            elif contract == self.core_hash:
+                if name == 'AuctionCreated':
+                    cutie_id, seller, start_price, end_price, duration = args
+                    self.db.execute('INSERT OR REPLACE INTO auctions VALUES (?, ?, ?, ?, ?, ?)',
+                                    (cutie_id, seller, start_price, end_price, duration, height))
+                elif name == 'AuctionSuccessful':
+                    cutie_id, price, winner = args
+                    self.db.execute('DELETE FROM auctions WHERE cutie_id = ?', (cutie_id,))
+                    self.db.execute('INSERT INTO sales VALUES (?, ?, ?, ?, ?)', (cutie_id, price, winner, height, txid))
+                elif name == 'AuctionCancelled':
+                    self.db.execute('DELETE FROM auctions WHERE cutie_id = ?', (args[0],))
+                elif name == 'GasTestEvent':
+                    sender, amount, data = args
+                    self.db.execute('INSERT INTO gas_payments VALUES (?, ?, ?, ?, ?)',
+                                    (sender, amount, json.dumps(data, default=_json_default), height, txid))
+        return minted
+
+    def on_transfer(self, height: int, sender: Optional[bytes], receiver: Optional[bytes], token_id: int):
+        if sender is not None:
+            self._add_balance(sender, -1)
+        if receiver is None:
+            self.db.execute('DELETE FROM tokens WHERE token_id = ?', (token_id,))
+            self.db.execute('DELETE FROM cuties WHERE token_id = ?', (token_id,))
+            return
+
+        self._add_balance(receiver, 1)
+        # a transfer voids the approval of the previous owner
+        self.db.execute('INSERT OR REPLACE INTO tokens (token_id, owner, approved, updated_block) '
+                        'VALUES (?, ?, NULL, ?)', (token_id, receiver, height))
+
+    def on_approval(self, approved: bytes, token_id: int):
+        if approved == ZERO_ADDRESS:
+            approved = None
+        self.db.execute('UPDATE tokens SET approved = ? WHERE token_id = ?', (approved, token_id))
+
+    def _add_balance(self, owner: bytes, amount: int):
+        self.db.execute('INSERT INTO balances (owner, balance) VALUES (?, ?) '
+                        'ON CONFLICT (owner) DO UPDATE SET balance = balance + excluded.balance',
+                        (owner, amount))
+        self.db.execute('DELETE FROM balances WHERE owner = ? AND balance <= 0', (owner,))
+
+    # -------------------------------------------
+    # Metadata
+    # -------------------------------------------
+
+    def fetch_metadata(self, token_ids: List[int]) -> Dict[int, Dict[str, int]]:
+        metadata = {}
+        for first in range(0, len(token_ids), METADATA_PAGE_SIZE):
+            page = token_ids[first:first + METADATA_PAGE_SIZE]
+            result = self.rpc.call('invokefunction', self.nft_hash, 'get_cuties', [encode_param(page)])
+            if result['state'] != 'HALT':
+                raise RuntimeError('get_cuties failed: {0}'.format(result.get('exception')))
+            for token_id, entry in zip(page, decode_stack_item(result['stack'][0])):
+                if entry is not None:
+                    cutie = entry[b'cutie']
+                    metadata[token_id] = {key.decode(): value for key, value in cutie.items()}
+        return metadata
+
+    def store_metadata(self, metadata: Dict[int, Dict[str, int]]):
+        self.db.executemany('INSERT OR REPLACE INTO cuties VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                            [(token_id, str(cutie['genes'])) + tuple(cutie[field] for field in CUTIE_FIELDS[1:])
+                             for token_id, cutie in metadata.items()])
+
+    # -------------------------------------------
+    # Queries
+    # -------------------------------------------
+
+    def owner_tokens(self, owner: bytes) -> List[int]:
+        return [row[0] for row in self.db.execute('SELECT token_id FROM tokens WHERE owner = ? ORDER BY token_id',
+                                                  (owner,))]
+
+    def balance(self, owner: bytes) -> int:
+        row = self.db.execute('SELECT balance FROM balances WHERE owner = ?', (owner,)).fetchone()
+        return row[0] if row is not None else 0
+
+    def cutie(self, token_id: int) -> Optional[Dict[str, int]]:
+        row = self.db.execute('SELECT {0} FROM cuties WHERE token_id = ?'.format(', '.join(CUTIE_FIELDS)),
+                              (token_id,)).fetchone()
+        if row is None:
+            return None
+        cutie = dict(zip(CUTIE_FIELDS, row))
+        cutie['genes'] = int(cutie['genes'])
+        return cutie
+
+
+def parse_account(value: str) -> bytes:
+    """
+    Accepts a Neo address or a 0x-prefixed script hash, returns the little endian script hash
+    """
+    if value.startswith('0x'):
+        return hex_to_script_hash(value)
+    from boa3.neo import to_script_hash
+    return to_script_hash(value.encode())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--rpc', default=DEFAULT_RPC_URL)
+    parser.add_argument('--db', default='cuties.sqlite')
+    parser.add_argument('--nft', help='SomeNFT script hash, 0x-prefixed')
+    parser.add_argument('--core', help='Core script hash, 0x-prefixed')
+    parser.add_argument('--batch', type=int, default=100, help='blocks per batch and per SQLite transaction')
+    parser.add_argument('--follow', action='store_true', help='keep polling for new blocks')
+    parser.add_argument('--owner', help='print the indexed tokens of this address instead of syncing')
+    args = parser.parse_args()
+
+    indexer = Indexer(sqlite3.connect(args.db), RpcClient(args.rpc), args.nft, args.core)
+    if args.owner:
+        owner = parse_account(args.owner)
+        print(json.dumps({'balance': indexer.balance(owner), 'tokens': indexer.owner_tokens(owner)}))
+        return
+
+    if args.nft is None or args.core is None:
+        parser.error('--nft and --core are required to sync')
+    if args.follow:
+        indexer.follow(args.batch)
+    else:
+        print('indexed up to block {0}'.format(indexer.sync(args.batch) - 1))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Helpers to inspect compiled contracts: NEF scripts, debug info and per-method instruction counts.
+"""
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from zipfile import ZipFile
+
+from boa3.neo.contracts.neffile import NefFile
+from boa3.neo.vm.opcode.Opcode import Opcode
+from boa3.neo.vm.opcode.OpcodeInfo import OpcodeInfo
+
+_OPERAND_SIZES: Dict[int, Tuple[int, bool]] = {}
+
+
+def read_nef(nef_path: str) -> Tuple[bytes, int]:
+    """
+    Returns the script of a .nef file together with the size of the file itself
+    """
+    with open(nef_path, mode='rb') as nef:
+        file = nef.read()
+    return NefFile.deserialize(file).script, len(file)
+
+
+def read_debug_info(nef_path: str) -> Optional[Dict[str, Any]]:
+    debug_info_path = nef_path.replace('.nef', '.nefdbgnfo')
+    if not os.path.isfile(debug_info_path):
+        return None
+
+    with ZipFile(debug_info_path, 'r') as dbgnfo:
+        return json.loads(dbgnfo.read(os.path.basename(nef_path.replace('.nef', '.debug.json'))))
+
+
+def _operand_size(opcode: int) -> Tuple[int, bool]:
+    """
+    Returns the operand size of the opcode and whether that operand is a length prefix
+    """
+    if opcode not in _OPERAND_SIZES:
+        info = OpcodeInfo.get_info(Opcode(bytes([opcode])))
+        if info is None:
+            raise ValueError('Unknown opcode 0x{0:02x}'.format(opcode))
+        _OPERAND_SIZES[opcode] = info.data_len, info.max_data_len > info.data_len
+    return _OPERAND_SIZES[opcode]
+
+
+def iter_instructions(script: bytes) -> Iterator[Tuple[int, int, int]]:
+    """
+    Walks the script yielding (offset, opcode, instruction size) for every instruction
+    """
+    offset = 0
+    while offset < len(script):
+        opcode = script[offset]
+        data_len, is_prefix = _operand_size(opcode)
+        size = 1 + data_len
+        if is_prefix:
+            size += int.from_bytes(script[offset + 1:offset + 1 + data_len], 'little')
+        yield offset, opcode, size
+        offset += size
+
+
+def method_ranges(manifest: Dict[str, Any], debug_info: Optional[Dict[str, Any]] = None,
+                  script_size: int = 0) -> Dict[str, Tuple[int, int]]:
+    """
+    Maps method names to their [start, end] script offsets.
+
+    With debug info every compiled function is included. Otherwise only the manifest's public
+    methods are known, and each one is assumed to run until the next method's offset.
+    """
+    if debug_info is not None:
+        ranges = {}
+        for method in debug_info['methods']:
+            name = method['name'].split(',')[-1]
+            start, end = method['range'].split('-')
+            ranges[name] = int(start), int(end)
+        return ranges
+
+    methods: List[Tuple[int, str]] = sorted((method['offset'], method['name'])
+                                            for method in manifest['abi']['methods'])
+    ranges = {}
+    for index, (offset, name) in enumerate(methods):
+        end = methods[index + 1][0] - 1 if index + 1 < len(methods) else script_size - 1
+        ranges[name] = offset, end
+    return ranges
+
+
+def instruction_counts(script: bytes, ranges: Dict[str, Tuple[int, int]]) -> Dict[str, int]:
+    offsets = [offset for offset, _, _ in iter_instructions(script)]
+    return {name: len([offset for offset in offsets if start <= offset <= end])
+            for name, (start, end) in ranges.items()}
@@ -0,0 +1,29 @@
+"""
+Client side of the compact Core payments: the `data` of a GAS transfer to Core, packed as
+version | opcode | fixed-width little-endian fields.
+"""
+
+PAYMENT_VERSION = 1
+OP_CREATE_SALE_AUCTION = 1
+OP_BID = 2
+OP_CUTIE_CHECK_WITNESS = 3
+OP_CORE_CHECK_WITNESS = 4
+OP_CALL_DELEGATED_APPROVE_TEST = 5
+OP_TEST_GAS = 6
+
+PAYMENT_OPCODES = {'_create_sale_auction': OP_CREATE_SALE_AUCTION, 'bid': OP_BID,
+                   'cutie_check_witness': OP_CUTIE_CHECK_WITNESS, 'core_check_witness': OP_CORE_CHECK_WITNESS,
+                   'call_delegated_approve_test': OP_CALL_DELEGATED_APPROVE_TEST, 'test_gas': OP_TEST_GAS}
+# field sizes of every opcode, the first field of cutie operations is the 5 bytes cutie id
+PAYMENT_FIELDS = {OP_CREATE_SALE_AUCTION: (5, 8, 8, 8), OP_BID: (5,), OP_CUTIE_CHECK_WITNESS: (),
+                  OP_CORE_CHECK_WITNESS: (), OP_CALL_DELEGATED_APPROVE_TEST: (5, 8, 8, 8), OP_TEST_GAS: (8,)}
+
+
+def encode_payment(opcode: int, *fields: int) -> bytes:
+    """
+    Packs a compact Core payment, e.g. encode_payment(OP_BID, cutie_id)
+    """
+    sizes = PAYMENT_FIELDS[opcode]
+    assert len(fields) == len(sizes), 'Opcode {0} takes {1} fields'.format(opcode, len(sizes))
+    return bytes([PAYMENT_VERSION, opcode]) + b''.join(value.to_bytes(size, 'little', signed=True)
+                                                      for value, size in zip(fields, sizes))
@@ -0,0 +1,266 @@
+"""
+Source-line GAS profiler for SomeNFT and Core.
+
+Run from the `contracts` folder, either on an invoke file executed on neo-express with tracing on,
+or on a `.neo-trace` file recorded earlier:
+
+    python3 -m tools.profiler --invoke invoke-files/transfer.neo-invoke.json [--account owner]
+    python3 -m tools.profiler --trace <txid>.neo-trace [--metric gas|instructions] [--lines]
+                              [--folded profile.folded]
+
+Every traced instruction is charged to the call stack it ran in: one frame per function of the
+contracts, mapped from the instruction pointers of the invocation stack through the `--debug`
+debug info, plus the source line of the innermost frame with `--lines`. The report lists the self
+and inclusive cost of every function and the most expensive lines; `--folded` writes the stacks in
+the folded format read by flamegraph.pl, inferno and speedscope.
+
+Traces are MessagePack files, reading them needs the `msgpack` package (`pip install msgpack`).
+"""
+import argparse
+import glob
+import os
+import re
+import subprocess
+import sys
+from bisect import bisect_right
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from tools.artifacts import compile_cached
+from tools.nef import method_ranges, read_debug_info
+from tools.rpc import hex_to_script_hash, script_hash_to_hex
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONTRACTS_DIR = os.path.join(ROOT_DIR, 'contracts')
+CONTRACTS = ('SomeNFT', 'Core')
+
+# union keys of the neo-express trace records, each record is written as [key, fields]
+TRACE_RECORD = 0
+RESULTS_RECORD = 3
+
+SEQUENCE_POINT = re.compile(r'(\d+)\[(\d+)\](\d+):\d+-\d+:\d+')
+
+
+class SourceMap:
+    """
+    Maps the instruction offsets of a compiled contract to its functions and source lines
+    """
+    def __init__(self, debug_info: Dict[str, Any]):
+        self.script_hash = hex_to_script_hash(debug_info['hash'])
+        self.documents = [os.path.basename(document) for document in debug_info['documents']]
+        self.ranges = sorted((start, end, name) for name, (start, end) in method_ranges({}, debug_info).items())
+        self._starts = [start for start, _, _ in self.ranges]
+
+        points = []
+        for method in debug_info['methods']:
+            for point in method.get('sequence-points', []):
+                offset, document, line = SEQUENCE_POINT.match(point).groups()
+                points.append((int(offset), int(document), int(line)))
+        points.sort()
+        self._points = points
+        self._point_offsets = [offset for offset, _, _ in points]
+
+    @classmethod
+    def load(cls, nef_path: str) -> 'SourceMap':
+        debug_info = read_debug_info(nef_path)
+        assert debug_info is not None, 'No debug info next to {0}, compile with --debug'.format(nef_path)
+        return cls(debug_info)
+
+    @property
+    def name(self) -> str:
+        if len(self.documents) == 0:
+            return script_hash_to_hex(self.script_hash)
+        return os.path.splitext(self.documents[0])[0]
+
+    def function(self, offset: int) -> str:
+        index = bisect_right(self._starts, offset) - 1
+        if index >= 0:
+            start, end, name = self.ranges[index]
+            if offset <= end:
+                return name
+        return '?{0}'.format(offset)
+
+    def line(self, offset: int) -> Tuple[str, int]:
+        # the sequence point at or before the offset, within the same function
+        index = bisect_right(self._point_offsets, offset) - 1
+        if index < 0 or self.function(self._point_offsets[index]) != self.function(offset):
+            return self.name + '.py', 0
+        _, document, line = self._points[index]
+        return self.documents[document], line
+
+
+def read_trace(path: str) -> Iterator[Tuple[int, List[Tuple[bytes, int]]]]:
+    """
+    Yields (GAS consumed so far, [(script hash, instruction pointer)]) for every executed
+    instruction, the frames starting from the outermost call. The last item carries the final
+    GAS and no frames.
+    """
+    assert msgpack is not None, 'Reading traces needs msgpack: pip install msgpack'
+    with open(path, 'rb') as trace:
+        for record in msgpack.Unpacker(trace, raw=False, strict_map_key=False):
+            key, fields = record
+            if key == TRACE_RECORD:
+                gas_consumed, stack_frames = fields[1], fields[2]
+                # the invocation stack is recorded from the running frame down to the entry script
+                yield gas_consumed, [(_script_hash(frame[0]), frame[1]) for frame in reversed(stack_frames)]
+            elif key == RESULTS_RECORD:
+                yield fields[1], []
+
+
+def _script_hash(value: Any) -> bytes:
+    return hex_to_script_hash(value) if isinstance(value, str) else bytes(value)
+
+
+def label_steps(trace: Iterable[Tuple[int, List[Tuple[bytes, int]]]], source_maps: Dict[bytes, SourceMap],
+                lines: bool = False) -> Iterator[Tuple[Tuple[str, ...], int]]:
+    """
+    Charges every instruction the GAS consumed until the next one, yields (stack, GAS)
+    """
+    previous: Optional[Tuple[Tuple[str, ...], int]] = None
+    for gas_consumed, frames in trace:
+        if previous is not None:
+            yield previous[0], gas_consumed - previous[1]
+            previous = None
+        if len(frames) == 0:
+            continue
+
+        stack = []
+        for script_hash, pointer in frames:
+            source_map = source_maps.get(script_hash)
+            if source_map is None:
+                stack.append(script_hash_to_hex(script_hash))
+            else:
+                stack.append('{0}.{1}'.format(source_map.name, source_map.function(pointer)))
+        script_hash, pointer = frames[-1]
+        if lines and script_hash in source_maps:
+            stack.append('{0}:{1}'.format(*source_maps[script_hash].line(pointer)))
+        previous = tuple(stack), gas_consumed
+
+    if previous is not None:
+        # no final GAS recorded, the last instruction is counted without its cost
+        yield previous[0], 0
+
+
+class Profile:
+    def __init__(self):
+        # stack -> [GAS, instructions]
+        self.stacks: Dict[Tuple[str, ...], List[int]] = defaultdict(lambda: [0, 0])
+
+    def add(self, stack: Tuple[str, ...], gas: int):
+        totals = self.stacks[stack]
+        totals[0] += gas
+        totals[1] += 1
+
+    def total(self) -> Tuple[int, int]:
+        return (sum(gas for gas, _ in self.stacks.values()),
+                sum(instructions for _, instructions in self.stacks.values()))
+
+    def functions(self) -> Dict[str, Dict[str, int]]:
+        """
+        Self and inclusive GAS and instruction counts of every function; recursive frames are
+        counted once in the inclusive figures
+        """
+        report: Dict[str, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(
+            ('self_gas', 'self_instructions', 'gas', 'instructions'), 0))
+        for stack, (gas, instructions) in self.stacks.items():
+            frames = [frame for frame in stack if ':' not in frame]
+            for frame in set(frames):
+                report[frame]['gas'] += gas
+                report[frame]['instructions'] += instructions
+            report[frames[-1]]['self_gas'] += gas
+            report[frames[-1]]['self_instructions'] += instructions
+        return report
+
+    def lines(self) -> Dict[str, List[int]]:
+        report: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+        for stack, (gas, instructions) in self.stacks.items():
+            if ':' in stack[-1]:
+                report[stack[-1]][0] += gas
+                report[stack[-1]][1] += instructions
+        return report
+
+    def folded(self, metric: str = 'gas') -> List[str]:
+        column = 0 if metric == 'gas' else 1
+        return ['{0} {1}'.format(';'.join(stack), totals[column])
+                for stack, totals in sorted(self.stacks.items()) if totals[column] > 0]
+
+
+def profile_trace(path: str, source_maps: Dict[bytes, SourceMap], lines: bool = False) -> Profile:
+    profile = Profile()
+    for stack, gas in label_steps(read_trace(path), source_maps, lines):
+        profile.add(stack, gas)
+    return profile
+
+
+def load_source_maps() -> Dict[bytes, SourceMap]:
+    source_maps = {}
+    for name in CONTRACTS:
+        source_path = os.path.join(CONTRACTS_DIR, name + '.py')
+        compile_cached(source_path)
+        source_map = SourceMap.load(source_path.replace('.py', '.nef'))
+        source_maps[source_map.script_hash] = source_map
+    return source_maps
+
+
+def record_trace(neoxp: str, invoke_file: str, account: str, express: str) -> str:
+    """
+    Runs the invoke file on neo-express with tracing on and returns the written trace file
+    """
+    existing = set(glob.glob('*.neo-trace'))
+    subprocess.run([neoxp, 'contract', 'invoke', invoke_file, account, '--trace', '--input', express], check=True)
+    traces = [path for path in glob.glob('*.neo-trace') if path not in existing]
+    assert len(traces) > 0, 'neo-express wrote no trace file'
+    return max(traces, key=os.path.getmtime)
+
+
+def print_report(profile: Profile, top: int):
+    total_gas, total_instructions = profile.total()
+    print('total: {0} GAS units, {1} instructions'.format(total_gas, total_instructions))
+    print()
+    print('{0:>12} {1:>7} {2:>12} {3:>7}  function'.format('gas', '%', 'self gas', 'instr'))
+    functions = sorted(profile.functions().items(), key=lambda item: -item[1]['gas'])
+    for name, figures in functions[:top]:
+        print('{0:>12} {1:>6.1%} {2:>12} {3:>7}  {4}'.format(figures['gas'], figures['gas'] / max(total_gas, 1),
+                                                             figures['self_gas'], figures['instructions'], name))
+
+    lines = sorted(profile.lines().items(), key=lambda item: -item[1][0])
+    if len(lines) > 0:
+        print()
+        print('{0:>12} {1:>7} {2:>7}  line'.format('gas', '%', 'instr'))
+        for line, (gas, instructions) in lines[:top]:
+            print('{0:>12} {1:>6.1%} {2:>7}  {3}'.format(gas, gas / max(total_gas, 1), instructions, line))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--trace', help='a .neo-trace file')
+    source.add_argument('--invoke', help='an invoke file to run on neo-express with tracing on')
+    parser.add_argument('--account', default='owner', help='neo-express wallet signing --invoke')
+    parser.add_argument('--input', default=os.path.join(ROOT_DIR, 'default.neo-express'))
+    parser.add_argument('--neoxp', default='neoxp')
+    parser.add_argument('--metric', choices=('gas', 'instructions'), default='gas', help='value of the folded stacks')
+    parser.add_argument('--lines', action='store_true', help='end every stack with the source line')
+    parser.add_argument('--folded', help='write the folded stacks to this file')
+    parser.add_argument('--top', type=int, default=20, help='rows of the report')
+    args = parser.parse_args()
+
+    trace_path = args.trace or record_trace(args.neoxp, args.invoke, args.account, args.input)
+    profile = profile_trace(trace_path, load_source_maps(), args.lines)
+    print_report(profile, args.top)
+
+    if args.folded:
+        with open(args.folded, 'w') as folded_file:
+            folded_file.write('\n'.join(profile.folded(args.metric)) + '\n')
+        print()
+        print('saved {0}'.format(args.folded))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
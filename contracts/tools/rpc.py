@@ -0,0 +1,114 @@
+"""
+Minimal JSON-RPC client for a Neo N3 node (neo-cli or neo-express) plus conversions between
+the node's JSON stack items / contract parameters and Python values.
+"""
+import base64
+import itertools
+import json
+import urllib.request
+from typing import Any, Dict, List, Sequence, Tuple
+
+DEFAULT_RPC_URL = 'http://127.0.0.1:50012'
+
+
+class RpcError(Exception):
+    def __init__(self, method: str, error: Dict[str, Any]):
+        super().__init__('{0}: {1} ({2})'.format(method, error.get('message'), error.get('code')))
+        self.code = error.get('code')
+
+
+class RpcClient:
+    def __init__(self, url: str = DEFAULT_RPC_URL, timeout: float = 30):
+        self.url = url
+        self.timeout = timeout
+        self._ids = itertools.count(1)
+
+    def _post(self, payload: Any) -> Any:
+        request = urllib.request.Request(self.url, data=json.dumps(payload).encode(),
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+    def call(self, method: str, *params) -> Any:
+        return self.batch([(method, list(params))])[0]
+
+    def batch(self, calls: Sequence[Tuple[str, List[Any]]]) -> List[Any]:
+        """
+        Sends all `calls` in one JSON-RPC batch request, returns their results in the same order
+        """
+        if len(calls) == 0:
+            return []
+        requests = [{'jsonrpc': '2.0', 'id': next(self._ids), 'method': method, 'params': params}
+                    for method, params in calls]
+        responses = self._post(requests)
+        if isinstance(responses, dict):
+            # nodes answer a malformed batch with a single error object
+            raise RpcError('batch', responses.get('error', {}))
+
+        by_id = {response['id']: response for response in responses}
+        results = []
+        for request in requests:
+            response = by_id[request['id']]
+            if 'error' in response:
+                raise RpcError(request['method'], response['error'])
+            results.append(response['result'])
+        return results
+
+
+def decode_stack_item(item: Dict[str, Any]) -> Any:
+    """
+    Converts a stack item of an invocation result or notification into a Python value.
+    ByteString and Buffer become bytes, maps with ByteString keys get bytes keys.
+    """
+    item_type = item['type']
+    value = item.get('value')
+    if item_type == 'Any':
+        return None
+    if item_type == 'Boolean':
+        return value
+    if item_type == 'Integer':
+        return int(value)
+    if item_type in ('ByteString', 'Buffer'):
+        return base64.b64decode(value)
+    if item_type in ('Array', 'Struct'):
+        return [decode_stack_item(element) for element in value]
+    if item_type == 'Map':
+        return {decode_stack_item(entry['key']): decode_stack_item(entry['value']) for entry in value}
+    if item_type == 'InteropInterface':
+        return item
+    raise ValueError('Unsupported stack item type {0}'.format(item_type))
+
+
+def encode_param(value: Any) -> Dict[str, Any]:
+    """
+    Converts a Python value into an `invokefunction` contract parameter
+    """
+    if value is None:
+        return {'type': 'Any'}
+    if isinstance(value, bool):
+        return {'type': 'Boolean', 'value': value}
+    if isinstance(value, int):
+        return {'type': 'Integer', 'value': str(value)}
+    if isinstance(value, str):
+        return {'type': 'String', 'value': value}
+    if isinstance(value, (bytes, bytearray)):
+        return {'type': 'ByteArray', 'value': base64.b64encode(bytes(value)).decode()}
+    if isinstance(value, (list, tuple)):
+        return {'type': 'Array', 'value': [encode_param(element) for element in value]}
+    if isinstance(value, dict):
+        return {'type': 'Map', 'value': [{'key': encode_param(key), 'value': encode_param(element)}
+                                         for key, element in value.items()]}
+    raise TypeError('Unsupported parameter type {0}'.format(type(value).__name__))
+
+
+def script_hash_to_hex(script_hash: bytes) -> str:
+    """
+    Formats a little endian script hash the way RPC results show contracts: 0x-prefixed big endian
+    """
+    return '0x' + script_hash[::-1].hex()
+
+
+def hex_to_script_hash(value: str) -> bytes:
+    if value.startswith('0x'):
+        value = value[2:]
+    return bytes.fromhex(value)[::-1]
@@ -0,0 +1,260 @@
+"""
+Large-state snapshots of SomeNFT and Core for tests and benchmarks.
+
+The state is built in the emulator with batched invocations (`create_cutie_batch` in batches of
+MAX_BATCH_SIZE, then approvals and auctions), which writes the same storage as the contracts, and
+cached on disk keyed by the contract hashes, the emulator source and the sizes. Loading a cached snapshot into a
+TestEngine is a plain storage copy, see `CutieTest.load_snapshot`.
+
+Run from the `contracts` folder to fill the cache, or to save the same sizes as a neo-express
+checkpoint on top of the one made by tools.deploy:
+
+    python3 -m tools.snapshots --owners 1000 --cuties-per-owner 100 [--approvals 1000] [--auctions 100]
+                               [--checkpoint checkpoints/large]
+
+Neo-express can't sign for the generated owners, so in checkpoints the approved and auctioned
+cuties are extra cuties of the `coz` wallet.
+"""
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import random
+import subprocess
+import sys
+import tempfile
+from collections import namedtuple
+from typing import Any, Dict, List, Tuple
+
+from boa3.neo.cryptography import hash160
+
+from tools.artifacts import compile_cached
+from tools.emulator import DEFAULT_DEPLOYER, GAS_HASH, Emulator, setup_game
+from tools.nef import read_nef
+from tools.payments import OP_CREATE_SALE_AUCTION, encode_payment
+from tools.rpc import script_hash_to_hex
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONTRACTS_DIR = os.path.join(ROOT_DIR, 'contracts')
+
+CACHE_DIR_ENV = 'CUTIE_SNAPSHOT_CACHE'
+DEFAULT_CACHE_DIR = os.path.join(ROOT_DIR, '.snapshot-cache')
+EMULATOR_PATH = os.path.join(ROOT_DIR, 'tools', 'emulator.py')
+
+# bumped whenever the generated state changes for the same sizes
+SNAPSHOT_VERSION = 2
+
+BATCH_SIZE = 100  # SomeNFT.MAX_BATCH_SIZE
+START_TIME = 1600000000000
+ACCOUNT_GAS = 1000_00000000
+AUCTION_PAYMENT = 300
+AUCTION_DURATION = 86400000
+
+INVOCATIONS_PER_TRANSACTION = 4
+
+SnapshotSpec = namedtuple('SnapshotSpec', ['owners', 'cuties_per_owner', 'approvals', 'auctions', 'seed'])
+SnapshotSpec.__new__.__defaults__ = (0, 0, 1)
+
+
+def cache_dir() -> str:
+    return os.environ.get(CACHE_DIR_ENV, DEFAULT_CACHE_DIR)
+
+
+def snapshot_account(index: int) -> bytes:
+    return index.to_bytes(4, 'little') + b'\xca' * 16
+
+
+def random_cuties(spec: SnapshotSpec, rng: random.Random, owners: List[bytes]) -> List[List[Any]]:
+    # create_cutie_batch specs, owners interleaved the way organic mints would be
+    cuties = [[owner, 0, 0, rng.randrange(8), rng.randrange(14), rng.getrandbits(240), 123123123]
+              for owner in owners for _ in range(spec.cuties_per_owner)]
+    rng.shuffle(cuties)
+    return cuties
+
+
+def build_state(nft_hash: bytes, core_hash: bytes, spec: SnapshotSpec) -> Dict[str, Any]:
+    rng = random.Random(spec.seed)
+    owners = [snapshot_account(index) for index in range(1, spec.owners + 1)]
+    assert spec.approvals + spec.auctions <= spec.owners * spec.cuties_per_owner, 'Not enough cuties'
+
+    emulator = Emulator(nft_hash, core_hash, DEFAULT_DEPLOYER, START_TIME)
+    setup_game(emulator, DEFAULT_DEPLOYER, owners, ACCOUNT_GAS)
+
+    cuties = random_cuties(spec, rng, owners)
+    for start in range(0, len(cuties), BATCH_SIZE):
+        emulator.invoke(nft_hash, 'create_cutie_batch', cuties[start:start + BATCH_SIZE], signers=[DEFAULT_DEPLOYER])
+        emulator.events.clear()
+
+    token_ids = rng.sample(range(1, len(cuties) + 1), spec.approvals + spec.auctions)
+    for token_id in token_ids[:spec.approvals]:
+        owner = cuties[token_id - 1][0]
+        spender = rng.choice([account for account in owners if account != owner] or [core_hash])
+        emulator.invoke(nft_hash, 'delegated_approve', owner, spender, token_id, signers=[owner])
+    for token_id in token_ids[spec.approvals:]:
+        owner = cuties[token_id - 1][0]
+        payment = encode_payment(OP_CREATE_SALE_AUCTION, token_id, rng.randrange(1000, 100000), rng.randrange(1000),
+                                 AUCTION_DURATION)
+        emulator.invoke(GAS_HASH, 'transfer', owner, core_hash, AUCTION_PAYMENT, payment, signers=[owner])
+    emulator.events.clear()
+
+    return {'version': SNAPSHOT_VERSION, 'spec': spec._asdict(), 'time': emulator.time,
+            'storage': {'SomeNFT': emulator.storage[nft_hash], 'Core': emulator.storage[core_hash]},
+            'gas': emulator.gas, 'owners': owners}
+
+
+def emulator_digest() -> str:
+    # the state is written by the emulator, so any change to it invalidates the cached snapshots
+    with open(EMULATOR_PATH, 'rb') as emulator_file:
+        return hashlib.sha256(emulator_file.read()).hexdigest()[:16]
+
+
+def snapshot_path(nft_hash: bytes, core_hash: bytes, spec: SnapshotSpec) -> str:
+    name = '{0}-{1}-v{2}-e{3}-{4}o-{5}c-{6}ap-{7}au-s{8}.pickle'.format(
+        nft_hash[::-1].hex(), core_hash[::-1].hex(), SNAPSHOT_VERSION, emulator_digest(), *spec)
+    return os.path.join(cache_dir(), name)
+
+
+def load_snapshot(nft_hash: bytes, core_hash: bytes, spec: SnapshotSpec) -> Dict[str, Any]:
+    """
+    Returns the cached snapshot of `spec` for these contract hashes, building it on a miss
+    """
+    path = snapshot_path(nft_hash, core_hash, spec)
+    if os.path.isfile(path):
+        with open(path, 'rb') as snapshot_file:
+            return pickle.load(snapshot_file)
+
+    snapshot = build_state(nft_hash, core_hash, spec)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # written next to the destination and renamed, so concurrent test workers never read a partial file
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, 'wb') as snapshot_file:
+        pickle.dump(snapshot, snapshot_file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, path)
+    return snapshot
+
+
+def token_owners(snapshot: Dict[str, Any]) -> Dict[int, bytes]:
+    return {int.from_bytes(key[1:], 'little'): value[:20]
+            for key, value in snapshot['storage']['SomeNFT'].items() if key[:1] == b'\x04'}
+
+
+# -------------------------------------------
+# neo-express checkpoints
+# -------------------------------------------
+
+def checkpoint_invocations(spec: SnapshotSpec, first_id: int, seller: str = 'coz') -> List[Dict[str, Any]]:
+    """
+    Invocations reproducing `spec` on a chain where SomeNFT already minted `first_id - 1` cuties
+    """
+    rng = random.Random(spec.seed)
+    owners = [snapshot_account(index) for index in range(1, spec.owners + 1)]
+    cuties = [[script_hash_to_hex(cutie[0])] + cutie[1:] for cutie in random_cuties(spec, rng, owners)]
+    extra = spec.approvals + spec.auctions
+    cuties += [['@' + seller, 0, 0, 0, 0, rng.getrandbits(240), 123123123] for _ in range(extra)]
+
+    invocations = [{'contract': 'SomeNFT', 'operation': 'create_cutie_batch', 'args': [cuties[start:start + BATCH_SIZE]]}
+                   for start in range(0, len(cuties), BATCH_SIZE)]
+    seller_ids = list(range(first_id + len(cuties) - extra, first_id + len(cuties)))
+    for token_id in seller_ids[:spec.approvals]:
+        invocations.append({'contract': 'SomeNFT', 'operation': 'delegated_approve',
+                            'args': ['@' + seller, script_hash_to_hex(rng.choice(owners)), token_id],
+                            'signer': seller})
+    if spec.auctions > 0:
+        # as an operator, Core skips the per-cutie approval call; it still checks the seller's witness
+        invocations.append({'contract': 'SomeNFT', 'operation': 'setApprovalForAll',
+                            'args': ['@' + seller, '#Core', True], 'signer': seller})
+    for token_id in seller_ids[spec.approvals:]:
+        invocations.append({'contract': 'GasToken', 'operation': 'transfer',
+                            'args': ['@' + seller, '#Core', AUCTION_PAYMENT,
+                                     ['_create_sale_auction', token_id, rng.randrange(1000, 100000),
+                                      rng.randrange(1000), AUCTION_DURATION]],
+                            'signer': seller})
+    return invocations
+
+
+def transactions(invocations: List[Dict[str, Any]], default_signer: str) -> List[Tuple[str, List[Dict[str, Any]]]]:
+    result: List[Tuple[str, List[Dict[str, Any]]]] = []
+    for invocation in invocations:
+        invocation = dict(invocation)
+        signer = invocation.pop('signer', default_signer)
+        if len(result) == 0 or result[-1][0] != signer or len(result[-1][1]) == INVOCATIONS_PER_TRANSACTION:
+            result.append((signer, []))
+        result[-1][1].append(invocation)
+    return result
+
+
+def write_checkpoint(spec: SnapshotSpec, checkpoint: str, base_checkpoint: str, express: str, neoxp: str,
+                     owner: str = 'owner') -> bool:
+    """
+    Saves `spec` as a neo-express checkpoint; returns False when the cached one is up to date
+    """
+    with open(base_checkpoint + '.stamp') as stamp_file:
+        # the stamp of tools.deploy covers the compiled contracts
+        base_stamp = stamp_file.read().strip()
+    stamp = hashlib.sha256(json.dumps([base_stamp, SNAPSHOT_VERSION, spec]).encode()).hexdigest()
+    stamp_path = checkpoint + '.stamp'
+    if os.path.isfile(checkpoint + '.neoxp-checkpoint') and os.path.isfile(stamp_path):
+        with open(stamp_path) as stamp_file:
+            if stamp_file.read().strip() == stamp:
+                return False
+
+    # tools.deploy mints the cutie of init.neo-invoke.json
+    invocations = checkpoint_invocations(spec, first_id=2)
+    with tempfile.TemporaryDirectory(prefix='cutie-snapshot-') as workdir:
+        batch_path = os.path.join(workdir, 'snapshot.batch')
+        with open(batch_path, 'w') as batch_file:
+            # a transaction has a single signer, consecutive invocations of the same one are grouped
+            for index, (signer, group) in enumerate(transactions(invocations, owner)):
+                path = os.path.join(workdir, 'snapshot-{0}.neo-invoke.json'.format(index))
+                with open(path, 'w') as invoke_file:
+                    json.dump(group, invoke_file)
+                # Core and SomeNFT check the seller's witness below the GAS callback
+                batch_file.write('contract invoke {0} {1} --witness-scope Global\n'.format(path, signer))
+            batch_file.write('checkpoint create {0} --force\n'.format(os.path.abspath(checkpoint)))
+
+        subprocess.run([neoxp, 'checkpoint', 'restore', base_checkpoint + '.neoxp-checkpoint', '--force',
+                        '--input', express], check=True)
+        subprocess.run([neoxp, 'batch', '--input', express, batch_path], check=True)
+
+    with open(stamp_path, 'w') as stamp_file:
+        stamp_file.write(stamp + '\n')
+    return True
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--owners', type=int, default=100)
+    parser.add_argument('--cuties-per-owner', type=int, default=10)
+    parser.add_argument('--approvals', type=int, default=0)
+    parser.add_argument('--auctions', type=int, default=0)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--checkpoint', help='also save the state as this neo-express checkpoint')
+    parser.add_argument('--base-checkpoint', default=os.path.join(ROOT_DIR, 'checkpoints', 'test'),
+                        help='checkpoint made by tools.deploy')
+    parser.add_argument('--input', default=os.path.join(ROOT_DIR, 'default.neo-express'))
+    parser.add_argument('--neoxp', default='neoxp')
+    args = parser.parse_args()
+    spec = SnapshotSpec(args.owners, args.cuties_per_owner, args.approvals, args.auctions, args.seed)
+
+    hashes = []
+    for name in ('SomeNFT', 'Core'):
+        source_path = os.path.join(CONTRACTS_DIR, name + '.py')
+        compile_cached(source_path)
+        # the script hash the TestEngine deploys the contract at
+        hashes.append(hash160(read_nef(source_path.replace('.py', '.nef'))[0]))
+
+    cached = os.path.isfile(snapshot_path(*hashes, spec))
+    snapshot = load_snapshot(*hashes, spec)
+    print('{0}: {1} SomeNFT entries, {2} Core entries ({3})'.format(
+        snapshot_path(*hashes, spec), len(snapshot['storage']['SomeNFT']), len(snapshot['storage']['Core']),
+        'cached' if cached else 'built'))
+
+    if args.checkpoint:
+        written = write_checkpoint(spec, args.checkpoint, args.base_checkpoint, args.input, args.neoxp)
+        print('{0}.neoxp-checkpoint {1}'.format(args.checkpoint, 'saved' if written else 'is up to date'))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())